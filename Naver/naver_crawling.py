@@ -13,7 +13,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from elasticsearch import Elasticsearch
+from elasticsearch_index.es_client import es
 from elasticsearch import NotFoundError
 import re
 
@@ -21,8 +21,7 @@ import re
 from elasticsearch_index.es_err_crawling import index_error_log
 from logger import Logger
 from datetime import datetime, timezone, timedelta
-from kiwipiepy import Kiwi
-from elasticsearch_index.es_raw import tokens, ensure_news_raw, ES_INDEX
+from elasticsearch_index.es_raw import tokens, ensure_news_raw, ES_INDEX, text_stats
 import asyncio
 
 
@@ -32,17 +31,7 @@ logger = Logger().get_logger(__name__)
 
 # ---------- [설정] 엘라스틱서치 연결 ----------
 # 엘라스틱서치 서버 주소 및 인덱스 이름 설정
-ES_HOST = "http://localhost:9200"
 ES_INDEX = "news_raw"
-ES_USER = "elastic"
-ES_PASS = "elastic"
-es = Elasticsearch( # elasticsearch 연결 객체 생성
-    ES_HOST,
-    basic_auth=(ES_USER, ES_PASS),
-    verify_certs=False,
-    ssl_show_warn=False # type: ignore
-)
-
 
 # ---------- [설정] Selenium 드라이버 초기화 함수 ----------
 def get_safe_driver():
@@ -308,7 +297,7 @@ def pubtime_update(news_id):
 # Semaphore(접속 수 제한:3)
 #sem = asyncio.Semaphore(3)
 
-async def process_article(item, cat_name, kiwi, sem):
+async def process_article(item, cat_name, sem):
     async with sem:
         try:
             link_tag = item.select_one("a")
@@ -337,7 +326,7 @@ async def process_article(item, cat_name, kiwi, sem):
             content = detail.get("content")
             if not content: return
 
-            token = tokens({"title": title, "content": content}, kiwi)
+            token = tokens({"title": title, "content": content})
 
             doc = {
                 "news_id": news_id,
@@ -346,6 +335,8 @@ async def process_article(item, cat_name, kiwi, sem):
                 "title_tokens": token["title_tokens"],
                 "content": content,
                 "content_tokens": token["content_tokens"],
+                "aggr_tokens": token["aggr_tokens"],
+                **text_stats(content),
                 "link": detail.get("URL"),
                 "media": (detail.get("media") or "").replace('\\', ''),
                 "pubdate": detail.get("pubdate"),
@@ -437,7 +428,6 @@ def run_slow_crawl():
 ################################################################################################################
 # 일반기사 크롤링 함수
 def crawling_general_news(driver, categories):
-    kiwi = Kiwi()
     # categories = {
     # "정치": "100", "경제": "101", "사회": "102", "세계": "104", "IT/과학": "105",
     # "생활/문화(건강)": "103/241","생활/문화(자동차)": "103/239","생활/문화(도로)": "103/240","생활/문화(여행)": "103/237","생활/문화(음식)": "103/238",
@@ -483,7 +473,7 @@ def crawling_general_news(driver, categories):
 
             sem = asyncio.Semaphore(3)
 
-            tasks = [process_article(item, cat_name, kiwi, sem) for item in items]
+            tasks = [process_article(item, cat_name, sem) for item in items]
             results = loop.run_until_complete(asyncio.gather(*tasks))
             loop.close()
 
@@ -506,7 +496,6 @@ def crawling_general_news(driver, categories):
 ################################################################################################################
 # 스포츠기사 크롤링 함수
 def crawling_sports_news(driver):
-    kiwi = Kiwi()
     sports_categories = {
         "국내야구": "kbaseball","해외야구": "wbaseball","국내축구": "kfootball","해외축구": "wfootball",
         "농구": "basketball","배구": "volleyball","일반": "general","골프": "golf"
@@ -614,7 +603,7 @@ def crawling_sports_news(driver):
                         continue
 
 
-                    token = tokens({"title": title, "content": detail.get("content")}, kiwi)
+                    token = tokens({"title": title, "content": detail.get("content")})
 
                     doc = {
                         "news_id": news_id,
@@ -623,6 +612,8 @@ def crawling_sports_news(driver):
                         "title_tokens": token["title_tokens"],
                         "content": detail.get("content", ""),
                         "content_tokens": token["content_tokens"],
+                        "aggr_tokens": token["aggr_tokens"],
+                        **text_stats(detail.get("content", "")),
                         "writer": (detail.get("writer") or "").replace('\\', ''),
                         "media": (detail.get("media") or "").replace('\\', ''),
                         "pubdate": detail.get("pubdate"),
@@ -654,7 +645,6 @@ def crawling_sports_news(driver):
 ################################################################################################################
 # 연예 기사 크롤링 함수
 def crawling_enter_news(driver):
-    kiwi = Kiwi()
     start_time = time.time()
     saved_count = 0
     duplicate_count = 0
@@ -750,7 +740,7 @@ def crawling_enter_news(driver):
                         continue
 
 
-                    token = tokens({"title": title, "content": detail.get("content")}, kiwi)
+                    token = tokens({"title": title, "content": detail.get("content")})
 
                     doc = {
                         "news_id": news_id,
@@ -759,6 +749,8 @@ def crawling_enter_news(driver):
                         "title_tokens": token["title_tokens"],
                         "content": detail.get("content", ""),
                         "content_tokens": token["content_tokens"],
+                        "aggr_tokens": token["aggr_tokens"],
+                        **text_stats(detail.get("content", "")),
                         "writer": (detail.get("writer") or "").replace('\\', ''),
                         "media": (detail.get("media") or "").replace('\\', ''),
                         "pubdate": detail.get("pubdate"),
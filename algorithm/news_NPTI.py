@@ -2,30 +2,25 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
 import joblib
+import numpy as np
 from datetime import datetime, timezone, timedelta
 from logger import Logger
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import helpers
+from elasticsearch_index.es_client import es
 
 from database import Base, get_engine, SessionLocal
 import warnings
-from sqlalchemy.exc import IntegrityError
-from db_index.db_articles_NPTI import ArticlesNPTI
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import SQLAlchemyError
+from db_index.db_articles_NPTI import ArticlesNPTI, ArticlesNPTIReview
+from algorithm.news_features import SharedTfidfFeatures
+from algorithm.npti_bundle import BUNDLE_PATH, load_bundle
 
 logger = Logger().get_logger(__name__)
 
 # 엘라스틱
-ES_HOST = "http://localhost:9200"
-ES_USER = "elastic"
-ES_PASS = "elastic"
 ES_INDEX = "news_raw"
 
-es = Elasticsearch( # elasticsearch 연결 객체 생성
-    ES_HOST,
-    basic_auth=(ES_USER, ES_PASS),
-    verify_certs=False,
-    ssl_show_warn=False # type: ignore
-)
-
 warnings.filterwarnings(
     "ignore",
     message="X does not have valid feature names"
@@ -34,7 +29,7 @@ warnings.filterwarnings(
 # 테이블 생성 함수
 def add_db():
     engine = get_engine()
-    Base.metadata.create_all(bind=engine, tables=[ArticlesNPTI.__table__])
+    Base.metadata.create_all(bind=engine, tables=[ArticlesNPTI.__table__, ArticlesNPTIReview.__table__])
 
 # 에러 메세지 ES저장 함수
 def err_article(news_id, error_message):
@@ -75,121 +70,246 @@ def load_joblib():
     return _models
 
 
+# 분류 모델 로드: mmap 번들 우선, 번들이 없거나 버전이 다르면 joblib 으로 대체
+_serving_models = None
+def load_models():
+    global _serving_models
+    if _serving_models is None:
+        if os.path.exists(BUNDLE_PATH):
+            try:
+                _serving_models = load_bundle(BUNDLE_PATH)
+            except Exception as e:
+                logger.warning(f"[NPTI BUNDLE] 번들 로드 실패 -> joblib 사용: {e}")
+        if _serving_models is None:
+            _serving_models = load_joblib()
+    return _serving_models
+
+
+# 3개 축 TF-IDF 공유 추출기 (기사당 토큰화 1회)
+_features = None
+def load_features():
+    global _features
+    if _features is None:
+        models = load_models()
+        _features = SharedTfidfFeatures({axis: models[axis][1] for axis in ("ct", "fi", "pn")})
+    return _features
+
+
 def init_npti():
     logger.info("[NPTI INIT] DB 테이블 및 모델 초기화 시작")
     add_db()
-    load_joblib()
+    load_models()
+    load_features()
     logger.info("[NPTI INIT] 초기화 완료")
 
 
-# NPTI 라벨링 함수(joblib 모델 활용)
-def classify_npti_fast():
+# NPTI 라벨링 배치 크기 (scan 1회 조회 단위 = 예측/저장 1회 단위)
+CLASSIFY_BATCH_SIZE = 500
+
+
+# scan 결과를 batch_size 단위로 묶어서 반환
+def chunked(rows, batch_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# news_raw 부분 업데이트(bulk) 액션 생성
+def update_action(news_id, doc):
+    return {"_op_type": "update", "_index": ES_INDEX, "_id": news_id, "doc": doc}
+
+
+# 예측 확신도(최대 확률) 하한: 한 축이라도 이 값 미만이면 검수 대기열로 보냄
+CONFIDENCE_FLOOR = 0.6
+
+# 축 -> (articles_NPTI 분류 컬럼, 확신도 컬럼)
+NPTI_AXES = {
+    "ct": ("article_type", "ct_confidence"),
+    "fi": ("info_type", "fi_confidence"),
+    "pn": ("view_type", "pn_confidence"),
+}
+
+
+# 기사 본문 리스트 -> NPTI 분류 결과 리스트 (토큰화 1회 후 축별로 청크 전체를 한 번에 예측)
+# n_chars: 수집 시 저장된 본문 글자 수 (없으면 본문 길이로 계산)
+def predict_npti_batch(contents, models, n_chars=None):
+    features = load_features().transform(contents)
+
+    # 축별 predict_proba 1회 -> 라벨(argmax)과 확신도(최대 확률)를 함께 계산
+    axis_results = {}
+    for axis in NPTI_AXES:
+        model = models[axis][0]
+        proba = model.predict_proba(features[axis])
+        best = proba.argmax(axis=1)
+        axis_results[axis] = (model.classes_[best], proba[np.arange(len(best)), best])
+
+    results = []
+    for i, content in enumerate(contents):
+        length = n_chars[i] if n_chars is not None and n_chars[i] is not None else len(content)
+        length_type = "L" if length >= 1000 else "S"
+        result = {"length_type": length_type}
+        code = length_type
+        for axis, (type_col, conf_col) in NPTI_AXES.items():
+            labels, confidences = axis_results[axis]
+            label = str(labels[i]).upper()
+            result[type_col] = label
+            result[conf_col] = float(confidences[i])
+            code += label
+        result["NPTI_code"] = code
+        result["confidence"] = min(result[conf_col] for _, conf_col in NPTI_AXES.values())
+        results.append(result)
+    return results
+
+
+# 일괄 upsert (INSERT ... ON DUPLICATE KEY UPDATE 1회)
+def bulk_upsert(db, table, records):
+    if not records:
+        return
+    stmt = mysql_insert(table).values(records)
+    stmt = stmt.on_duplicate_key_update(
+        {col: stmt.inserted[col] for col in records[0] if col != "news_id"}
+    )
+    db.execute(stmt)
+
+
+# articles_NPTI 일괄 저장 + 확신도 하한 미만 기사는 검수 대기열(articles_NPTI_review)에 등록
+def upsert_articles_npti(db, records, confidence_floor=CONFIDENCE_FLOOR):
+    if not records:
+        return 0
+    bulk_upsert(db, ArticlesNPTI.__table__, records)
+
+    review_records = []
+    for record in records:
+        low_axes = [axis for axis, (_, conf_col) in NPTI_AXES.items() if record[conf_col] < confidence_floor]
+        if low_axes:
+            review_records.append({
+                "news_id": record["news_id"],
+                "NPTI_code": record["NPTI_code"],
+                "low_axes": ",".join(low_axes),
+                "confidence": record["confidence"],
+                "created_at": record["updated_at"],
+            })
+    bulk_upsert(db, ArticlesNPTIReview.__table__, review_records)
+    db.commit()
+
+    if review_records:
+        logger.info(f"[NPTI 검수 대기] 확신도 {confidence_floor} 미만 {len(review_records)}건 등록")
+    return len(review_records)
+
+
+# 예측 -> DB upsert 1회, 성공한 기사만 ES 갱신 action 추가
+def classify_targets(db, targets, models, now, confidence_floor, actions):
+    results = predict_npti_batch([content for _, content, _ in targets], models,
+                                 [n_chars for _, _, n_chars in targets])
+    records = [
+        {"news_id": news_id, **result, "updated_at": now}
+        for (news_id, *_), result in zip(targets, results)
+    ]
+    upsert_articles_npti(db, records, confidence_floor)
+    for record in records:
+        actions.append(update_action(record["news_id"], {
+            "classified": True,
+            "npti": record["NPTI_code"],
+            "npti_confidence": record["confidence"],
+        }))
+    return len(records)
+
+
+# 배치 실패 시 기사 1건씩 다시 처리 (기존처럼 실패를 기사 단위로 격리)
+# - DB 오류(데드락/연결 끊김 등)는 일시적일 수 있으므로 classified=False 로 두고 다음 실행에서 재시도
+# - 그 외 오류(본문/예측 문제)만 에러 기록 후 classified_reason="error"
+def classify_one_by_one(db, targets, models, now, confidence_floor, actions):
+    count = 0
+    failed = 0
+    for target in targets:
+        news_id = target[0]
+        try:
+            count += classify_targets(db, [target], models, now, confidence_floor, actions)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"[기사 분류 보류] DB 오류로 다음 실행에서 재시도 ID: {news_id} / {e}")
+        except Exception as e:
+            db.rollback()
+            failed += 1
+            err_article(news_id, e)
+            actions.append(update_action(news_id, {"classified": True, "classified_reason": "error"}))
+    if failed:
+        logger.info(f"기사 분류 실패 에러로그 저장 완료 - {failed}건")
+    return count
+
+
+# 청크 1개 분류: 존재 확인(IN 1회) -> 예측(축별 1회) -> DB upsert 1회 -> ES bulk 1회
+def classify_chunk(db, chunk, models, now, confidence_floor=CONFIDENCE_FLOOR):
+    actions = []
+    targets = []
+
+    for row in chunk:
+        news_id = row["_id"]
+        content = row["_source"].get("content")
+        if not content:
+            actions.append(update_action(news_id, {"classified": True, "classified_reason": "empty_content"}))
+            continue
+        targets.append((news_id, content, row["_source"].get("n_chars")))
+
+    if targets:
+        ids = [news_id for news_id, *_ in targets]
+        existing_ids = {
+            r[0] for r in db.query(ArticlesNPTI.news_id).filter(ArticlesNPTI.news_id.in_(ids)).all()
+        }
+        if existing_ids:
+            logger.info(f"[기사 분류 스킵] 이미 존재: {len(existing_ids)}건")
+            for news_id in existing_ids:
+                actions.append(update_action(news_id, {"classified": True, "classified_reason": "duplicate"}))
+        targets = [target for target in targets if target[0] not in existing_ids]
+
+    count = 0
+    if targets:
+        try:
+            count = classify_targets(db, targets, models, now, confidence_floor, actions)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[기사 분류 실패] 배치 {len(targets)}건 / {e} -> 기사별 재시도")
+            count = classify_one_by_one(db, targets, models, now, confidence_floor, actions)
+
+    if actions:
+        helpers.bulk(es, actions, raise_on_error=False)
+    return count
+
+
+# NPTI 라벨링 함수(joblib 모델 활용, 배치 처리)
+def classify_npti_fast(batch_size: int = CLASSIFY_BATCH_SIZE, confidence_floor: float = CONFIDENCE_FLOOR):
     db = SessionLocal()
 
     try:
-        models = load_joblib()
-        model_ct, tfidf_ct = models["ct"]
-        model_fi, tfidf_fi = models["fi"]
-        model_pn, tfidf_pn = models["pn"]
-
+        models = load_models()
         now = datetime.now(timezone(timedelta(hours=9)))
 
         query = {
             "query": {"term": {"classified": False}},
-            "_source": ["content"]
+            "_source": ["content", "n_chars"]
         }
 
-        rows = helpers.scan(es, index=ES_INDEX, query=query)
+        rows = helpers.scan(es, index=ES_INDEX, query=query, size=batch_size)
         count = 0
 
-        for row in rows:
-            news_id = row["_id"]
-            content = row["_source"].get("content")
-
-            if not content:
-                es.update(
-                    index=ES_INDEX,
-                    id=news_id,
-                    body={"doc": {"classified": True, "classified_reason": "empty_content"}}
-                )
-                continue
-
-            exists = (
-                db.query(ArticlesNPTI)
-                .filter(ArticlesNPTI.news_id == news_id)
-                .first()
-            )
-            if exists:
-                logger.info(f"[기사 분류 스킵] 이미 존재: {news_id}")
-                continue
+        for chunk in chunked(rows, batch_size):
+            count += classify_chunk(db, chunk, models, now, confidence_floor)
 
-            try:
-                length_type = "L" if len(content) >= 1000 else "S"
-                ct = model_ct.predict(tfidf_ct.transform([content]))[0].upper()
-                fi = model_fi.predict(tfidf_fi.transform([content]))[0].upper()
-                pn = model_pn.predict(tfidf_pn.transform([content]))[0].upper()
-
-                npti_code = length_type + ct + fi + pn
-
-                record = ArticlesNPTI(
-                    news_id=news_id,
-                    length_type=length_type,
-                    article_type=ct,
-                    info_type=fi,
-                    view_type=pn,
-                    NPTI_code=npti_code,
-                    updated_at=now
-                )
-
-                db.add(record)
-                db.commit()
-                count += 1
-
-                es.update(
-                    index=ES_INDEX,
-                    id=news_id,
-                    body={
-                        "doc": {
-                            "classified": True,
-                            "npti": npti_code
-                        }
-                    }
-                )
-
-            except IntegrityError as e:
-                db.rollback()
-                logger.warning(f"[중복 기사] news_id={news_id}")
-                es.update(
-                    index=ES_INDEX,
-                    id=news_id,
-                    body={"doc": {"classified": True, "classified_reason": "duplicate"}}
-                )
-                continue
-
-            except Exception as e:
-                db.rollback()
-                logger.error(f"[기사 분류 실패] news_id={news_id} / {e}")
-                err_article(news_id, e)
-                logger.info(f"기사 분류 실패 에러로그 저장 완료 - {news_id}")
-                es.update(
-                    index=ES_INDEX,
-                    id=news_id,
-                    body={
-                        "doc": {
-                            "classified": True,
-                            "classified_reason": "error"
-                        }
-                    }
-                )
-                continue
         if count > 0:
             logger.info(f"NPTI 신규 기사 {count}건 분류 완료")
+        return count
 
     except Exception as e:
         logger.error(f"[news_NPTI.py] 기사 NPTI 전체 프로세스(joblib) 에러: {e}")
-        err_article(news_id if 'news_id' in locals() else "BATCH", e)
+        err_article("BATCH", e)
         logger.info(f"[news_NPTI.py] 에러 로그 저장 완료")
         db.rollback()
+        return 0
     finally:
         db.close()
 
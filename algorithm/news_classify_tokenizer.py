@@ -14,23 +14,16 @@ INSIGHT_KEYWORDS = {
     "우려","비판","반박","옹호","핵심","본질","원인","영향","파장"
 }
 
+FI_TOKEN_RE = re.compile(r"[가-힣]{2,}")
+
 def tokenizer_fi(text: str):
-    tokens = re.findall(r"[가-힣]{2,}", text)
-    result = []
+    tokens = FI_TOKEN_RE.findall(text)
 
-    text_has_fact_pattern = any(p in text for p in FACT_PATTERNS)
-    for t in tokens:
-        # Insight 키워드는 유지
-        if t in INSIGHT_KEYWORDS:
-            result.append(t)
-        # Fact 패턴이 있는 기사라면
-        # FACTUAL_VERBS도 제거하지 않고 유지
-        elif text_has_fact_pattern:
-            result.append(t)
-        # Fact 패턴 없고, 서술 동사면 제거
-        elif t in FACTUAL_VERBS:
-            continue
-        else:
-            result.append(t)
+    # Fact 패턴이 있는 기사라면
+    # FACTUAL_VERBS도 제거하지 않고 유지
+    if any(p in text for p in FACT_PATTERNS):
+        return tokens
 
-    return result
\ No newline at end of file
+    # Fact 패턴 없고, 서술 동사면 제거
+    # (Insight 키워드는 FACTUAL_VERBS와 겹치지 않으므로 항상 유지됨)
+    return [t for t in tokens if t not in FACTUAL_VERBS]
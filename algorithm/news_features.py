@@ -0,0 +1,179 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import numpy as np
+import scipy.sparse as sp
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+
+# 전처리/토크나이저 설정이 같은 벡터라이저는 하나의 토큰 스트림을 공유
+def stream_key(vectorizer):
+    return (
+        vectorizer.lowercase,
+        vectorizer.strip_accents,
+        vectorizer.preprocessor,
+        vectorizer.tokenizer,
+        vectorizer.token_pattern if vectorizer.tokenizer is None else None,
+    )
+
+
+def is_shareable(vectorizer):
+    return (
+        vectorizer.analyzer == "word"
+        and vectorizer.stop_words is None
+        and not vectorizer.binary
+    )
+
+
+# 카운트 행렬 -> TF-IDF (학습된 idf / 정규화 적용)
+def weight_counts(vectorizer, counts):
+    # 번들(mmap) 벡터라이저는 자체 구현, sklearn TfidfVectorizer는 내부 TfidfTransformer 사용
+    if hasattr(vectorizer, "weight_counts"):
+        return vectorizer.weight_counts(counts)
+    return vectorizer._tfidf.transform(counts, copy=False)
+
+
+class SharedTfidfFeatures:
+    """
+    학습된 TF-IDF 벡터라이저들(ct / fi / pn)의 vocabulary를 하나로 합쳐
+    기사당 토큰화 + n-gram 생성을 스트림별 1회만 수행하고,
+    같은 카운트 결과로 축별 TF-IDF 행렬을 만든다.
+    (ct, pn은 기본 word analyzer를 공유 / fi는 tokenizer_fi 스트림 1회)
+    """
+
+    def __init__(self, vectorizers: dict):
+        self.vectorizers = vectorizers
+        self.axes = list(vectorizers)
+        self.fallback_axes = []
+        self.streams = {}
+
+        for axis, vec in vectorizers.items():
+            if not is_shareable(vec):
+                self.fallback_axes.append(axis)
+                continue
+
+            key = stream_key(vec)
+            if key not in self.streams:
+                self.streams[key] = {
+                    "preprocess": vec.build_preprocessor(),
+                    "tokenize": vec.build_tokenizer(),
+                    "min_n": vec.ngram_range[0],
+                    "max_n": vec.ngram_range[1],
+                    "axes": [],
+                    "vocab": {},
+                }
+            stream = self.streams[key]
+            stream["min_n"] = min(stream["min_n"], vec.ngram_range[0])
+            stream["max_n"] = max(stream["max_n"], vec.ngram_range[1])
+            stream["axes"].append(axis)
+
+            # 통합 vocabulary: term -> [(axis, column), ...]
+            for term, col in vec.vocabulary_.items():
+                stream["vocab"].setdefault(term, []).append((axis, col))
+
+        logger.info(
+            f"[NPTI FEATURE] 공유 스트림 {len(self.streams)}개 "
+            f"({', '.join('/'.join(s['axes']) for s in self.streams.values())})"
+        )
+
+    @staticmethod
+    def ngrams(tokens, min_n, max_n):
+        n_tokens = len(tokens)
+        for n in range(min_n, min(max_n, n_tokens) + 1):
+            if n == 1:
+                yield from tokens
+            else:
+                for i in range(n_tokens - n + 1):
+                    yield " ".join(tokens[i:i + n])
+
+    def count_matrices(self, contents):
+        shareable_axes = [axis for axis in self.axes if axis not in self.fallback_axes]
+        indptr = {axis: [0] for axis in shareable_axes}
+        indices = {axis: [] for axis in shareable_axes}
+        values = {axis: [] for axis in shareable_axes}
+
+        for content in contents:
+            counts = {axis: {} for axis in shareable_axes}
+
+            for stream in self.streams.values():
+                tokens = stream["tokenize"](stream["preprocess"](content))
+                vocab = stream["vocab"]
+                for term in self.ngrams(tokens, stream["min_n"], stream["max_n"]):
+                    hit = vocab.get(term)
+                    if hit is None:
+                        continue
+                    for axis, col in hit:
+                        axis_counts = counts[axis]
+                        axis_counts[col] = axis_counts.get(col, 0) + 1
+
+            for axis in shareable_axes:
+                cols = sorted(counts[axis])
+                indices[axis].extend(cols)
+                values[axis].extend(counts[axis][c] for c in cols)
+                indptr[axis].append(len(indices[axis]))
+
+        matrices = {}
+        for axis in shareable_axes:
+            vec = self.vectorizers[axis]
+            matrices[axis] = sp.csr_matrix(
+                (
+                    np.asarray(values[axis], dtype=vec.dtype),
+                    np.asarray(indices[axis], dtype=np.int32),
+                    np.asarray(indptr[axis], dtype=np.int64),
+                ),
+                shape=(len(contents), len(vec.vocabulary_)),
+            )
+        return matrices
+
+    def transform(self, contents):
+        """
+        contents : 기사 본문 리스트
+        return   : {axis: TF-IDF 희소 행렬} (vectorizer.transform 결과와 동일)
+        """
+        contents = list(contents)
+        matrices = {}
+        for axis, counts in self.count_matrices(contents).items():
+            # TfidfVectorizer.transform과 동일하게 학습된 idf/정규화 적용
+            matrices[axis] = weight_counts(self.vectorizers[axis], counts)
+        for axis in self.fallback_axes:
+            matrices[axis] = self.vectorizers[axis].transform(contents)
+        return matrices
+
+
+# 기존 축별 벡터라이저 결과와 공유 추출 결과의 완전 일치 여부 확인
+def check_equivalence(shared: SharedTfidfFeatures, contents):
+    contents = list(contents)
+    matrices = shared.transform(contents)
+    all_equal = True
+    for axis, vec in shared.vectorizers.items():
+        expected = vec.transform(contents)
+        actual = matrices[axis]
+        equal = expected.shape == actual.shape and (expected != actual).nnz == 0
+        logger.info(f"[NPTI FEATURE] {axis} 일치 여부: {equal} (nnz={expected.nnz})")
+        all_equal = all_equal and equal
+    return all_equal
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+    from algorithm.news_NPTI import load_joblib
+
+    models = load_joblib()
+    shared = SharedTfidfFeatures({axis: models[axis][1] for axis in ("ct", "fi", "pn")})
+
+    df = pd.read_csv(r"NPTI_classify_test\sample_data_0107_v01.csv").dropna(subset=["content"])
+    docs = df["content"].tolist()
+
+    print(f"완전 일치: {check_equivalence(shared, docs)}")
+
+    t = time.time()
+    for axis in ("ct", "fi", "pn"):
+        models[axis][1].transform(docs)
+    print(f"축별 transform 3회: {time.time() - t:.3f}s")
+
+    t = time.time()
+    shared.transform(docs)
+    print(f"공유 transform 1회: {time.time() - t:.3f}s")
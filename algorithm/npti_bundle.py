@@ -0,0 +1,432 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import re
+import json
+import importlib
+import numpy as np
+import scipy.sparse as sp
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+# 번들 파일 포맷
+# [MAGIC 8byte][version uint32][header_len uint64][header JSON][padding][array data ...]
+# - header JSON : 축별 벡터라이저 설정 / 클래스 / voting 가중치 / 배열 위치(offset, dtype, shape)
+# - array data  : vocabulary(term), idf, NB/LR 가중치, LightGBM 트리 노드 배열 (64byte 정렬)
+# 로더는 파일 전체를 읽기 전용 mmap 으로 열기 때문에 여러 프로세스가 같은 페이지를 공유한다.
+BUNDLE_MAGIC = b"NPTIBNDL"
+BUNDLE_VERSION = 1
+BUNDLE_ALIGN = 64
+BUNDLE_AXES = ("ct", "fi", "pn")
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+model_dir = os.path.join(base_dir, "saved_models")
+BUNDLE_PATH = os.path.join(model_dir, f"npti_bundle_v{BUNDLE_VERSION}.bin")
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+ZERO_THRESHOLD = 1e-35  # LightGBM kZeroThreshold
+
+
+# =========================
+# Export (joblib 모델 -> 번들)
+# =========================
+def callable_path(func):
+    if func is None:
+        return None
+    return f"{func.__module__}:{func.__qualname__}"
+
+
+def export_vectorizer(vec):
+    if vec.analyzer != "word" or vec.stop_words is not None or vec.preprocessor is not None \
+            or vec.strip_accents is not None or vec.binary:
+        raise ValueError("번들은 기본 word analyzer 기반 TF-IDF만 지원합니다.")
+
+    terms = np.empty(len(vec.vocabulary_), dtype=object)
+    for term, col in vec.vocabulary_.items():
+        terms[col] = term
+
+    config = {
+        "lowercase": bool(vec.lowercase),
+        "token_pattern": vec.token_pattern if vec.tokenizer is None else None,
+        "tokenizer": callable_path(vec.tokenizer),
+        "ngram_range": list(vec.ngram_range),
+        "norm": vec.norm,
+        "use_idf": bool(vec.use_idf),
+        "sublinear_tf": bool(vec.sublinear_tf),
+        "dtype": np.dtype(vec.dtype).name,
+    }
+    arrays = {"terms": terms.astype(str)}
+    if vec.use_idf:
+        arrays["idf"] = np.asarray(vec.idf_, dtype=np.float64)
+    return config, arrays
+
+
+def flatten_lgbm(booster):
+    dump = booster.dump_model()
+    objective = dump["objective"].split()
+    num_class = int(dump["num_class"])
+
+    feature, threshold, left, right, default_left, missing, value, roots = [], [], [], [], [], [], [], []
+
+    def add_node(node):
+        idx = len(feature)
+        feature.append(-1); threshold.append(0.0); left.append(-1); right.append(-1)
+        default_left.append(False); missing.append(MISSING_NONE); value.append(0.0)
+
+        if "leaf_value" in node:
+            value[idx] = float(node["leaf_value"])
+            return idx
+
+        if node.get("decision_type", "<=") != "<=":
+            raise ValueError("번들은 수치형 분기(<=) 트리만 지원합니다.")
+        feature[idx] = int(node["split_feature"])
+        threshold[idx] = float(node["threshold"])
+        default_left[idx] = bool(node["default_left"])
+        missing[idx] = MISSING_TYPES[node["missing_type"]]
+        left[idx] = add_node(node["left_child"])
+        right[idx] = add_node(node["right_child"])
+        return idx
+
+    for tree in dump["tree_info"]:
+        roots.append(add_node(tree["tree_structure"]))
+
+    sigmoid = 1.0
+    for opt in objective[1:]:
+        if opt.startswith("sigmoid:"):
+            sigmoid = float(opt.split(":", 1)[1])
+
+    config = {"objective": objective[0], "num_class": num_class, "sigmoid": sigmoid}
+    arrays = {
+        "tree_roots": np.asarray(roots, dtype=np.int32),
+        "tree_feature": np.asarray(feature, dtype=np.int32),
+        "tree_threshold": np.asarray(threshold, dtype=np.float64),
+        "tree_left": np.asarray(left, dtype=np.int32),
+        "tree_right": np.asarray(right, dtype=np.int32),
+        "tree_default_left": np.asarray(default_left, dtype=np.bool_),
+        "tree_missing": np.asarray(missing, dtype=np.int8),
+        "tree_value": np.asarray(value, dtype=np.float64),
+    }
+    return config, arrays
+
+
+def export_model(model):
+    names = [name for name, _ in model.estimators]
+    if model.voting != "soft" or set(names) != {"nb", "lr", "lgbm"}:
+        raise ValueError("번들은 soft voting (nb + lr + lgbm) 모델만 지원합니다.")
+
+    nb = model.named_estimators_["nb"]
+    lr = model.named_estimators_["lr"]
+    lgbm = model.named_estimators_["lgbm"]
+
+    lgbm_config, arrays = flatten_lgbm(lgbm.booster_)
+    arrays.update({
+        "nb_feature_log_prob": np.asarray(nb.feature_log_prob_, dtype=np.float64),
+        "nb_class_log_prior": np.asarray(nb.class_log_prior_, dtype=np.float64),
+        "lr_coef": np.asarray(lr.coef_, dtype=np.float64),
+        "lr_intercept": np.asarray(lr.intercept_, dtype=np.float64),
+    })
+
+    weights = model.weights
+    config = {
+        "classes": [str(c) for c in model.classes_],
+        "estimators": names,
+        "weights": None if weights is None else [float(w) for w in weights],
+        "lgbm": lgbm_config,
+    }
+    return config, arrays
+
+
+def export_bundle(models: dict, path: str = BUNDLE_PATH):
+    """
+    models : {"ct": (model, tfidf), "fi": (...), "pn": (...)}  (load_joblib 결과)
+    path   : 저장할 번들 파일 경로
+    """
+    header = {"version": BUNDLE_VERSION, "axes": {}, "arrays": {}}
+    blobs = []
+    offset = 0
+
+    for axis in BUNDLE_AXES:
+        model, vec = models[axis]
+        vec_config, vec_arrays = export_vectorizer(vec)
+        model_config, model_arrays = export_model(model)
+        header["axes"][axis] = {"vectorizer": vec_config, "model": model_config}
+
+        for name, arr in {**vec_arrays, **model_arrays}.items():
+            arr = np.ascontiguousarray(arr)
+            key = f"{axis}/{name}"
+            header["arrays"][key] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            blobs.append(arr)
+            offset += arr.nbytes
+            offset += -offset % BUNDLE_ALIGN
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix_len = len(BUNDLE_MAGIC) + 4 + 8 + len(header_bytes)
+    data_start = prefix_len + (-prefix_len % BUNDLE_ALIGN)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(np.uint32(BUNDLE_VERSION).tobytes())
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - prefix_len))
+        for arr in blobs:
+            f.write(arr.tobytes())
+            f.write(b"\0" * (-arr.nbytes % BUNDLE_ALIGN))
+    os.replace(tmp_path, path)  # 실행 중인 워커가 반쯤 쓰인 파일을 읽지 않도록 교체
+    logger.info(f"[NPTI BUNDLE] 번들 저장 완료: {path} (v{BUNDLE_VERSION}, {os.path.getsize(path)} bytes)")
+    return path
+
+
+# =========================
+# Load (번들 -> mmap 모델)
+# =========================
+def import_callable(path):
+    module_name, qualname = path.split(":", 1)
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class BundleVectorizer:
+    """
+    번들에 저장된 TF-IDF 설정/가중치로 TfidfVectorizer.transform 과 같은 결과를 만든다.
+    (SharedTfidfFeatures 가 사용하는 속성/메서드를 그대로 제공)
+    """
+    analyzer = "word"
+    stop_words = None
+    preprocessor = None
+    strip_accents = None
+    binary = False
+
+    def __init__(self, config, arrays):
+        self.lowercase = config["lowercase"]
+        self.token_pattern = config["token_pattern"]
+        self.tokenizer = import_callable(config["tokenizer"]) if config["tokenizer"] else None
+        self.ngram_range = tuple(config["ngram_range"])
+        self.norm = config["norm"]
+        self.use_idf = config["use_idf"]
+        self.sublinear_tf = config["sublinear_tf"]
+        self.dtype = np.dtype(config["dtype"]).type
+        self.terms = arrays["terms"]
+        self.idf_ = arrays.get("idf")
+        self._vocabulary = None
+        self._features = None
+
+    @property
+    def vocabulary_(self):
+        # term 배열(mmap) -> dict 는 실제로 필요할 때 한 번만 생성
+        if self._vocabulary is None:
+            self._vocabulary = {term: col for col, term in enumerate(self.terms.tolist())}
+        return self._vocabulary
+
+    def build_preprocessor(self):
+        return str.lower if self.lowercase else (lambda doc: doc)
+
+    def build_tokenizer(self):
+        if self.tokenizer is not None:
+            return self.tokenizer
+        return re.compile(self.token_pattern).findall
+
+    def weight_counts(self, counts):
+        X = counts.astype(np.float64) if counts.dtype != np.float64 else counts
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.use_idf:
+            X.data *= self.idf_[X.indices]
+        if self.norm:
+            if self.norm == "l2":
+                norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            elif self.norm == "l1":
+                norms = np.asarray(abs(X).sum(axis=1)).ravel()
+            else:
+                raise ValueError(f"지원하지 않는 norm: {self.norm}")
+            norms[norms == 0.0] = 1.0
+            X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X
+
+    def transform(self, raw_documents):
+        if self._features is None:
+            from algorithm.news_features import SharedTfidfFeatures
+            self._features = SharedTfidfFeatures({"axis": self})
+        return self._features.transform(raw_documents)["axis"]
+
+
+def softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def binary_or_softmax(decision):
+    # 이진 분류(열 1개)는 sigmoid, 다중 분류는 softmax
+    if decision.shape[1] == 1:
+        pos = 1.0 / (1.0 + np.exp(-decision[:, 0]))
+        return np.column_stack([1.0 - pos, pos])
+    return softmax(decision)
+
+
+class BundleModel:
+    """
+    soft voting (MultinomialNB + LogisticRegression + LightGBM) 을 numpy 로 재현한 예측기.
+    sklearn / lightgbm import 없이 predict / predict_proba 를 제공한다.
+    """
+
+    def __init__(self, config, arrays):
+        self.classes_ = np.asarray(config["classes"])
+        self.estimators = config["estimators"]
+        self.weights = config["weights"]
+        self.lgbm = config["lgbm"]
+        self.arrays = arrays
+
+        # 트리가 실제로 사용하는 feature만 dense 로 꺼내기 위한 매핑
+        tree_feature = arrays["tree_feature"]
+        self.used_features = np.unique(tree_feature[tree_feature >= 0])
+        self.local_feature = np.where(
+            tree_feature >= 0, np.searchsorted(self.used_features, tree_feature), -1
+        ).astype(np.int32)
+
+    def nb_proba(self, X):
+        jll = X @ self.arrays["nb_feature_log_prob"].T + self.arrays["nb_class_log_prior"]
+        return softmax(np.asarray(jll))
+
+    def lr_proba(self, X):
+        decision = X @ self.arrays["lr_coef"].T + self.arrays["lr_intercept"]
+        return binary_or_softmax(np.asarray(decision))
+
+    def lgbm_raw(self, X):
+        a = self.arrays
+        roots = a["tree_roots"]
+        n_rows, n_trees = X.shape[0], len(roots)
+
+        dense = X[:, self.used_features].toarray() if len(self.used_features) else np.zeros((n_rows, 0))
+        rows = np.arange(n_rows)[:, None]
+        node = np.broadcast_to(roots, (n_rows, n_trees)).copy()
+
+        # 모든 행 x 모든 트리를 동시에 한 단계씩 내려감
+        while True:
+            feat = self.local_feature[node]
+            active = feat >= 0
+            if not active.any():
+                break
+            vals = dense[rows, np.where(active, feat, 0)]
+            go_left = vals <= a["tree_threshold"][node]
+
+            missing = a["tree_missing"][node]
+            is_missing = ((missing == MISSING_ZERO) & (np.abs(vals) <= ZERO_THRESHOLD)) | \
+                         ((missing != MISSING_NONE) & np.isnan(vals))
+            go_left = np.where(is_missing, a["tree_default_left"][node], go_left)
+
+            next_node = np.where(go_left, a["tree_left"][node], a["tree_right"][node])
+            node = np.where(active, next_node, node)
+
+        leaf = a["tree_value"][node]
+        num_class = self.lgbm["num_class"]
+        raw = np.zeros((n_rows, num_class))
+        for t in range(n_trees):  # LightGBM 과 같은 순서로 누적
+            raw[:, t % num_class] += leaf[:, t]
+        return raw
+
+    def lgbm_proba(self, X):
+        raw = self.lgbm_raw(X)
+        if self.lgbm["objective"] == "binary":
+            return binary_or_softmax(raw * self.lgbm["sigmoid"])
+        if self.lgbm["objective"] in ("multiclass", "softmax"):
+            return softmax(raw)
+        raise ValueError(f"지원하지 않는 LightGBM objective: {self.lgbm['objective']}")
+
+    def predict_proba(self, X):
+        X = sp.csr_matrix(X)
+        probas = {"nb": self.nb_proba, "lr": self.lr_proba, "lgbm": self.lgbm_proba}
+        collected = [probas[name](X) for name in self.estimators]
+        return np.average(collected, axis=0, weights=self.weights)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_bundle(path: str = BUNDLE_PATH):
+    """
+    번들을 읽기 전용 mmap 으로 열어 {"ct": (BundleModel, BundleVectorizer), ...} 반환
+    (load_joblib 과 같은 형태)
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    magic_len = len(BUNDLE_MAGIC)
+    if bytes(buf[:magic_len]) != BUNDLE_MAGIC:
+        raise ValueError(f"NPTI 번들 파일이 아닙니다: {path}")
+
+    version = int(np.frombuffer(buf, dtype=np.uint32, count=1, offset=magic_len)[0])
+    if version != BUNDLE_VERSION:
+        raise ValueError(f"번들 버전 불일치: file v{version} / loader v{BUNDLE_VERSION}")
+
+    header_len = int(np.frombuffer(buf, dtype=np.uint64, count=1, offset=magic_len + 4)[0])
+    header_start = magic_len + 12
+    header = json.loads(bytes(buf[header_start:header_start + header_len]).decode("utf-8"))
+    data_start = header_start + header_len
+    data_start += -data_start % BUNDLE_ALIGN
+
+    def view(spec):
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+        arr = np.frombuffer(buf, dtype=dtype, count=count, offset=data_start + spec["offset"])
+        return arr.reshape(spec["shape"])
+
+    models = {}
+    for axis, axis_config in header["axes"].items():
+        prefix = f"{axis}/"
+        arrays = {
+            key[len(prefix):]: view(spec)
+            for key, spec in header["arrays"].items() if key.startswith(prefix)
+        }
+        models[axis] = (
+            BundleModel(axis_config["model"], arrays),
+            BundleVectorizer(axis_config["vectorizer"], arrays),
+        )
+    logger.info(f"[NPTI BUNDLE] 번들 로드 완료 (mmap, v{version}): {path}")
+    return models
+
+
+# joblib 모델과 번들 모델의 예측 일치 여부 확인
+def check_bundle_parity(joblib_models, bundle_models, contents):
+    contents = list(contents)
+    all_equal = True
+    for axis in BUNDLE_AXES:
+        model, vec = joblib_models[axis]
+        b_model, b_vec = bundle_models[axis]
+
+        X = vec.transform(contents)
+        X_b = b_vec.transform(contents)
+        feature_diff = abs(X - X_b).max() if X.nnz else 0.0
+
+        proba = model.predict_proba(X)
+        proba_b = b_model.predict_proba(X_b)
+        same_label = np.array_equal(model.predict(X), b_model.predict(X_b))
+
+        logger.info(
+            f"[NPTI BUNDLE] {axis} 라벨 일치: {same_label} | "
+            f"최대 feature 차이: {feature_diff:.2e} | 최대 확률 차이: {np.abs(proba - proba_b).max():.2e}"
+        )
+        all_equal = all_equal and same_label
+    return all_equal
+
+
+if __name__ == "__main__":
+    # saved_models 의 joblib 6개 -> 번들 1개 변환 후 예측 일치 확인
+    import time
+    import pandas as pd
+    from algorithm.news_NPTI import load_joblib
+
+    joblib_models = load_joblib()
+    export_bundle(joblib_models)
+
+    t = time.time()
+    bundle_models = load_bundle()
+    print(f"번들 로드: {time.time() - t:.3f}s")
+
+    df = pd.read_csv(r"NPTI_classify_test\sample_data_0107_v01.csv").dropna(subset=["content"])
+    print(f"예측 일치: {check_bundle_parity(joblib_models, bundle_models, df['content'].tolist())}")
@@ -19,6 +19,7 @@ from sklearn.linear_model import LogisticRegression
 from lightgbm import LGBMClassifier
 from sklearn.metrics import classification_report, accuracy_score
 from algorithm.news_classify_tokenizer import tokenizer_fi
+from algorithm.npti_bundle import export_bundle
 
 logger = Logger().get_logger(__name__)
 
@@ -134,6 +135,13 @@ joblib.dump(tfidf_fi, os.path.join(save_dir, "tfidf_fi.joblib"))
 joblib.dump(tfidf_pn, os.path.join(save_dir, "tfidf_pn.joblib"))
 logger.info("NPTI 라벨링 학습 모델 및 벡터라이즈 저장 완료")
 
+# 서빙용 mmap 번들 (joblib 6개 -> 단일 파일)
+export_bundle({
+    "ct": (model_ct, tfidf_ct),
+    "fi": (model_fi, tfidf_fi),
+    "pn": (model_pn, tfidf_pn),
+})
+
 
 # NPTI 라벨링 함수(배치)
 def classify_npti():
@@ -1,4 +1,6 @@
 import os
+import math
+import time
 
 import pandas as pd
 import numpy as np
@@ -7,13 +9,18 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.neural_network import MLPClassifier
 from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
-from xgboost import XGBClassifier
+import json
+import xgboost as xgb
+from xgboost import XGBClassifier, XGBRegressor
 from sklearn.model_selection import GroupKFold, cross_validate, cross_val_score
 from sklearn.metrics import (
     make_scorer, precision_score, recall_score, f1_score,
     roc_auc_score, confusion_matrix, classification_report
 )
 from joblib import dump, load
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
 
 
 # joblib 저장
@@ -449,53 +456,341 @@ def final_best_model():
 #     return {"latest_update_time": latest_update_time}
 
 
-def model_predict_proba(logs:list): # [{},{}] 형태 input
-    model_path = os.path.join(save_dir, "model_read_efficiency.joblib")
-    model = load(model_path)
-    data = pd.DataFrame(logs)
-    data.rename(columns={"MMF_X_inf":"MMF_x_inf","MMF_Y_inf":"MMF_y_inf","MSF_Y_inf":"MSF_y_inf"}, inplace=True)
-    features = ['timestamp', 'MMF_y_inf', 'MMF_x_inf', 'MSF_y_inf', 'mouseX', 'mouseY', 'baseline']
-    y_prob = model.predict_proba(data[features])[:, 1]
-    data['pred_prob'] = y_prob
-    best_th = 0.39
-
-    # 성능 확인 용 통계 출력 (예측 분포)
-    print(f"전체 로그 수 : {len(data)}개")
-    print(f"확률 예측 로그 수 : {data['pred_prob'].sum()}개")
-    print(f"평균 읽음 확률 : {y_prob.mean():.4f}")
+READ_FEATURES = ['timestamp', 'MMF_y_inf', 'MMF_x_inf', 'MSF_y_inf', 'mouseX', 'mouseY', 'baseline']
+READ_BEST_TH = 0.39
+BEHAVIOR_COLUMNS = {"MMF_X_inf":"MMF_x_inf","MMF_Y_inf":"MMF_y_inf","MSF_Y_inf":"MSF_y_inf"}
+
+TEACHER_PATH = os.path.join(save_dir, "model_read_efficiency.joblib")
+STUDENT_PATH = os.path.join(save_dir, "model_read_efficiency_student.json")
+STUDENT_REPORT_PATH = os.path.join(save_dir, "model_read_efficiency_student_report.json")
+
+# 서빙 모델 선택: auto(학생 모델 파일이 있으면 학생, 없으면 앙상블) / student / teacher
+READ_MODEL = os.environ.get("READ_MODEL", "auto")
+
+
+class StudentReadModel:
+    """증류된 XGBoost 부스터 (JSON) -> predict_proba 인터페이스"""
+
+    def __init__(self, booster):
+        self.booster = booster
+
+    @classmethod
+    def load(cls, path: str = STUDENT_PATH):
+        booster = xgb.Booster()
+        booster.load_model(path)
+        booster.set_param({"nthread": 1})  # 요청당 소량 샘플 -> 스레드 전환 비용이 더 큼
+        return cls(booster)
+
+    def predict_proba(self, x):
+        p = self.booster.inplace_predict(np.asarray(x, dtype=np.float32))
+        return np.column_stack([1 - p, p])
+
+
+_read_model = None
+
+
+def get_read_efficiency_model():
+    # 읽음 예측 모델은 프로세스당 1번만 로드
+    global _read_model
+    if _read_model is None:
+        if READ_MODEL != "teacher" and os.path.exists(STUDENT_PATH):
+            try:
+                _read_model = StudentReadModel.load(STUDENT_PATH)
+                logger.info("[읽음 예측] 증류 모델 사용")
+            except Exception as e:
+                logger.warning(f"[읽음 예측] 증류 모델 로드 실패 -> 앙상블 사용: {e}")
+        elif READ_MODEL == "student":
+            logger.warning(f"[읽음 예측] 증류 모델 파일 없음 -> 앙상블 사용: {STUDENT_PATH}")
+        if _read_model is None:
+            _read_model = load(TEACHER_PATH)
+    return _read_model
+
+
+def behavior_frame(groups):
+    # 기사별 행동 로그([{},{}] 또는 packed 컬럼 dict) 여러 개 -> DataFrame 1개
+    # 입력 순서 유지: 연속된 [{},{}] 로그는 모아서 DataFrame 1개로 변환
+    rows, frames = [], []
+    for group in groups:
+        if isinstance(group, dict):
+            if rows:
+                frames.append(pd.DataFrame(rows))
+                rows = []
+            frames.append(pd.DataFrame(group))
+        else:
+            rows.extend(group)
+    if rows:
+        frames.append(pd.DataFrame(rows))
+    if not frames:
+        return pd.DataFrame(columns=['user_id', 'news_id'] + READ_FEATURES)
+    data = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return data.rename(columns=BEHAVIOR_COLUMNS)
+
+
+def segment_reading_efficiency(pair_ids, timestamps, probs, threshold: float = READ_BEST_TH):
+    """
+    (user, news) 여러 쌍의 읽기 효율을 NumPy 구간 연산으로 한 번에 계산
+    pair_ids: 0 ~ n_pairs-1 정수, (pair_ids, timestamps) 오름차순 정렬된 샘플 배열
+    - 같은 (pair, timestamp) 구간의 확률 평균 (np.add.reduceat)
+    - pair 별 threshold 이상 초 수 (np.bincount) / 최대 timestamp (np.maximum.reduceat)
+    return: dwell_time, final_read_time, reading_efficiency (pair_id 순서 배열)
+    """
+    pair_ids = np.asarray(pair_ids)
+    timestamps = np.asarray(timestamps)
+    probs = np.asarray(probs, dtype=float)
+    n = len(pair_ids)
+    if n == 0:
+        return np.empty(0, dtype=timestamps.dtype), np.empty(0, dtype=np.int64), np.empty(0)
 
     # timestamp 중복 시 확률 평균값 이용
-    df_unique = data.groupby(['user_id', 'news_id', 'timestamp'], as_index=False)['pred_prob'].mean()
+    new_sample = np.empty(n, dtype=bool)
+    new_sample[0] = True
+    new_sample[1:] = (pair_ids[1:] != pair_ids[:-1]) | (timestamps[1:] != timestamps[:-1])
+    starts = np.flatnonzero(new_sample)
+    counts = np.diff(np.append(starts, n))
+    mean_prob = np.add.reduceat(probs, starts) / counts
+
+    sample_pair = pair_ids[starts]
+    n_pairs = int(sample_pair[-1]) + 1
+    final_read_time = np.bincount(sample_pair, weights=mean_prob >= threshold, minlength=n_pairs).astype(np.int64)
+
+    pair_starts = np.flatnonzero(np.r_[True, sample_pair[1:] != sample_pair[:-1]])
+    dwell_time = np.zeros(n_pairs, dtype=timestamps.dtype)
+    dwell_time[sample_pair[pair_starts]] = np.maximum.reduceat(timestamps[starts], pair_starts)
+
+    dwell = dwell_time.astype(float)
+    reading_efficiency = np.divide(final_read_time, dwell, out=np.zeros(n_pairs), where=dwell > 0)
+    return dwell_time, final_read_time, reading_efficiency
+
+
+def frame_reading_efficiency(data: pd.DataFrame, probs):
+    # DataFrame[user_id, news_id, timestamp] + 샘플별 읽음 확률 -> (user, news) 별 결과 (입력 등장 순서)
+    # user / news 를 각각 정수 코드로 바꾼 뒤 (user, news) 쌍 코드 생성 (문자열 MultiIndex 보다 빠름)
+    user_codes, users = pd.factorize(data['user_id'])
+    news_codes, news = pd.factorize(data['news_id'])
+    pair_ids, pair_keys = pd.factorize(user_codes.astype(np.int64) * len(news) + news_codes)
+    timestamps = data['timestamp'].to_numpy()
+    order = np.lexsort((timestamps, pair_ids))
+    dwell_time, final_read_time, reading_efficiency = segment_reading_efficiency(
+        pair_ids[order], timestamps[order], np.asarray(probs)[order]
+    )
+    return pd.DataFrame({
+        'user_id': np.asarray(users)[pair_keys // len(news)],
+        'news_id': np.asarray(news)[pair_keys % len(news)],
+        'dwell_time': dwell_time,
+        'final_read_time': final_read_time,
+        'reading_efficiency': reading_efficiency,
+    })
+
+
+def batch_reading_efficiency(groups):
+    """
+    여러 기사의 행동 로그를 한 번에 채점 (model_predict_proba 의 배치 버전)
+    - 모든 샘플을 predict_proba 1번으로 예측
+    - (user, news) 별 dwell_time / final_read_time 은 segment_reading_efficiency 로 계산
+    return: DataFrame[user_id, news_id, dwell_time, final_read_time, reading_efficiency]
+    """
+    data = behavior_frame(groups)
+    if data.empty:
+        return pd.DataFrame(columns=['user_id', 'news_id', 'dwell_time', 'final_read_time', 'reading_efficiency'])
+    probs = get_read_efficiency_model().predict_proba(data[READ_FEATURES])[:, 1]
+    return frame_reading_efficiency(data, probs)
 
-    # reading time 및 efficiency 계산
+
+def pandas_reading_efficiency(data: pd.DataFrame, probs, best_th: float = READ_BEST_TH):
+    # 기존 model_predict_proba 의 pandas 집계 (benchmark_reading_efficiency 비교 기준)
+    data = data.assign(pred_prob=probs)
+    df_unique = data.groupby(['user_id', 'news_id', 'timestamp'], as_index=False)['pred_prob'].mean()
     result = df_unique.groupby(['user_id', 'news_id']).agg(
         dwell_time=('timestamp', 'max'),
         final_read_time=('pred_prob', lambda x: (x >= best_th).sum())
     ).reset_index()
-
     result['reading_efficiency'] = result.apply(
         lambda row: row['final_read_time'] / row['dwell_time'] if row['dwell_time'] > 0 else 0.0,
         axis=1
     )
+    return result
+
+
+def benchmark_reading_efficiency(n_pairs: int = 5000, samples_per_pair: int = 60, repeat: int = 3):
+    """기존 pandas 집계 vs NumPy 구간 연산 (모델 예측 제외, 집계 시간만 비교)"""
+    rng = np.random.default_rng(0)
+    n = n_pairs * samples_per_pair
+    pair = rng.integers(0, n_pairs, n)
+    data = pd.DataFrame({
+        'user_id': np.char.add('user', (pair % 97).astype(str)),
+        'news_id': np.char.add('news', pair.astype(str)),
+        'timestamp': rng.integers(1, samples_per_pair, n),  # 일부 timestamp 중복 포함
+    })
+    probs = rng.random(n)
+
+    timings = {}
+    for name, func in [("pandas", pandas_reading_efficiency), ("numpy", frame_reading_efficiency)]:
+        best = None
+        for _ in range(repeat):
+            t = time.time()
+            result = func(data, probs)
+            elapsed = time.time() - t
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = (best, result)
+
+    expected = timings["pandas"][1].set_index(['user_id', 'news_id']).sort_index()
+    actual = timings["numpy"][1].set_index(['user_id', 'news_id']).sort_index()
+    same = (expected.index.equals(actual.index)
+            and (expected['dwell_time'].to_numpy() == actual['dwell_time'].to_numpy()).all()
+            and (expected['final_read_time'].to_numpy() == actual['final_read_time'].to_numpy()).all()
+            and np.allclose(expected['reading_efficiency'], actual['reading_efficiency']))
+    print(f"샘플 {n}개 / (user, news) {len(expected)}쌍")
+    print(f"pandas : {timings['pandas'][0]:.3f}s")
+    print(f"numpy  : {timings['numpy'][0]:.3f}s ({timings['pandas'][0] / timings['numpy'][0]:.1f}배)")
+    print(f"결과 동일 : {same}")
+    return same
+
+
+# 기사 유형별로 어느 쪽 점수를 올리고 내리는지 (축, 기준 코드, 기준 코드일 때 +, 아닐 때 +)
+AXIS_RULES = [
+    ("length_type", "L", "long_score", "short_score"),
+    ("article_type", "C", "content_score", "tale_score"),
+    ("info_type", "F", "fact_score", "insight_score"),
+    ("view_type", "P", "positive_score", "negative_score"),
+]
+
+
+def interest_scores(reading_efficiency, n_words):
+    # 읽기 효율 x 기사 길이 가중치 (500단어 이상이면 가중치 1) -> 0 ~ 10점
+    eff = np.asarray(reading_efficiency, dtype=float)
+    n = np.asarray(n_words, dtype=float)
+    return np.minimum(1, eff * (np.log(n + 1) / math.log(501))) * 10
+
+
+def fold_interest_scores(scores: dict, article_types: dict, interest):
+    """
+    축별 점수에 기사들의 interest_score 를 한 번에 반영
+    scores: {"long_score": ..., ...} (제자리 갱신 후 반환)
+    article_types: {"length_type": [...], "article_type": [...], ...} (interest 와 같은 순서)
+    """
+    interest = np.asarray(interest, dtype=float)
+    for type_col, code, primary, opposite in AXIS_RULES:
+        sign = np.where(np.asarray(article_types[type_col]) == code, 1.0, -1.0)
+        delta = float((sign * interest).sum())
+        scores[primary] += delta
+        scores[opposite] -= delta
+    return scores
+
+
+def model_predict_proba(logs): # [{},{}] 형태 또는 packed 컬럼 dict {"user_id":, "news_id":, "timestamp": ndarray, ...} input
+    data = behavior_frame([logs])
+    y_prob = get_read_efficiency_model().predict_proba(data[READ_FEATURES])[:, 1]
+
+    # 성능 확인 용 통계 (예측 분포)
+    logger.debug(f"전체 로그 수 : {len(data)}개 | 확률 합 : {y_prob.sum():.2f} | 평균 읽음 확률 : {y_prob.mean():.4f}")
+
+    # timestamp 중복 시 확률 평균 -> reading time 및 efficiency 계산
+    final_res = frame_reading_efficiency(data, y_prob).iloc[0].to_dict()
+    logger.debug(f"User ID: {final_res['user_id']} | News ID: {final_res['news_id']} | "
+                 f"Dwell Time: {final_res['dwell_time']} | Pred Read Time: {final_res['final_read_time']}s | "
+                 f"Reading Efficiency: {final_res['reading_efficiency']}")
+    return final_res
 
-    # 최종 결과 반환
-    # 8. 최종 결과물 출력 (final_best_model 스타일)
-    final_res = result.iloc[0].to_dict()
 
-    print(f"===== Analysis Result =====")
-    print(f"User ID: {final_res['user_id']}")
-    print(f"News ID: {final_res['news_id']}")
-    print(f"Dwell Time: {final_res['dwell_time']}")
-    print(f"Pred Read Time: {final_res['final_read_time']}s")
-    print(f"News ID: {final_res['reading_efficiency']}")
+def augment_features(x: pd.DataFrame, n_copies: int, noise: float = 0.05, seed: int = 45):
+    # 증류용 입력 확장: 학습 샘플에 특성별 표준편차 비례 잡음을 더한 복사본 (교사 확률로 라벨링)
+    rng = np.random.default_rng(seed)
+    scale = x.std().to_numpy() * noise
+    copies = [x]
+    for _ in range(n_copies):
+        jitter = x.to_numpy() + rng.normal(0, 1, x.shape) * scale
+        copies.append(pd.DataFrame(jitter, columns=x.columns).clip(x.min(), x.max(), axis=1))
+    return pd.concat(copies, ignore_index=True)
+
+
+def read_model_parity(teacher, student, test_df: pd.DataFrame, best_th: float = READ_BEST_TH):
+    """
+    교사(앙상블) vs 학생 모델 비교
+    - 라벨 기준 ROC AUC, 교사 확률과의 차이, threshold 판정 일치율
+    - (user, news) 별 reading_efficiency 차이 (실제 서빙 지표)
+    - 샘플당 예측 시간
+    """
+    x_test = test_df[READ_FEATURES]
+    y_test = test_df['read'].astype(int)
 
-    return final_res
+    timings = {}
+    probs = {}
+    for name, model in [("teacher", teacher), ("student", student)]:
+        t = time.time()
+        probs[name] = model.predict_proba(x_test)[:, 1]
+        timings[name] = (time.time() - t) / max(len(x_test), 1) * 1e6
+
+    diff = np.abs(probs["teacher"] - probs["student"])
+    eff = {name: frame_reading_efficiency(test_df, p)['reading_efficiency'].to_numpy() for name, p in probs.items()}
+    eff_diff = np.abs(eff["teacher"] - eff["student"])
+    return {
+        "n_test": int(len(x_test)),
+        "auc_teacher": round(float(roc_auc_score(y_test, probs["teacher"])), 4),
+        "auc_student": round(float(roc_auc_score(y_test, probs["student"])), 4),
+        "prob_mae": round(float(diff.mean()), 4),
+        "prob_max_diff": round(float(diff.max()), 4),
+        "read_agreement": round(float(((probs["teacher"] >= best_th) == (probs["student"] >= best_th)).mean()), 4),
+        "efficiency_mae": round(float(eff_diff.mean()), 4),
+        "efficiency_max_diff": round(float(eff_diff.max()), 4),
+        "us_per_sample_teacher": round(timings["teacher"], 3),
+        "us_per_sample_student": round(timings["student"], 3),
+    }
+
+
+def distill_read_model(df: pd.DataFrame = None, teacher=None, n_estimators: int = 300, max_depth: int = 4,
+                       augment: int = 3, save: bool = True):
+    """
+    final_best_model 의 soft voting 앙상블(교사) -> 작은 XGBoost 회귀 모델(학생) 증류
+    - 학생은 7개 특성에서 교사의 읽음 확률을 직접 학습 (reg:logistic)
+    - P1 테스트셋으로 parity 리포트 작성 후 부스터 JSON + 리포트 저장
+    """
+    print("\n" + "=" * 60)
+    print(">>> [증류] Soft Voting 앙상블 -> XGBoost 학생 모델")
+    print("=" * 60)
+
+    if df is None:
+        try:
+            df = pd.read_csv("second_feature_labeled.csv")
+        except FileNotFoundError:
+            print("파일 없음")
+            return None, None
+    if teacher is None:
+        teacher = load(TEACHER_PATH)
+
+    train_df = df[df['user_id'] != 'P1'].copy()
+    test_df = df[df['user_id'] == 'P1'].copy()
+
+    x_distill = augment_features(train_df[READ_FEATURES], augment)
+    soft_label = teacher.predict_proba(x_distill)[:, 1]
+
+    student = XGBRegressor(
+        n_estimators=n_estimators,
+        learning_rate=0.1,
+        max_depth=max_depth,
+        objective='reg:logistic',
+        n_jobs=-1,
+        random_state=45
+    )
+    print(f"학생 모델 학습 중... (증류 샘플 {len(x_distill)}개)")
+    student.fit(x_distill.to_numpy(dtype=np.float32), soft_label)
+    student_model = StudentReadModel(student.get_booster())
 
+    report = read_model_parity(teacher, student_model, test_df)
+    report.update({"n_estimators": n_estimators, "max_depth": max_depth, "n_distill": int(len(x_distill))})
+    print(json.dumps(report, indent=2, ensure_ascii=False))
 
+    if save:
+        student.get_booster().save_model(STUDENT_PATH)
+        with open(STUDENT_REPORT_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"저장 완료 : {STUDENT_PATH}")
+    return student_model, report
 
 
 if __name__ == "__main__":
     # xgb_training()
     # voting_training()
     # solution_1_basic_stacking()
-    final_best_model()
\ No newline at end of file
+    # benchmark_reading_efficiency()
+    final_best_model()
+    # distill_read_model()
\ No newline at end of file
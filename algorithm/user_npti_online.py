@@ -0,0 +1,395 @@
+import os
+import time
+import sqlite3
+import threading
+import itertools
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+from logger import Logger
+from database import SessionLocal
+from algorithm.user_NPTI import batch_reading_efficiency, interest_scores, fold_interest_scores, AXIS_RULES
+from db_index.db_articles_NPTI import ArticlesNPTI
+from db_index.db_user_npti import get_user_npti_info, insert_user_npti, build_user_npti_params, \
+    stored_user_npti_params, npti_code_from_scores, NPTI_SCORE_NAMES
+from elasticsearch_index.es_raw import news_word_counts
+from elasticsearch_index.es_user_behavior import search_user_behavior, group_behavior_docs
+
+logger = Logger().get_logger(__name__)
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NPTI_STATE_PATH = os.path.join(base_dir, "user_npti_cache", "user_npti_online.sqlite3")
+NPTI_PERSIST_INTERVAL = 3600   # 주기 저장 작업 실행 간격(초)
+NPTI_PERSIST_MAX_AGE = 86400   # 코드가 안 바뀐 사용자는 마지막 저장 후 이 시간(초)이 지나야 user_npti 저장
+ARTICLE_STATE_TTL = 86400      # 이 시간(초) 동안 새 로그가 없는 기사 상태는 정리
+NPTI_BATCH_ARTICLES = 200      # 한 번에 채점하는 기사 수 (메모리 상한)
+UNTRACKED_RECHECK = 600        # user_npti 기록이 없던 사용자는 이 시간(초) 동안 다시 조회하지 않음
+KST = timezone(timedelta(hours=9))
+
+
+def kst_iso(value):
+    # user_npti.updated_at(KST, naive datetime) -> ES stored_time 과 같은 형식
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=KST)
+    return value.isoformat(timespec="seconds")
+
+
+def snapshot_is_newer(updated_at, persisted_at):
+    # user_npti.updated_at(KST) 이 마지막 온라인 저장 시각보다 나중 = 재검사 등 다른 경로로 저장된 기록
+    if updated_at is None or persisted_at is None:
+        return False
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=KST)
+    return updated_at.timestamp() > persisted_at
+
+
+def article_stats(db, groups):
+    """
+    기사별 행동 로그 -> DataFrame[user_id, news_id, dwell_time, final_read_time, n_word, types]
+    (모델 예측 1번 / _mget 1번 / articles_NPTI IN 쿼리 1번, articles_NPTI 에 없는 기사는 제외)
+    """
+    result = batch_reading_efficiency(groups)
+    if result.empty:
+        return result
+    news_ids = result['news_id'].unique().tolist()
+    n_words = news_word_counts(news_ids)
+    rows = {row.news_id: row for row in db.query(ArticlesNPTI).filter(ArticlesNPTI.news_id.in_(news_ids)).all()}
+    missing = [news_id for news_id in news_ids if news_id not in rows]
+    if missing:
+        logger.warning(f"articles_NPTI 에 없는 기사 {len(missing)}건 제외 : {missing[:5]}")
+    result = result[result['news_id'].isin(list(rows))].copy()
+    result['n_word'] = [n_words.get(news_id, 0) for news_id in result['news_id']]
+    # 기사 유형 4글자 (AXIS_RULES 순서: length / article / info / view)
+    result['types'] = ["".join(getattr(rows[news_id], type_col) or "-" for type_col, *_ in AXIS_RULES)
+                       for news_id in result['news_id']]
+    return result
+
+
+def article_interest(read, dwell, n_word):
+    read = np.asarray(read, dtype=float)
+    dwell = np.asarray(dwell, dtype=float)
+    efficiency = np.divide(read, dwell, out=np.zeros_like(read), where=dwell > 0)
+    return interest_scores(efficiency, n_word)
+
+
+def fold_types(scores: dict, types: list, interest):
+    article_types = {type_col: [t[i] for t in types] for i, (type_col, *_) in enumerate(AXIS_RULES)}
+    fold_interest_scores(scores, article_types, interest)
+    # 누적값은 반올림 없이 유지하되 0~100 범위로 제한 (한쪽으로 무한히 쌓이면 코드가 다시 안 바뀜)
+    for name in NPTI_SCORE_NAMES:
+        scores[name] = min(100.0, max(0.0, float(scores[name])))
+    return scores
+
+
+class UserNPTIOnline:
+    """
+    사용자 NPTI 온라인 갱신기
+    - 사용자별 8개 축 점수 누적값과 기사별 읽기 상태를 sqlite(키: user_id) 에 보관 -> uvicorn 워커 간 공유
+    - 처음 보는 사용자는 마지막 user_npti 이후 로그를 1번만 재생해서 시작값을 만든다
+    - 행동 로그 버퍼가 flush 할 때마다 그 묶음만 채점해서 기사별 interest 변화량을 누적값에 반영
+    - NPTI 코드가 바뀌면 즉시, 아니면 NPTI_PERSIST_MAX_AGE 가 지난 뒤 user_npti 에 새 기록 저장
+    - sqlite 누적값은 반올림 전 값 그대로 유지, user_npti 에는 finalize 된 값만 저장
+    - NPTI 재검사로 user_npti 가 새로 저장되면 reset_user -> 다음 flush 에서 새 기록부터 다시 시작
+    """
+
+    def __init__(self, state_path: str = NPTI_STATE_PATH):
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.pid = None
+        self._db = None
+        self.untracked = {}  # NPTI 검사 전 사용자 -> 마지막 확인 시각 (flush 마다 MySQL 재조회 방지)
+        self.stats = {"folded_batches": 0, "seeded_users": 0, "persisted": 0, "flips": 0}
+
+    @property
+    def db(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._db = None
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            self._db = sqlite3.connect(self.state_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS user_axis (user_id TEXT PRIMARY KEY, "
+                f"{', '.join(f'{name} REAL' for name in NPTI_SCORE_NAMES)}, "
+                f"npti_code TEXT, dirty INTEGER, persisted_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS user_article (user_id TEXT, news_id TEXT, read REAL, dwell REAL, "
+                "n_word INTEGER, types TEXT, interest REAL, seen_at REAL, PRIMARY KEY (user_id, news_id))"
+            )
+        return self._db
+
+    @contextmanager
+    def transaction(self):
+        # 다른 워커와 같은 사용자를 동시에 갱신하지 않도록 쓰기 잠금을 먼저 잡는다
+        with self.lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # ---------- 저장소 ----------
+    def load_user(self, db, user_id):
+        row = db.execute(
+            f"SELECT {', '.join(NPTI_SCORE_NAMES)}, npti_code, dirty, persisted_at FROM user_axis WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        n = len(NPTI_SCORE_NAMES)
+        return {"scores": dict(zip(NPTI_SCORE_NAMES, row[:n])), "npti_code": row[n], "dirty": row[n + 1],
+                "persisted_at": row[n + 2]}
+
+    def save_user(self, db, user_id, state):
+        db.execute(
+            f"INSERT OR REPLACE INTO user_axis (user_id, {', '.join(NPTI_SCORE_NAMES)}, npti_code, dirty, persisted_at) "
+            f"VALUES ({', '.join('?' * (len(NPTI_SCORE_NAMES) + 4))})",
+            (user_id, *[state["scores"][name] for name in NPTI_SCORE_NAMES],
+             state["npti_code"], state["dirty"], state["persisted_at"])
+        )
+
+    def save_articles(self, db, user_id, result, interest, now):
+        db.executemany(
+            "INSERT OR REPLACE INTO user_article (user_id, news_id, read, dwell, n_word, types, interest, seen_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, news_id, float(read), float(dwell), int(n_word), types, float(value), now)
+             for news_id, read, dwell, n_word, types, value in zip(
+                result['news_id'], result['final_read_time'], result['dwell_time'], result['n_word'],
+                result['types'], interest)]
+        )
+
+    # ---------- 시작값 (1회 재생) ----------
+    def seed_user(self, session, user_id, end_timestamp=None):
+        """
+        마지막 user_npti 기록 + 그 이후 ~ end_timestamp 전까지의 로그를 재생해서 누적값 생성
+        (user_npti 기록이 없는 사용자 = NPTI 검사 전이므로 추적하지 않음 -> None)
+        """
+        snapshot = get_user_npti_info(session, user_id)
+        if not snapshot:
+            return None
+        scores = {name: float(snapshot.get(name) or 0.0) for name in NPTI_SCORE_NAMES}
+        start_timestamp = kst_iso(snapshot.get("updated_at"))
+
+        now = time.time()
+        seeded = []
+        behavior_log_per_news = search_user_behavior(user_id, start_timestamp, end_timestamp)
+        while True:
+            batch = [log for log in itertools.islice(behavior_log_per_news, NPTI_BATCH_ARTICLES) if log]
+            if not batch:
+                break
+            result = article_stats(session, batch)
+            if result.empty:
+                continue
+            interest = article_interest(result['final_read_time'], result['dwell_time'], result['n_word'])
+            fold_types(scores, result['types'].tolist(), interest)
+            seeded.append((result, interest))
+
+        state = {"scores": scores, "npti_code": snapshot.get("npti_code"), "dirty": int(bool(seeded)),
+                 "persisted_at": now}
+        with self.transaction() as db:
+            if self.load_user(db, user_id) is None:  # 다른 워커가 먼저 만들었으면 그쪽 사용
+                self.save_user(db, user_id, state)
+                for result, interest in seeded:
+                    self.save_articles(db, user_id, result, interest, now)
+            state = self.load_user(db, user_id)
+        self.stats["seeded_users"] += 1
+        logger.info(f"[NPTI 온라인] 시작값 생성 User: {user_id} | 기사 {sum(len(r) for r, _ in seeded)}개 재생")
+        return state
+
+    # ---------- flush 묶음 반영 ----------
+    def fold_docs(self, docs: list):
+        """행동 로그 버퍼 on_flush 콜백 (스레드에서 호출)"""
+        groups = group_behavior_docs(docs)
+        if not groups:
+            return
+        first_stored = {}
+        for doc in docs:
+            stored_time = doc.get("stored_time")
+            if stored_time and (doc.get("user_id") not in first_stored or stored_time < first_stored[doc["user_id"]]):
+                first_stored[doc["user_id"]] = stored_time
+        session = SessionLocal()
+        try:
+            self.fold_groups(session, groups, first_stored)
+        finally:
+            session.close()
+
+    def fold_groups(self, session, groups: dict, first_stored: dict):
+        by_user = {}
+        for (user_id, news_id), logs in groups.items():
+            by_user.setdefault(user_id, []).append(logs)
+
+        # 처음 보는 사용자: 이번 묶음 이전 로그까지만 재생 (이번 묶음은 아래에서 반영)
+        tracked = []
+        checked_at = time.time()
+        for user_id, user_groups in by_user.items():
+            with self.lock:
+                known = self.load_user(self.db, user_id) is not None
+            if not known:
+                if checked_at - self.untracked.get(user_id, 0) < UNTRACKED_RECHECK:
+                    continue
+                if self.seed_user(session, user_id, end_timestamp=first_stored.get(user_id)) is None:
+                    self.untracked[user_id] = checked_at
+                    continue
+                self.untracked.pop(user_id, None)
+            tracked.extend(user_groups)
+        if not tracked:
+            return
+
+        result = article_stats(session, tracked)
+        now = time.time()
+        flipped = []
+        with self.transaction() as db:
+            for user_id, user_result in result.groupby('user_id', sort=False):
+                state = self.load_user(db, user_id)
+                if state is None:
+                    continue
+                news_ids = user_result['news_id'].tolist()
+                prev = {row[0]: row[1:] for row in db.execute(
+                    f"SELECT news_id, read, dwell, interest FROM user_article WHERE user_id = ? "
+                    f"AND news_id IN ({','.join('?' * len(news_ids))})", (user_id, *news_ids)
+                ).fetchall()}
+                # 같은 기사의 이전 비콘과 합쳐서 기사 interest 를 다시 계산하고 변화량만 반영
+                user_result = user_result.copy()
+                user_result['final_read_time'] = [read + prev.get(n, (0, 0, 0))[0] for n, read in
+                                                  zip(news_ids, user_result['final_read_time'])]
+                user_result['dwell_time'] = [max(dwell, prev.get(n, (0, 0, 0))[1]) for n, dwell in
+                                             zip(news_ids, user_result['dwell_time'])]
+                interest = article_interest(user_result['final_read_time'], user_result['dwell_time'],
+                                            user_result['n_word'])
+                delta = interest - np.array([prev.get(n, (0, 0, 0))[2] for n in news_ids])
+                fold_types(state["scores"], user_result['types'].tolist(), delta)
+                self.save_articles(db, user_id, user_result, interest, now)
+
+                state["dirty"] = 1
+                if npti_code_from_scores(state["scores"]) != state["npti_code"]:
+                    flipped.append(user_id)
+                self.save_user(db, user_id, state)
+        self.stats["folded_batches"] += 1
+
+        # NPTI 코드가 바뀐 사용자는 바로 저장
+        for user_id in flipped:
+            self.stats["flips"] += 1
+            self.persist_user(session, user_id)
+
+    # ---------- user_npti 저장 ----------
+    def persist_user(self, session, user_id, force=False):
+        """누적값 -> user_npti 새 기록 (finalize 된 점수). 누적값은 반올림 전 값을 그대로 이어서 사용"""
+        with self.lock:
+            state = self.load_user(self.db, user_id)
+        if state is None:
+            return None
+        if not (state["dirty"] or force):
+            # 새로 저장할 변화 없음 -> 저장된 최신 기록 그대로 (updated_at 도 실제 저장 시각)
+            return stored_user_npti_params(session, user_id)
+        snapshot = get_user_npti_info(session, user_id)
+        if snapshot and snapshot_is_newer(snapshot.get("updated_at"), state["persisted_at"]):
+            # 누적 시작 이후 재검사 결과가 저장됨 -> 예전 누적값으로 덮어쓰지 않고 새 기록부터 다시 시작
+            logger.info(f"[NPTI 온라인] 더 최신 user_npti 기록 -> 누적 상태 초기화 User: {user_id}")
+            self.reset_user(user_id)
+            return stored_user_npti_params(session, user_id)
+        latest_update_time = datetime.fromtimestamp(state["persisted_at"], KST).strftime('%Y-%m-%d %H:%M:%S') \
+            if state["persisted_at"] else None
+        params = build_user_npti_params(session, user_id, state["scores"], latest_update_time)
+        insert_user_npti(session, params)
+        with self.transaction() as db:
+            current = self.load_user(db, user_id)
+            # 저장 도중 새 묶음이 반영됐으면 아직 저장 안 된 변화가 있으므로 dirty 유지
+            dirty = int(any(current["scores"][name] != state["scores"][name] for name in NPTI_SCORE_NAMES))
+            self.save_user(db, user_id, {"scores": current["scores"], "npti_code": params["npti_code"],
+                                         "dirty": dirty, "persisted_at": time.time()})
+        self.stats["persisted"] += 1
+        return params
+
+    def reset_user(self, user_id):
+        """사용자 누적 상태 삭제 (NPTI 재검사 저장 직후 호출, 다음 flush 에서 최신 user_npti 기준으로 다시 시작)"""
+        with self.transaction() as db:
+            db.execute("DELETE FROM user_axis WHERE user_id = ?", (user_id,))
+            db.execute("DELETE FROM user_article WHERE user_id = ?", (user_id,))
+        self.untracked.pop(user_id, None)
+
+    def persist_dirty(self):
+        """스케줄러 주기 작업: 변경 후 NPTI_PERSIST_MAX_AGE 넘게 저장 안 된 사용자 저장 + 오래된 기사 상태 정리"""
+        with self.lock:
+            user_ids = [row[0] for row in self.db.execute(
+                "SELECT user_id FROM user_axis WHERE dirty = 1 AND (persisted_at IS NULL OR persisted_at < ?)",
+                (time.time() - NPTI_PERSIST_MAX_AGE,)
+            )]
+        session = SessionLocal()
+        try:
+            for user_id in user_ids:
+                try:
+                    self.persist_user(session, user_id)
+                except Exception as e:
+                    logger.error(f"[NPTI 온라인] user_npti 저장 실패 {user_id}: {e}")
+        finally:
+            session.close()
+        with self.transaction() as db:
+            db.execute("DELETE FROM user_article WHERE seen_at < ?", (time.time() - ARTICLE_STATE_TTL,))
+        expired = time.time() - UNTRACKED_RECHECK
+        for user_id in [user_id for user_id, checked in list(self.untracked.items()) if checked < expired]:
+            self.untracked.pop(user_id, None)
+        if user_ids:
+            logger.info(f"[NPTI 온라인] 주기 저장 {len(user_ids)}명")
+
+    def refresh_user(self, session, user_id):
+        """/update_user_npti: 누적값만 읽어서 저장 (추적 전 사용자는 1회 재생)"""
+        with self.lock:
+            known = self.load_user(self.db, user_id) is not None
+        if not known:
+            if self.seed_user(session, user_id) is None:
+                return None
+            self.untracked.pop(user_id, None)
+        return self.persist_user(session, user_id)
+
+    def metrics(self):
+        with self.lock:
+            users, dirty = self.db.execute("SELECT COUNT(*), COALESCE(SUM(dirty), 0) FROM user_axis").fetchone()
+            articles = self.db.execute("SELECT COUNT(*) FROM user_article").fetchone()[0]
+        return {"users": users, "dirty_users": dirty, "articles": articles, "untracked": len(self.untracked),
+                **self.stats}
+
+
+_online = None
+
+
+def get_online_updater() -> UserNPTIOnline:
+    global _online
+    if _online is None:
+        _online = UserNPTIOnline()
+    return _online
+
+
+def persist_online_npti():
+    get_online_updater().persist_dirty()
+
+
+if __name__ == "__main__":
+    # NPTI 재검사 경로 확인: 재검사 기록이 더 최신으로 판단되고, reset_user 후 누적 상태가 비어야 함
+    import tempfile
+    online = UserNPTIOnline(os.path.join(tempfile.mkdtemp(), "user_npti_online_check.sqlite3"))
+    persisted_at = time.time() - 60
+    with online.transaction() as db:
+        online.save_user(db, "check_user", {"scores": {name: 70.0 for name in NPTI_SCORE_NAMES},
+                                            "npti_code": "LTIN", "dirty": 1, "persisted_at": persisted_at})
+        db.execute("INSERT INTO user_article (user_id, news_id, read, dwell, n_word, types, interest, seen_at) "
+                   "VALUES (?, ?, 1, 1, 1, 'LTIN', 1, ?)", ("check_user", "check_news", time.time()))
+
+    retake_at = datetime.now(KST).strftime('%Y-%m-%d %H:%M:%S')
+    before_at = datetime.fromtimestamp(persisted_at - 60, KST).replace(tzinfo=None)
+    assert snapshot_is_newer(retake_at, persisted_at)
+    assert not snapshot_is_newer(before_at, persisted_at)
+
+    online.reset_user("check_user")
+    assert online.load_user(online.db, "check_user") is None
+    assert online.metrics()["articles"] == 0
+    print("재검사 경로 확인 완료:", online.metrics())
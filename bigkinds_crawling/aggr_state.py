@@ -0,0 +1,171 @@
+import os
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.utils import murmurhash3_32
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+AGGR_STATE_PATH = os.path.join(base_dir, "aggr_cache", "news_aggr_state.npz")
+
+N_FEATURES = 2 ** 20          # 고정 해시 feature 공간 (실행마다 vocabulary 재학습 없음)
+WINDOW_SECONDS = 60 * 60      # news_aggr 집계 대상 구간 (now-1h)
+
+# 기존 TfidfVectorizer(ngram_range=(1, 2)) 와 같은 토큰/ n-gram 규칙
+analyzer = TfidfVectorizer(ngram_range=(1, 2)).build_analyzer()
+
+
+class AggrTfidfState:
+    """
+    news_aggr 증분 TF-IDF 상태
+    - 최근 WINDOW_SECONDS 동안 처리한 기사의 해시 n-gram 카운트를 보관
+    - tag(속보/일반)별 document frequency 를 신규 추가 / 만료 시에만 갱신
+    - 매 실행은 신규 기사만 토큰화/해싱하고, 점수는 현재 구간의 df 로 계산 (sublinear tf * smooth idf, l2)
+    """
+
+    def __init__(self, n_features: int = N_FEATURES, window_seconds: int = WINDOW_SECONDS):
+        self.n_features = n_features
+        self.window_seconds = window_seconds
+        self.news_ids = []
+        self.tags = []
+        self.timestamps = np.zeros(0, dtype=np.float64)
+        self.counts = sp.csr_matrix((0, n_features), dtype=np.float64)
+        self.df = {}
+        self.row_of = {}
+
+    # ---------- 저장 / 로드 ----------
+    @classmethod
+    def load(cls, path: str = AGGR_STATE_PATH, **kwargs):
+        state = cls(**kwargs)
+        if not os.path.exists(path):
+            logger.info("[AGGR STATE] 저장된 상태 없음 -> 새로 시작")
+            return state
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                if int(f["n_features"]) != state.n_features:
+                    logger.warning("[AGGR STATE] feature 공간 변경 -> 상태 초기화")
+                    return state
+                state.news_ids = f["news_ids"].tolist()
+                state.tags = f["tags"].tolist()
+                state.timestamps = f["timestamps"]
+                state.counts = sp.csr_matrix(
+                    (f["data"], f["indices"], f["indptr"]), shape=(len(state.news_ids), state.n_features)
+                )
+                for tag, df in zip(f["df_tags"].tolist(), f["df"]):
+                    state.df[tag] = df.astype(np.int64)
+        except Exception as e:
+            logger.error(f"[AGGR STATE] 상태 로드 실패 -> 새로 시작: {e}")
+            return cls(**kwargs)
+        state.row_of = {news_id: i for i, news_id in enumerate(state.news_ids)}
+        logger.info(f"[AGGR STATE] 상태 로드: {len(state.news_ids)}건")
+        return state
+
+    def save(self, path: str = AGGR_STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df_tags = sorted(self.df)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            n_features=self.n_features,
+            news_ids=np.asarray(self.news_ids, dtype=str),
+            tags=np.asarray(self.tags, dtype=str),
+            timestamps=self.timestamps,
+            data=self.counts.data,
+            indices=self.counts.indices,
+            indptr=self.counts.indptr,
+            df_tags=np.asarray(df_tags, dtype=str),
+            df=np.asarray([self.df[t] for t in df_tags]).reshape(len(df_tags), self.n_features),
+        )
+        os.replace(tmp_path, path)
+
+    # ---------- 갱신 ----------
+    def df_for(self, tag):
+        if tag not in self.df:
+            self.df[tag] = np.zeros(self.n_features, dtype=np.int64)
+        return self.df[tag]
+
+    def update_df(self, rows, tags, sign):
+        for tag in set(tags):
+            mask = np.asarray([t == tag for t in tags])
+            sub = rows[mask]
+            df = self.df_for(tag)
+            np.add.at(df, sub.indices, sign)
+
+    def expire(self, now: float = None):
+        """구간(window)을 벗어난 기사를 제거하고 df 에서 차감"""
+        now = time.time() if now is None else now
+        keep = self.timestamps >= now - self.window_seconds
+        if keep.all():
+            return 0
+        drop = ~keep
+        self.update_df(self.counts[drop], [t for t, d in zip(self.tags, drop) if d], -1)
+
+        self.counts = self.counts[keep]
+        self.timestamps = self.timestamps[keep]
+        self.news_ids = [x for x, k in zip(self.news_ids, keep) if k]
+        self.tags = [x for x, k in zip(self.tags, keep) if k]
+        self.row_of = {news_id: i for i, news_id in enumerate(self.news_ids)}
+        return int(drop.sum())
+
+    def hash_terms(self, token_str):
+        counts = {}
+        names = {}
+        for term in analyzer(token_str):
+            idx = murmurhash3_32(term, positive=True) % self.n_features
+            counts[idx] = counts.get(idx, 0) + 1
+            names.setdefault(idx, term)
+        return counts, names
+
+    def add(self, items, now: float = None):
+        """
+        items : [{"news_id", "token", "tag"}, ...]  (신규 기사만)
+        return: 각 기사별 {hash index: term} (news_aggr 저장 시 term 이름 복원용)
+        """
+        now = time.time() if now is None else now
+        items = [item for item in items if item["news_id"] not in self.row_of]
+        if not items:
+            return []
+
+        indptr, indices, data, names_list = [0], [], [], []
+        for item in items:
+            counts, names = self.hash_terms(item["token"])
+            cols = sorted(counts)
+            indices.extend(cols)
+            data.extend(counts[c] for c in cols)
+            indptr.append(len(indices))
+            names_list.append(names)
+
+        rows = sp.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(items), self.n_features),
+        )
+        tags = [item["tag"] for item in items]
+        self.update_df(rows, tags, +1)
+
+        start = len(self.news_ids)
+        self.counts = sp.vstack([self.counts, rows], format="csr")
+        self.timestamps = np.concatenate([self.timestamps, np.full(len(items), now)])
+        self.news_ids.extend(item["news_id"] for item in items)
+        self.tags.extend(tags)
+        for i, item in enumerate(items):
+            self.row_of[item["news_id"]] = start + i
+        return names_list
+
+    # ---------- 조회 ----------
+    def ids_with_tag(self, tag):
+        return [news_id for news_id, t in zip(self.news_ids, self.tags) if t == tag]
+
+    def tfidf(self, news_ids, tag):
+        """현재 구간 df 기준 TF-IDF (sublinear tf, smooth idf, l2 정규화)"""
+        rows = self.counts[[self.row_of[news_id] for news_id in news_ids]].astype(np.float64)
+        n_docs = sum(1 for t in self.tags if t == tag)
+        idf = np.log((1 + n_docs) / (1 + self.df_for(tag)[rows.indices])) + 1
+        rows.data = (np.log(rows.data) + 1) * idf
+
+        norms = np.sqrt(np.asarray(rows.multiply(rows).sum(axis=1)).ravel())
+        norms[norms == 0.0] = 1.0
+        rows.data /= np.repeat(norms, np.diff(rows.indptr))
+        return rows
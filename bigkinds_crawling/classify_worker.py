@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import psutil
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+
+# 프로세스와 하위 프로세스(Chromedriver 등)를 모두 종료
+def kill_process_tree(pid, wait_timeout=3):
+    try:
+        # 부모 프로세스 객체 생성
+        parent = psutil.Process(pid)
+        # 자식 프로세스를 재귀적으로 모두 찾음
+        children = parent.children(recursive=True)
+
+        # 1단계: 자식 프로세스 먼저 종료
+        for child in children:
+            if child.is_running():
+                child.terminate()
+
+        # 2단계: 부모 프로세스 종료
+        parent.terminate()
+
+        # 3단계: 완전히 죽을 때까지 최대 wait_timeout초 대기 후, 안 죽으면 강제 Kill
+        gone, alive = psutil.wait_procs(children + [parent], timeout=wait_timeout)
+        for p_alive in alive:
+            p_alive.kill()
+    except psutil.NoSuchProcess:
+        pass
+
+
+# 워커 프로세스 본체: 모델/커넥션을 한 번만 올려두고 큐로 들어오는 분류 요청을 반복 처리
+def classify_worker_loop(task_queue, event_queue):
+    from database import get_engine
+    from algorithm.news_NPTI import classify_npti_fast, load_models, load_features
+
+    pid = os.getpid()
+    # fork 시 부모에서 복사된 DB 커넥션 풀은 사용하지 않음
+    get_engine().dispose(close=False)
+
+    t = time.time()
+    load_models()
+    load_features()
+    event_queue.put(("ready", None, pid, time.time(), time.time() - t, None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:  # 종료 신호
+            break
+        run_id, submitted_at = task
+        event_queue.put(("start", run_id, pid, time.time(), None, None))
+        try:
+            count = classify_npti_fast()
+            event_queue.put(("done", run_id, pid, time.time(), count, None))
+        except Exception as e:
+            event_queue.put(("done", run_id, pid, time.time(), 0, str(e)))
+
+
+class ClassifyWorkerPool:
+    """
+    NPTI 분류용 상주 워커 풀
+    - 워커는 모델(mmap 번들)/ES/DB 연결을 유지한 채 task_queue 를 기다림
+    - 스케줄러는 submit() 으로 분류 1회를 요청 (대기 중인 요청이 있으면 합침)
+    - timeout 초과 워커는 run_job_with_timeout 과 같은 방식으로 프로세스 트리 종료 후 재시작
+    """
+
+    def __init__(self, size: int = 1, timeout: int = 300, history: int = 100):
+        self.size = size
+        self.timeout = timeout
+        self.task_queue = multiprocessing.Queue()
+        self.event_queue = multiprocessing.Queue()
+        self.workers = {}      # pid -> Process
+        self.running = {}      # pid -> (run_id, submitted_at, started_at)
+        self.pending = {}      # run_id -> submitted_at (큐 대기 중)
+        self.next_run_id = 0
+        self.lock = threading.Lock()
+        self.stats = {
+            "submitted": 0, "skipped": 0, "completed": 0, "failed": 0,
+            "timeouts": 0, "restarts": 0, "classified": 0,
+        }
+        self.recent = deque(maxlen=history)  # 최근 실행 기록
+        self.load_times = deque(maxlen=history)
+
+    def spawn_worker(self):
+        p = multiprocessing.Process(
+            target=classify_worker_loop,
+            args=(self.task_queue, self.event_queue),
+            daemon=True,
+        )
+        p.start()
+        self.workers[p.pid] = p
+        logger.info(f"[분류 워커] 시작 pid={p.pid}")
+
+    def ensure_started(self):
+        for pid, p in list(self.workers.items()):
+            if not p.is_alive():
+                p.join()
+                del self.workers[pid]
+                run = self.running.pop(pid, None)
+                if run:
+                    self.record(run, time.time(), 0, "worker died", status="failed")
+                self.stats["restarts"] += 1
+                self.expire_pending(time.time(), reason="worker died")
+                logger.warning(f"[분류 워커] 비정상 종료 감지 pid={pid} -> 재시작")
+        while len(self.workers) < self.size:
+            self.spawn_worker()
+
+    def record(self, run, finished_at, count, error, status):
+        run_id, submitted_at, started_at = run
+        self.recent.append({
+            "run_id": run_id,
+            "status": status,
+            "count": count,
+            "error": error,
+            "queue_wait": round(started_at - submitted_at, 3),
+            "run_time": round(finished_at - started_at, 3),
+            "latency": round(finished_at - submitted_at, 3),
+            "finished_at": finished_at,
+        })
+        if status == "done":
+            self.stats["completed"] += 1
+            self.stats["classified"] += count or 0
+        elif status == "timeout":
+            self.stats["timeouts"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    def drain_events(self):
+        while True:
+            try:
+                kind, run_id, pid, ts, value, error = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "ready":
+                self.load_times.append(value)
+                logger.info(f"[분류 워커] 준비 완료 pid={pid} (모델 로드 {value:.2f}s)")
+            elif kind == "start":
+                submitted_at = self.pending.pop(run_id, ts)
+                self.running[pid] = (run_id, submitted_at, ts)
+            elif kind == "done":
+                run = self.running.pop(pid, None)
+                if run is None or run[0] != run_id:
+                    continue  # timeout 으로 이미 정리된 실행
+                self.record(run, ts, value, error, status="failed" if error else "done")
+
+    def kill_timed_out(self):
+        now = time.time()
+        for pid, run in list(self.running.items()):
+            if now - run[2] <= self.timeout:
+                continue
+            logger.warning(
+                f"⚠️ [타임아웃] 분류 run_id={run[0]} 작업이 {self.timeout}초를 초과하여 워커 pid={pid} 강제 종료"
+            )
+            kill_process_tree(pid)
+            p = self.workers.pop(pid, None)
+            if p is not None:
+                p.join()
+            self.running.pop(pid, None)
+            self.record(run, now, 0, "timeout", status="timeout")
+            self.stats["restarts"] += 1
+            logger.info(f"✅ [정리완료] 분류 워커 pid={pid} 관련 프로세스가 모두 제거되었습니다.")
+
+    def expire_pending(self, now, reason="pending timeout", max_age=None):
+        """
+        "start" 이벤트를 못 받은 대기 요청 정리
+        (워커가 task_queue.get() 직후 죽으면 pending 이 남아 이후 submit() 이 계속 skip 되는 것 방지)
+        - max_age 가 없으면(워커 비정상 종료) 모든 대기 요청, 있으면 max_age 초 넘게 대기한 요청만
+        """
+        for run_id, submitted_at in list(self.pending.items()):
+            if max_age is not None and now - submitted_at <= max_age:
+                continue
+            del self.pending[run_id]
+            self.record((run_id, submitted_at, now), now, 0, reason, status="failed")
+            logger.warning(f"[분류 워커] 대기 요청 정리 run_id={run_id} ({reason})")
+
+    def maintain(self):
+        self.drain_events()
+        self.kill_timed_out()
+        # 앞선 실행이 timeout 까지 돌고 워커가 재시작되는 시간까지 고려해서 2배
+        self.expire_pending(time.time(), max_age=self.timeout * 2)
+        self.ensure_started()
+
+    def submit(self):
+        """분류 1회 요청. 이미 대기 중인 요청이 있으면 합친다(coalesce)."""
+        with self.lock:
+            self.maintain()
+            if self.pending:
+                self.stats["skipped"] += 1
+                return None
+            self.next_run_id += 1
+            run_id = self.next_run_id
+            submitted_at = time.time()
+            self.pending[run_id] = submitted_at
+            self.task_queue.put((run_id, submitted_at))
+            self.stats["submitted"] += 1
+            return run_id
+
+    def metrics(self):
+        with self.lock:
+            self.maintain()
+            latencies = [r["latency"] for r in self.recent if r["status"] == "done"]
+            run_times = [r["run_time"] for r in self.recent if r["status"] == "done"]
+            now = time.time()
+            return {
+                "workers": len(self.workers),
+                "queue_depth": len(self.pending),
+                "in_flight": [
+                    {"pid": pid, "run_id": run[0], "elapsed": round(now - run[2], 3)}
+                    for pid, run in self.running.items()
+                ],
+                **self.stats,
+                "latency_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "latency_max": max(latencies) if latencies else None,
+                "run_time_avg": round(sum(run_times) / len(run_times), 3) if run_times else None,
+                "model_load_avg": round(sum(self.load_times) / len(self.load_times), 3) if self.load_times else None,
+                "last_run": self.recent[-1] if self.recent else None,
+            }
+
+    def shutdown(self):
+        with self.lock:
+            for _ in self.workers:
+                self.task_queue.put(None)
+            for pid, p in list(self.workers.items()):
+                p.join(timeout=5)
+                if p.is_alive():
+                    kill_process_tree(pid)
+            self.workers.clear()
+            self.running.clear()
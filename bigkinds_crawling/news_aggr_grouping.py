@@ -1,19 +1,21 @@
-from kiwipiepy import Kiwi
 from matplotlib import pyplot as plt
 from sklearn.metrics.pairwise import cosine_similarity as cosine
 import math
 import numpy as np
-from elasticsearch_index.es_aggr import tokens_aggr
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from elasticsearch_index.es_aggr import tokens_aggr_many
 from elasticsearch_index.es_raw import es
 from datetime import datetime
 from logger import Logger
 from sklearn.feature_extraction.text import TfidfVectorizer
 from elasticsearch import helpers
+from bigkinds_crawling.aggr_state import AggrTfidfState
 
 logger = Logger().get_logger(__name__)
 
-def related_news(news_title:str, exclude_id:str, category:str):
-    body = {
+def related_news_body(news_title:str, exclude_id:str, category:str):
+    return {
         "size":5,
         "_source":["news_id","title","pubdate","media","img"],
         "query":{
@@ -33,38 +35,53 @@ def related_news(news_title:str, exclude_id:str, category:str):
             }
         }
     }
+
+
+def related_news_results(res):
+    results = []
+    for hit in res["hits"]["hits"]:
+        doc = hit["_source"]
+        doc["_score"] = hit["_score"]
+        results.append(doc)
+    return results
+
+
+def related_news(news_title:str, exclude_id:str, category:str):
     try:
-        res = es.search(index="news_raw", body=body)
-        hits = res["hits"]["hits"]
-        results = []
-        for hit in hits:
-            doc = hit["_source"]
-            doc["_score"] = hit["_score"]
-            results.append(doc)
-        return results
+        res = es.search(index="news_raw", body=related_news_body(news_title, exclude_id, category))
+        return related_news_results(res)
     except Exception as e:
         logger.info(f"검색 중 에러 발생 : {e}")
         return None
 
 
-kiwi = Kiwi()
+# 신규 기사 1건의 news_aggr 문서 (term/score는 해시 feature 공간에서 복원)
+def aggr_action(item, row, names, timestamp):
+    tokens_score_list = [
+        {"term": names.get(int(idx), ""), "score": float(score)}
+        for idx, score in zip(row.indices, row.data) if score > 0
+    ]
+    tokens_score_list = sorted(tokens_score_list, key=lambda x: x['score'], reverse=True)
+    return {
+        "_index": "news_aggr", "_id": item['news_id'],
+        "_source": {
+            "news_id": item['news_id'], "tokens": tokens_score_list,
+            "tag": item['tag'], "timestamp": timestamp
+        }
+    }
+
+
 def news_aggr(*args):
-    processed_ids = set()
     try:
-        # 1. 처리된 기사 ID 확인
-        query = {
-            "_source": ["news_id"],
-            "size": 10000,
-            "query": {"range": {"timestamp": {"gte": "now-1h", "lte": "now"}}}
-        }
-        es.indices.refresh(index="news_aggr")
-        res = es.search(index="news_aggr", body=query)
-        for hit in res["hits"]["hits"]:
-            processed_ids.add(hit["_source"].get("news_id"))
+        # 1. 증분 TF-IDF 상태 로드 (처리된 기사 / 구간 df 포함) + 1시간 지난 기사 만료
+        state = AggrTfidfState.load()
+        expired = state.expire()
+        if expired:
+            logger.info(f"[AGGR STATE] 만료 기사 제거: {expired}건")
 
         # 2. Raw 기사 가져오기
         raw_query = {
-            "_source": ["news_id", "title", "content", "tag"],
+            "_source": ["news_id", "title", "content", "tag", "aggr_tokens"],
             "size": 10000,
             "query": {"range": {"timestamp": {"gte": "now-1h", "lte": "now"}}}
         }
@@ -77,47 +94,58 @@ def news_aggr(*args):
         remove_breaking_list = []  # [New] 그룹핑에서 제외할 기사 ID 목록
 
         # ------------------------------------------------------------------
-        # [A] 새로운 기사 분류 및 토큰화
+        # [A] 새로운 기사 분류 및 토큰화 (상태에 없는 기사만)
         # ------------------------------------------------------------------
-        for hit in raw_res["hits"]["hits"]:
-            source = hit["_source"]
+        new_sources = [
+            hit["_source"] for hit in raw_res["hits"]["hits"]
+            if hit["_source"].get("news_id") not in state.row_of
+        ]
+        # 수집 시 저장된 aggr_tokens 를 그대로 사용, 없는(이전 수집) 기사만 형태소 분석
+        # (숫자 포함 필수) - 제목 3배 가중치, 한 번에 배치 분석
+        token_results = [source.get("aggr_tokens") for source in new_sources]
+        missing = [i for i, token in enumerate(token_results) if token is None]
+        if missing:
+            for i, token in zip(missing, tokens_aggr_many([new_sources[i] for i in missing])):
+                token_results[i] = token
+            logger.info(f"aggr_tokens 없는 기사 형태소 분석: {len(missing)}건")
+
+        for source, token_result in zip(new_sources, token_results):
             news_id = source.get("news_id")
-
-            if news_id not in processed_ids:
-                tag = str(source.get("tag", ""))
-                title_token = str(source.get("title", ""))
-                content_token = str(source.get("content", ""))
-                weighted_token = (title_token + " ") * 3 + content_token
-
-                # 형태소 분석 (숫자 포함 필수)
-                token_result = tokens_aggr(weighted_token, kiwi)
-
-                item_data = {"news_id": news_id, "token": token_result, "tag": tag}
-
-                if tag == "속보":
-                    # [조건] 제목이 본문에 포함된 경우 (부실/중복 속보)
-                    if title_token in content_token:
-                        # 1. 분석/저장 대상에는 포함 (breaking_list)
-                        breaking_list.append(item_data)
-                        target_breaking_ids_list.append(news_id)
-                        # 2. 삭제 대상 목록에 등록 (나중에 그룹핑에서 뺄 것임)
-                        remove_breaking_list.append(news_id)
-                        logger.info(f"그룹핑 제외 대상 등록: {news_id}")
-
-                    # [조건] 정상 속보
-                    else:
-                        breaking_list.append(item_data)
-                        target_breaking_ids_list.append(news_id)
-
-                elif tag == "일반":
-                    norm_list.append(item_data)
+            tag = str(source.get("tag", ""))
+            title_token = str(source.get("title", ""))
+            content_token = str(source.get("content", ""))
+
+            item_data = {"news_id": news_id, "token": token_result, "tag": tag}
+
+            if tag == "속보":
+                # [조건] 제목이 본문에 포함된 경우 (부실/중복 속보)
+                if title_token in content_token:
+                    # 1. 분석/저장 대상에는 포함 (breaking_list)
+                    breaking_list.append(item_data)
+                    target_breaking_ids_list.append(news_id)
+                    # 2. 삭제 대상 목록에 등록 (나중에 그룹핑에서 뺄 것임)
+                    remove_breaking_list.append(news_id)
+                    logger.info(f"그룹핑 제외 대상 등록: {news_id}")
+
+                # [조건] 정상 속보
+                else:
+                    breaking_list.append(item_data)
+                    target_breaking_ids_list.append(news_id)
+
+            elif tag == "일반":
+                norm_list.append(item_data)
 
         logger.info(f"새로 수집: 속보 {len(breaking_list)}건 (제외대상 {len(remove_breaking_list)}건 포함), 일반 {len(norm_list)}건")
 
         # ------------------------------------------------------------------
-        # [B] 분석 대상(Target) 선정 로직 (Fallback 구현)
+        # [B] 신규 기사만 해시 벡터화 + 구간 df 갱신
+        # ------------------------------------------------------------------
+        breaking_names = state.add(breaking_list)
+        norm_names = state.add(norm_list)
+
+        # ------------------------------------------------------------------
+        # [C] 분석 대상(Target) 선정 로직 (Fallback: 상태에 남아있는 구간 속보 재사용)
         # ------------------------------------------------------------------
-        target_breaking_list = []
         is_fallback_mode = False
 
         if breaking_list:
@@ -125,105 +153,44 @@ def news_aggr(*args):
             logger.info(">>> [모드] 신규 속보 데이터 분석")
 
         else:
-            logger.info(">>> [모드] 신규 속보 없음 -> 기존 news_aggr 데이터 조회 (Fallback)")
+            logger.info(">>> [모드] 신규 속보 없음 -> 기존 집계 상태 사용 (Fallback)")
             is_fallback_mode = True
-
-            fallback_query = {
-                "size": 10000,
-                "_source": ["news_id", "tokens", "tag"],
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"range": {"timestamp": {"gte": "now-1h", "lte": "now"}}},
-                            {"term": {"tag": "속보"}}
-                        ]
-                    }
-                }
-            }
-            fallback_res = es.search(index="news_aggr", body=fallback_query)
-            target_breaking_ids_list = []
-
-            for hit in fallback_res["hits"]["hits"]:
-                src = hit["_source"]
-                tokens_data = src.get("tokens", [])
-                extracted_terms = [t.get("term", "") for t in tokens_data]
-                reconstructed_token_str = " ".join(extracted_terms)
-
-                if reconstructed_token_str.strip():
-                    target_breaking_list.append({
-                        "news_id": src.get("news_id"),
-                        "token": reconstructed_token_str,
-                        "tag": "속보"
-                    })
-                    target_breaking_ids_list.append(src.get("news_id"))
+            target_breaking_ids_list = state.ids_with_tag("속보")
+            target_breaking_list = [
+                {"news_id": news_id, "tag": "속보"} for news_id in target_breaking_ids_list
+            ]
 
         # ------------------------------------------------------------------
-        # [C] 속보 TF-IDF 계산 (전체 리스트 대상)
+        # [D] TF-IDF 계산 (구간 df 기준) 및 신규 기사 저장
         # ------------------------------------------------------------------
+        timestamp = datetime.now().astimezone().isoformat(timespec="seconds")
         breaking_tfidf = None
         breaking_actions = []
 
         if target_breaking_list:
-            breaking_corpus = [item['token'] for item in target_breaking_list]
-
-            # TF-IDF 수행 (여기서는 제외 대상도 포함해서 계산됨)
-            breaking_vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, max_features=3000)
-            breaking_tfidf = breaking_vectorizer.fit_transform(breaking_corpus)
-            breaking_features = breaking_vectorizer.get_feature_names_out()
+            # 제외 대상도 포함해서 계산됨
+            breaking_tfidf = state.tfidf([item['news_id'] for item in target_breaking_list], "속보")
 
             # [저장 로직] 제외 대상도 Index에는 저장 (Requirement 충족)
             if not is_fallback_mode:
                 for i, item in enumerate(target_breaking_list):
-                    row = breaking_tfidf.getrow(i).toarray().flatten()
-                    tokens_score_list = [
-                        {"term": str(breaking_features[idx]), "score": float(row[idx])}
-                        for idx in range(len(row)) if row[idx] > 0
-                    ]
-                    tokens_score_list = sorted(tokens_score_list, key=lambda x: x['score'], reverse=True)
-
-                    action = {
-                        "_index": "news_aggr", "_id": item['news_id'],
-                        "_source": {
-                            "news_id": item['news_id'], "tokens": tokens_score_list,
-                            "tag": item['tag'], "timestamp": datetime.now().astimezone().isoformat(timespec="seconds")
-                        }
-                    }
-                    breaking_actions.append(action)
+                    breaking_actions.append(aggr_action(item, breaking_tfidf.getrow(i), breaking_names[i], timestamp))
                 logger.info(f"신규 속보 저장 대기: {len(breaking_actions)}건")
 
-        # ------------------------------------------------------------------
-        # [D] 일반 기사 TF-IDF 및 저장
-        # ------------------------------------------------------------------
         norm_actions = []
         if norm_list:
-            norm_corpus = [item['token'] for item in norm_list]
-            norm_vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, max_features=3000)
-            norm_tfidf = norm_vectorizer.fit_transform(norm_corpus)
-            norm_features = norm_vectorizer.get_feature_names_out()
-
+            norm_tfidf = state.tfidf([item['news_id'] for item in norm_list], "일반")
             for i, item in enumerate(norm_list):
-                row = norm_tfidf.getrow(i).toarray().flatten()
-                tokens_score_list = [
-                    {"term": str(norm_features[idx]), "score": float(row[idx])}
-                    for idx in range(len(row)) if row[idx] > 0
-                ]
-                tokens_score_list = sorted(tokens_score_list, key=lambda x: x['score'], reverse=True)
-                action = {
-                    "_index": "news_aggr", "_id": item['news_id'],
-                    "_source": {
-                        "news_id": item['news_id'], "tokens": tokens_score_list,
-                        "tag": item['tag'], "timestamp": datetime.now().astimezone().isoformat(timespec="seconds")
-                    }
-                }
-                norm_actions.append(action)
+                norm_actions.append(aggr_action(item, norm_tfidf.getrow(i), norm_names[i], timestamp))
 
         # ------------------------------------------------------------------
-        # [E] ES Bulk 저장
+        # [E] ES Bulk 저장 + 상태 저장
         # ------------------------------------------------------------------
         actions = breaking_actions + norm_actions
         if actions:
             success, _ = helpers.bulk(es, actions)
             logger.info(f"ES Bulk Insert Success: {success}건")
+        state.save()
 
         if not actions and not target_breaking_list:
             return {"status": "no data to process"}
@@ -264,9 +231,9 @@ def news_aggr(*args):
 
             # 2차 병합 (Threshold 0.35)
             # 이유: 뭉쳐진 텍스트는 유사도가 높게 나오므로 엄격하게 검사
-            all_news_dict = {item['news_id']: item for item in grouping_target_list}
+            grouping_ids = [item['news_id'] for item in grouping_target_list]
             threshold = 0.35
-            final_groups = merge_similar_groups(groups_1st, all_news_dict, threshold=threshold)
+            final_groups = merge_similar_groups(groups_1st, filtered_tfidf_matrix, grouping_ids, threshold=threshold)
             logger.info(f"2차 병합 완료: {len(final_groups)}개 그룹")
 
             # 만약 그룹핑 결과가 없으면 개별 ID 리스트로 반환 (단, 필터링된 ID들만)
@@ -306,152 +273,163 @@ def news_aggr(*args):
 
 
 
+SIM_THRESHOLD = 0.2      # 기사 간 유사 기사로 인정할 최소 코사인 유사도
+EDGE_THRESHOLD = 0.15    # 1차 그룹핑 엣지 최소 점수
+SIM_BLOCK_SIZE = 2000    # 희소 유사도 계산 시 한 번에 처리할 행 수 (메모리 상한)
+
+
+# 임계값 이상인 코사인 유사도만 희소 행렬로 계산 (자기 자신 제외)
+def sparse_similarity(tfidf_matrix, threshold: float = SIM_THRESHOLD, block_size: int = SIM_BLOCK_SIZE):
+    """
+    행 정규화 후 X[block] @ X.T 를 블록 단위로 계산하고 threshold 미만은 버린다.
+    n×n 밀집 행렬을 만들지 않으므로 메모리/시간이 실제 유사 쌍 수에 비례한다.
+    """
+    matrix = normalize(sp.csr_matrix(tfidf_matrix, dtype=np.float64), norm="l2", copy=True)
+    matrix_t = matrix.T.tocsc()
+    n = matrix.shape[0]
+
+    blocks = []
+    for begin in range(0, n, block_size):
+        block = (matrix[begin:begin + block_size] @ matrix_t).tocoo()
+        keep = (block.data >= threshold) & (block.row + begin != block.col)
+        blocks.append(sp.csr_matrix(
+            (block.data[keep], (block.row[keep], block.col[keep])), shape=block.shape
+        ))
+    if not blocks:
+        return sp.csr_matrix((n, n))
+    return sp.vstack(blocks, format="csr")
+
+
 def cal_cosine_similarity(tfidf_matrix, news_items):
-    sim_matrix = cosine(tfidf_matrix)
+    sim_matrix = sparse_similarity(tfidf_matrix)
 
     similarity_actions=[]
+    timestamp = datetime.now().isoformat()
     for i in range(len(news_items)):
-        # 자기 자신을 제외하고 유사도가 높은 순으로 정렬 (예: 상위 5개)
-        # sim_matrix[i]는 i번째 기사와 다른 모든 기사 간의 점수
-        sorted_indices = sim_matrix[i].argsort()[::-1]
-
-        related_news = []
-        for idx in sorted_indices:
-            if i == idx: continue  # 자기 자신 제외
-            score = float(sim_matrix[i][idx])
-            if score < 0.2 : break  # 유사도 임계값 설정
-
-            related_news.append({
-                "news_id": news_items[idx]['news_id'],
-                "score": score
-            })
-            # if len(related_news) >= 5: break  # 상위 5개만 저장
-
-        if related_news:
-            similarity_actions.append({
-                    "news_id": news_items[i]['news_id'],
-                    "related_news": related_news,
-                    "timestamp": datetime.now().isoformat()
-            })
+        # 자기 자신을 제외하고 유사도가 임계값 이상인 기사만 높은 순으로 정렬
+        begin, end = sim_matrix.indptr[i], sim_matrix.indptr[i + 1]
+        if begin == end:
+            continue
+        cols = sim_matrix.indices[begin:end]
+        scores = sim_matrix.data[begin:end]
+        order = np.argsort(-scores, kind="stable")
+
+        related_news = [
+            {"news_id": news_items[cols[k]]['news_id'], "score": float(scores[k])}
+            for k in order
+        ]
+        similarity_actions.append({
+                "news_id": news_items[i]['news_id'],
+                "related_news": related_news,
+                "timestamp": timestamp
+        })
     return similarity_actions
 
 
+# union-find (경로 압축 + 크기 기준 합치기)
+def uf_find(parent, x):
+    root = x
+    while parent[root] != root:
+        root = parent[root]
+    while parent[x] != root:
+        parent[x], x = root, parent[x]
+    return root
+
+
+def uf_union(parent, size, a, b):
+    ra, rb = uf_find(parent, a), uf_find(parent, b)
+    if ra == rb:
+        return
+    if size[ra] < size[rb]:
+        ra, rb = rb, ra
+    parent[rb] = ra
+    size[ra] += size[rb]
+
+
+# union-find 결과를 등장 순서대로 그룹 리스트로 변환
+def uf_groups(parent, nodes):
+    groups = {}
+    for node in nodes:
+        groups.setdefault(uf_find(parent, node), []).append(node)
+    return list(groups.values())
+
+
 # 1. 1차 그룹핑 (기사 간 유사도 기반)
 # ---------------------------------------------------------
 def topic_grouping(news_group):
     """
-    1차: 기사 간 유사도(Cosine Similarity) 결과를 바탕으로 그래프를 생성하고
-    연결된 컴포넌트(Connected Components)를 찾아 그룹핑합니다.
+    1차: 기사 간 유사도(Cosine Similarity) 결과를 바탕으로 엣지를 만들고
+    union-find로 연결된 컴포넌트(Connected Components)를 찾아 그룹핑합니다.
     Returns: (groups, edges)
     """
-    adj_list = {}
-    all_nodes = set()
-    edges = []
+    parent = {}
+    size = {}
+    edges = {}  # (u, v) -> score (시각화용, 중복 제거)
+
+    def add_node(node):
+        if node not in parent:
+            parent[node] = node
+            size[node] = 1
 
     for item in news_group:
         source_id = item['news_id']
-        all_nodes.add(source_id)
-
-        if source_id not in adj_list:
-            adj_list[source_id] = set()
+        add_node(source_id)
 
         for rel in item['related_news']:
             # score 0.15 이상만 유효한 엣지로 간주
-            if rel['score'] >= 0.15:
+            if rel['score'] >= EDGE_THRESHOLD:
                 target_id = rel['news_id']
-                all_nodes.add(target_id)
+                add_node(target_id)
+                uf_union(parent, size, source_id, target_id)
 
-                # 양방향 연결
-                adj_list[source_id].add(target_id)
-                if target_id not in adj_list:
-                    adj_list[target_id] = set()
-                adj_list[target_id].add(source_id)
-
-                # 시각화용 엣지 저장
                 edge = tuple(sorted([source_id, target_id]))
-                if edge not in [e[:2] for e in edges]:
-                    edges.append((edge[0], edge[1], rel['score']))
-
-    # BFS로 그룹 찾기
-    visited = set()
-    groups = []
+                edges.setdefault(edge, rel['score'])
 
-    for node in all_nodes:
-        if node not in visited:
-            component = []
-            queue = [node]
-            visited.add(node)
-            while queue:
-                curr = queue.pop(0)
-                component.append(curr)
-                if curr in adj_list:
-                    for neighbor in adj_list[curr]:
-                        if neighbor not in visited:
-                            visited.add(neighbor)
-                            queue.append(neighbor)
-            groups.append(component)
-
-    return groups, edges
+    groups = uf_groups(parent, list(parent))
+    return groups, [(u, v, score) for (u, v), score in edges.items()]
 
 
 # ---------------------------------------------------------
 # 2. 2차 그룹핑 (그룹 간 유사도 기반 병합)
 # ---------------------------------------------------------
-def merge_similar_groups(groups, all_news_dict, threshold:float = 0.25):
+def merge_similar_groups(groups, tfidf_matrix, news_ids, threshold:float = 0.25):
     """
-    2차: 1차로 분류된 그룹들의 전체 텍스트를 합쳐서 다시 TF-IDF를 돌리고,
-    그룹 간 유사도가 threshold 이상이면 병합합니다.
+    2차: 1차로 분류된 그룹마다 기사 TF-IDF 행을 합쳐 중심 벡터(centroid)를 만들고,
+    그룹 간 코사인 유사도가 threshold 이상이면 union-find로 병합합니다.
+    tfidf_matrix : 1차 그룹핑에 사용한 기사 TF-IDF 행렬 (행 순서 = news_ids)
     """
     if len(groups) < 2:
         return groups
 
-    # 1. 각 그룹의 텍스트 뭉치기
-    group_texts = []
-    for group in groups:
-        combined_text = []
+    # 1. 그룹 소속 행렬 (G × n) @ 기사 TF-IDF (n × F) -> 그룹 중심 벡터 (l2 정규화)
+    row_of = {news_id: i for i, news_id in enumerate(news_ids)}
+    member_rows, member_groups = [], []
+    for g, group in enumerate(groups):
         for news_id in group:
-            if news_id in all_news_dict:
-                # tokens_aggr로 이미 토큰화된 문자열을 가져옴
-                token_str = all_news_dict[news_id].get('token', '')
-                combined_text.append(str(token_str))
-        group_texts.append(" ".join(combined_text))
-
-    # 2. 그룹 간 유사도 계산
-    try:
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(group_texts)
-        sim_matrix = cosine(tfidf_matrix)  # sklearn cosine_similarity
-    except ValueError:
-        # 텍스트가 비어있거나 하는 경우 원본 유지
-        return groups
+            if news_id in row_of:
+                member_rows.append(row_of[news_id])
+                member_groups.append(g)
+    membership = sp.csr_matrix(
+        (np.ones(len(member_rows)), (member_groups, member_rows)), shape=(len(groups), len(news_ids))
+    )
+    centroids = normalize(membership @ sp.csr_matrix(tfidf_matrix), norm="l2")
+
+    # 2. 그룹 간 유사도 (희소 곱 + 임계값) -> 병합 쌍
+    sim_matrix = sp.triu(centroids @ centroids.T, k=1).tocoo()
+    keep = sim_matrix.data >= threshold
+
+    # 3. union-find로 병합된 그룹 찾기 (1차 그룹 순서 유지)
+    parent = list(range(len(groups)))
+    size = [1] * len(groups)
+    for i, j in zip(sim_matrix.row[keep], sim_matrix.col[keep]):
+        uf_union(parent, size, int(i), int(j))
 
-    # 3. 그룹 간 병합 그래프 생성
-    n_groups = len(groups)
-    adj = {i: set() for i in range(n_groups)}
-
-    for i in range(n_groups):
-        for j in range(i + 1, n_groups):
-            if sim_matrix[i][j] >= threshold:
-                adj[i].add(j)
-                adj[j].add(i)
-
-    # 4. BFS로 병합된 그룹 찾기
-    visited = set()
     merged_groups = []
-
-    for i in range(n_groups):
-        if i not in visited:
-            stack = [i]
-            visited.add(i)
-            new_big_group = []
-            while stack:
-                curr_idx = stack.pop()
-                new_big_group.extend(groups[curr_idx])
-                for neighbor in adj[curr_idx]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        stack.append(neighbor)
-            merged_groups.append(new_big_group)
+    for members in uf_groups(parent, range(len(groups))):
+        new_big_group = []
+        for idx in members:
+            new_big_group.extend(groups[idx])
+        merged_groups.append(new_big_group)
 
     return merged_groups
 
@@ -514,4 +492,103 @@ def visualize_groups(groups, edges, title:str="News Grouping"):
 
     # [서버 환경 설정]
     # 실제 서버 배포 시에는 plt.show() 대신 plt.savefig('result.png') 등을 사용하세요.
-    plt.savefig(f"{title}.png")
\ No newline at end of file
+    plt.savefig(f"{title}.png")
+
+# ---------------------------------------------------------
+# 4. 기존(밀집 행렬 + BFS) 방식과 비교 / 벤치마크
+# ---------------------------------------------------------
+def dense_reference_groups(tfidf_matrix, news_items):
+    """기존 방식: n×n 밀집 코사인 유사도 -> 0.2/0.15 임계값 -> BFS"""
+    sim_matrix = cosine(tfidf_matrix)
+    np.fill_diagonal(sim_matrix, 0.0)
+    adj = {}
+    for i in range(len(news_items)):
+        for j in np.nonzero(sim_matrix[i] >= SIM_THRESHOLD)[0]:
+            adj.setdefault(i, set()).add(int(j))
+            adj.setdefault(int(j), set()).add(i)
+
+    visited = set()
+    groups = []
+    for node in adj:
+        if node in visited:
+            continue
+        component, queue = [], [node]
+        visited.add(node)
+        while queue:
+            curr = queue.pop()
+            component.append(news_items[curr]['news_id'])
+            for neighbor in adj[curr]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+        groups.append(component)
+    return groups
+
+
+def same_groups(a, b):
+    return sorted(sorted(g) for g in a) == sorted(sorted(g) for g in b)
+
+
+def synthetic_news(n_docs: int, n_topics: int = None, seed: int = 0):
+    """벤치마크용 가짜 기사 토큰 (주제별 핵심 단어 + 잡음 단어)"""
+    rng = np.random.default_rng(seed)
+    n_topics = n_topics or max(n_docs // 8, 1)
+    vocab = np.array([f"w{i}" for i in range(50000)])
+    topic_terms = rng.integers(0, len(vocab), size=(n_topics, 20))
+    items = []
+    for i in range(n_docs):
+        topic = rng.integers(0, n_topics)
+        words = np.concatenate([
+            vocab[rng.choice(topic_terms[topic], size=15)],
+            vocab[rng.integers(0, len(vocab), size=10)],
+        ])
+        items.append({"news_id": f"n{i}", "token": " ".join(words), "tag": "속보"})
+    return items
+
+
+def benchmark_grouping(sizes=(1000, 10000, 50000), dense_limit: int = 10000):
+    import time
+    results = []
+    for n_docs in sizes:
+        items = synthetic_news(n_docs)
+        tfidf_matrix = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True).fit_transform(
+            [item['token'] for item in items]
+        )
+
+        t = time.time()
+        groups, _ = topic_grouping(cal_cosine_similarity(tfidf_matrix, items))
+        sparse_time = time.time() - t
+
+        dense_time, equal = None, None
+        if n_docs <= dense_limit:
+            t = time.time()
+            reference = dense_reference_groups(tfidf_matrix, items)
+            dense_time = time.time() - t
+            equal = same_groups(groups, reference)
+
+        results.append({"n_docs": n_docs, "groups": len(groups), "sparse": sparse_time,
+                        "dense": dense_time, "same_groups": equal})
+        logger.info(
+            f"[GROUPING BENCH] {n_docs}건: 희소 {sparse_time:.3f}s / 밀집 "
+            f"{'-' if dense_time is None else f'{dense_time:.3f}s'} / 그룹 {len(groups)}개 / 동일 {equal}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    # 고정 데이터(샘플 기사)에서 기존 방식과 그룹 동일 여부 확인
+    df = pd.read_csv("NPTI_classify_test/sample_data_0107_v01.csv").dropna(subset=["content"])
+    token_results = tokens_aggr_many(df[["title", "content"]].to_dict("records"))
+    items = [{"news_id": str(i), "token": token, "tag": "속보"} for i, token in enumerate(token_results)]
+    tfidf_matrix = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, max_features=3000).fit_transform(
+        [item['token'] for item in items]
+    )
+    groups, _ = topic_grouping(cal_cosine_similarity(tfidf_matrix, items))
+    print(f"샘플 {len(items)}건 그룹 {len(groups)}개, 기존 방식과 동일: "
+          f"{same_groups(groups, dense_reference_groups(tfidf_matrix, items))}")
+    merged = merge_similar_groups(groups, tfidf_matrix, [item['news_id'] for item in items], threshold=0.35)
+    print(f"2차 병합: {len(groups)}개 -> {len(merged)}개")
+
+    benchmark_grouping()
@@ -7,13 +7,12 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
-from kiwipiepy import Kiwi
 from typing import Optional
 from elasticsearch_index.es_raw import es, ES_INDEX
 from datetime import datetime, timezone
 from logger import Logger
 from elasticsearch_index.es_raw import (
-    ensure_news_raw, index_sample_row, search_news_row, tokens
+    ensure_news_raw, index_sample_row, search_news_row, tokens, text_stats
 )
 from elasticsearch_index.es_err_crawling import index_error_log
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -33,7 +32,6 @@ def news_crawling(max_pages: int):
     driver = webdriver.Chrome(service=service, options=options)
     driver.get('https://www.bigkinds.or.kr/v2/news/recentNews.do')
     wait = WebDriverWait(driver, 30)
-    kiwi = Kiwi()
 
     total_samples = []
     page = 1
@@ -120,16 +118,18 @@ def news_crawling(max_pages: int):
                         pass
 
                     # 토큰화 및 저장
-                    token = tokens({"title": title, "content": content}, kiwi)
+                    token = tokens({"title": title, "content": content})
                     timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace("+00:00", "Z")
 
                     news_data = {
                         "title_tokens": token["title_tokens"],
                         "content_tokens": token["content_tokens"],
+                        "aggr_tokens": token["aggr_tokens"],
                         "writer_tokens": writer,
                         "news_id": news_id, "link": link, "title": title,
                         "media": media, "category": category, "writer": writer,
                         "content": content, "pubdate": pubdate, "img": img,
+                        **text_stats(content),
                         "imgCap": imgCap, "tag": tag, "timestamp": timestamp, "classified":False
                     }
 
@@ -175,8 +175,8 @@ def news_crawling(max_pages: int):
 
     return total_samples
 
-def search_article(news_id:str):
-    body = {
+def article_body(news_id:str):
+    return {
         "query": {
             "bool":{
                 "filter":[
@@ -185,26 +185,33 @@ def search_article(news_id:str):
             }
         }
     }
+
+
+def article_info(res):
+    hits = res["hits"]["hits"]
+    if len(hits)>0:
+        src = hits[0]["_source"]
+    news_info = {
+        "news_id":src.get("news_id", ""),
+        "title":src.get("title", ""),
+        "content":src.get("content", ""),
+        "writer":src.get("writer", ""),
+        "tag":src.get("tag", ""),
+        "media":src.get("media", ""),
+        "link":src.get("link", ""),
+        "category":src.get("category", ""),
+        "pubdate":src.get("pubdate", ""),
+        "img":src.get("img",""),
+        "imgCap":src.get("imgCap",""),
+        "timestamp":src.get("timestamp", ""),
+    }
+    return news_info
+
+
+def search_article(news_id:str):
     try :
-        res = es.search(index=ES_INDEX, body=body)
-        hits = res["hits"]["hits"]
-        if len(hits)>0:
-            src = hits[0]["_source"]
-        news_info = {
-            "news_id":src.get("news_id", ""),
-            "title":src.get("title", ""),
-            "content":src.get("content", ""),
-            "writer":src.get("writer", ""),
-            "tag":src.get("tag", ""),
-            "media":src.get("media", ""),
-            "link":src.get("link", ""),
-            "category":src.get("category", ""),
-            "pubdate":src.get("pubdate", ""),
-            "img":src.get("img",""),
-            "imgCap":src.get("imgCap",""),
-            "timestamp":src.get("timestamp", ""),
-        }
-        return news_info
+        res = es.search(index=ES_INDEX, body=article_body(news_id))
+        return article_info(res)
     except Exception as e:
         logger.error(f"{news_id}에 해당하는 기사가 없습니다 : {e}")
         return None
@@ -0,0 +1,48 @@
+import threading
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+
+class ResultQueueBridge:
+    """
+    multiprocessing.Queue -> asyncio 이벤트 루프 연결
+    - 전용 reader 스레드가 queue.get() 으로 블로킹 대기 (polling 없음)
+    - 결과가 오면 loop.call_soon_threadsafe 로 이벤트 루프에서 callback 실행
+    - stop() 은 종료 신호(None)를 넣어 reader 스레드를 끝낸다
+    """
+
+    def __init__(self, result_queue):
+        self.result_queue = result_queue
+        self.thread = None
+        self.stopping = False
+
+    def start(self, loop, callback):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(
+            target=self.read_loop, args=(loop, callback), name="result-queue-bridge", daemon=True
+        )
+        self.thread.start()
+
+    def read_loop(self, loop, callback):
+        while True:
+            try:
+                item = self.result_queue.get()
+            except (EOFError, OSError) as e:
+                logger.error(f"[결과 브리지] 큐 읽기 종료: {e}")
+                break
+            if item is None and self.stopping:
+                break
+            if loop.is_closed():
+                break
+            loop.call_soon_threadsafe(callback, item)
+
+    def stop(self, timeout: float = 2):
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.result_queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
@@ -1,10 +1,12 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from Naver.naver_crawling import  run_fast_crawl, run_slow_crawl
-from algorithm.news_NPTI import classify_npti_fast, init_npti
+from algorithm.news_NPTI import init_npti
 from bigkinds_crawling.news_raw import news_crawling
 from bigkinds_crawling.news_aggr_grouping import news_aggr
+from bigkinds_crawling.classify_worker import ClassifyWorkerPool, kill_process_tree
+from algorithm.user_npti_online import persist_online_npti, NPTI_PERSIST_INTERVAL
+from db_index.db_member_stats import run_member_stats_job, MEMBER_STATS_INTERVAL
 import multiprocessing
-import psutil
 from logger import Logger
 from datetime import datetime, timezone, timedelta
 import inspect
@@ -14,6 +16,9 @@ logger = Logger().get_logger(__name__)
 
 result_queue = multiprocessing.Queue()
 
+# 기사 NPTI 분류 상주 워커 풀 (모델 상주, 5분 타임아웃)
+classify_pool = ClassifyWorkerPool(size=1, timeout=300)
+
 # 1. 하나의 통합된 실행 제어 함수
 def run_job_with_timeout(func, args, timeout, on_success=None):
     """
@@ -41,26 +46,8 @@ def run_job_with_timeout(func, args, timeout, on_success=None):
         print(f"⚠️ [타임아웃] {func.__name__} 작업이 {timeout}초를 초과하여 강제 종료 및 청소를 시작합니다.")
 
         try:
-            # 부모 프로세스 객체 생성
-            parent = psutil.Process(p.pid)
-            # 자식 프로세스(Chromedriver, Chrome 등)를 재귀적으로 모두 찾음
-            children = parent.children(recursive=True)
-
-            # 1단계: 자식 프로세스(브라우저 등) 먼저 종료
-            for child in children:
-                if child.is_running():
-                    child.terminate()
-
-            # 2단계: 부모 프로세스(파이썬 함수) 종료
-            parent.terminate()
-
-            # 3단계: 완전히 죽을 때까지 최대 3초 대기 후, 안 죽으면 강제 Kill
-            gone, alive = psutil.wait_procs(children + [parent], timeout=3)
-            for p_alive in alive:
-                p_alive.kill()
-
-        except psutil.NoSuchProcess:
-            pass
+            # 자식 프로세스(Chromedriver, Chrome 등)까지 재귀적으로 종료, 3초 후 안 죽으면 강제 Kill
+            kill_process_tree(p.pid)
         finally:
             p.join()  # 프로세스 자원 반환
             print(f"✅ [정리완료] {func.__name__} 관련 좀비 프로세스가 모두 제거되었습니다.")
@@ -76,7 +63,7 @@ def trigger_classify_once(scheduler):
     if scheduler.get_job(job_id):
         return
     scheduler.add_job(
-        classify_npti_fast,
+        classify_pool.submit,
         trigger="date", #딱 1번 실행
         run_date=datetime.now() + timedelta(seconds=1),
         id=job_id,
@@ -136,14 +123,31 @@ def sch_start():
         next_run_time=(now + timedelta(seconds=30)).isoformat(timespec="seconds")
     )
 
-    # 기사 NPTI 라벨링 알고리즘 호출
+    # 기사 NPTI 라벨링 알고리즘 호출 (상주 워커 풀에 요청만 넣음, 타임아웃은 풀에서 관리)
     sch.add_job(
-        run_job_with_timeout,
+        classify_pool.submit,
         trigger="interval",
         seconds=30,
         id="news_npti_classify",
-        args=[classify_npti_fast, (), 300],  # 5분 타임아웃
         next_run_time=(now + timedelta(seconds=50)).isoformat(timespec="seconds")
     )
 
+    # 사용자 NPTI 온라인 누적값 주기 저장 (코드가 바뀐 사용자는 flush 시점에 이미 저장됨)
+    sch.add_job(
+        persist_online_npti,
+        trigger="interval",
+        seconds=NPTI_PERSIST_INTERVAL,
+        id="user_npti_persist",
+        next_run_time=(now + timedelta(seconds=NPTI_PERSIST_INTERVAL)).isoformat(timespec="seconds")
+    )
+
+    # /members_statistics 집계 테이블 증분 갱신 (새로 들어온 user_npti 기록만 반영)
+    sch.add_job(
+        run_member_stats_job,
+        trigger="interval",
+        seconds=MEMBER_STATS_INTERVAL,
+        id="member_stats_refresh",
+        next_run_time=(now + timedelta(seconds=20)).isoformat(timespec="seconds")
+    )
+
     return sch
\ No newline at end of file
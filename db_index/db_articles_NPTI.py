@@ -1,5 +1,5 @@
 from logger import Logger
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Float
 from database import Base
 from datetime import datetime
 
@@ -16,4 +16,20 @@ class ArticlesNPTI(Base):
     article_type = Column(String)
     info_type = Column(String)
     view_type = Column(String)
-    updated_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    # 축별 예측 확신도(최대 확률)와 그 중 최솟값
+    ct_confidence = Column(Float)
+    fi_confidence = Column(Float)
+    pn_confidence = Column(Float)
+    confidence = Column(Float, index=True)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+# 확신도 하한 미만 기사 검수 대기열
+class ArticlesNPTIReview(Base):
+    __tablename__ = "articles_NPTI_review"
+
+    news_id = Column(String(500), primary_key=True)
+    NPTI_code = Column(String(10), nullable=False)
+    low_axes = Column(String(20))  # 하한 미만 축 (예: "ct,pn")
+    confidence = Column(Float, index=True)
+    created_at = Column(DateTime, default=datetime.now, index=True)
\ No newline at end of file
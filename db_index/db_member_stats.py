@@ -0,0 +1,321 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text, Column, String, Integer, Date, DateTime
+from datetime import datetime, date, timezone, timedelta
+from logger import Logger
+from database import Base, get_engine, SessionLocal
+
+logger = Logger().get_logger(__name__)
+
+# =========================
+# /members_statistics 집계 테이블
+# - user_npti_latest   : 회원별 최신 NPTI 코드 (user_npti 새 기록이 올 때만 갱신)
+# - npti_daily_stats   : 날짜별(그날 24시 기준) 활성 회원의 NPTI 코드 분포 -> 주/월은 기간 마지막 날 값
+# - member_stats_current : 현재 NPTI / 연령대 / 성별 분포
+# - member_stats_state : 마지막으로 반영한 user_npti.updated_at (watermark), 마지막 스냅샷 날짜
+# =========================
+class UserNPTILatest(Base):
+    __tablename__ = "user_npti_latest"
+
+    user_id = Column(String(100), primary_key=True)
+    npti_code = Column(String(10))
+    updated_at = Column(DateTime)
+
+
+class NPTIDailyStats(Base):
+    __tablename__ = "npti_daily_stats"
+
+    stat_date = Column(Date, primary_key=True)
+    npti_code = Column(String(10), primary_key=True)
+    user_count = Column(Integer)
+
+
+class MemberStatsCurrent(Base):
+    __tablename__ = "member_stats_current"
+
+    dimension = Column(String(20), primary_key=True)  # npti / age / gender
+    bucket = Column(String(20), primary_key=True)
+    user_count = Column(Integer)
+
+
+class MemberStatsState(Base):
+    __tablename__ = "member_stats_state"
+
+    id = Column(Integer, primary_key=True)
+    watermark = Column(DateTime)
+    snapshot_day = Column(Date)
+    updated_at = Column(DateTime)
+
+
+MEMBER_STATS_INTERVAL = 60  # 스케줄러 갱신 주기(초)
+STATS_HISTORY_MONTHS = 6   # 첫 집계 시 만들어 둘 일별 스냅샷 기간 (대시보드 월별 그래프 범위)
+AGE_GROUPS = ['10대 이하', '20대', '30대', '40대', '50대', '60대 이상']
+TARGET_GENDERS = [0, 1]
+AXIS_COUNTS = [("length_type", "L"), ("length_type", "S"), ("article_type", "C"), ("article_type", "T"),
+               ("info_type", "I"), ("info_type", "F"), ("view_type", "P"), ("view_type", "N")]
+
+
+_tables_ready = False
+
+
+def add_member_stats_db():
+    global _tables_ready
+    if _tables_ready:
+        return
+    Base.metadata.create_all(bind=get_engine(), tables=[
+        UserNPTILatest.__table__, NPTIDailyStats.__table__, MemberStatsCurrent.__table__,
+        MemberStatsState.__table__,
+    ])
+    _tables_ready = True
+
+
+def kst_today():
+    return datetime.now(timezone(timedelta(hours=9))).date()
+
+
+def month_start(day: date, months_ago: int = 0):
+    month = day.year * 12 + day.month - 1 - months_ago
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def active_user_ids(db: Session):
+    rows = db.execute(text("SELECT user_id FROM user_info WHERE activation = 1 AND admin = 1")).fetchall()
+    return {row[0] for row in rows}
+
+
+def code_distribution(latest: dict, active: set):
+    counts = {}
+    for user_id, (npti_code, _) in latest.items():
+        if user_id in active:
+            counts[npti_code] = counts.get(npti_code, 0) + 1
+    return counts
+
+
+# =========================
+# 집계 갱신 (스케줄러 주기 작업)
+# =========================
+def refresh_member_stats(db: Session):
+    """
+    user_npti 에서 watermark 이후 기록만 읽어서 집계 테이블 갱신
+    - 마지막 스냅샷 날짜부터 오늘까지 날짜 순으로 기록을 반영하며 날짜별 분포 저장
+      (지난 스냅샷 이후 ~ 자정 사이 기록도 해당 날짜에 반영되도록 마지막 날짜는 다시 계산)
+    - 오늘 분포는 실행할 때마다 덮어씀, 지난 날짜는 그 시점 활성 회원 기준으로 고정
+    """
+    add_member_stats_db()
+    today = kst_today()
+    state = db.execute(text("SELECT watermark, snapshot_day FROM member_stats_state WHERE id = 1")).fetchone()
+    watermark, snapshot_day = (state[0], state[1]) if state else (None, None)
+    first_day = snapshot_day or month_start(today, STATS_HISTORY_MONTHS - 1)
+
+    latest = {row[0]: (row[1], row[2]) for row in
+              db.execute(text("SELECT user_id, npti_code, updated_at FROM user_npti_latest")).fetchall()}
+    if watermark is None:
+        rows = db.execute(text(
+            "SELECT user_id, npti_code, updated_at FROM user_npti ORDER BY updated_at"
+        )).fetchall()
+    else:
+        # 같은 시각에 늦게 들어온 기록도 놓치지 않도록 >= (같은 기록을 다시 반영해도 결과 동일)
+        rows = db.execute(text(
+            "SELECT user_id, npti_code, updated_at FROM user_npti WHERE updated_at >= :watermark ORDER BY updated_at"
+        ), {"watermark": watermark}).fetchall()
+
+    active = active_user_ids(db)
+    changed = set()
+    snapshots = {}
+    i = 0
+
+    def apply(row):
+        user_id, npti_code, updated_at = row
+        prev = latest.get(user_id)
+        if prev is None or prev[1] is None or updated_at >= prev[1]:
+            latest[user_id] = (npti_code, updated_at)
+            changed.add(user_id)
+
+    # 스냅샷 시작일 이전 기록은 최신 상태에만 반영
+    while i < len(rows) and rows[i][2].date() < first_day:
+        apply(rows[i])
+        i += 1
+    day = first_day
+    while day <= today:
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        while i < len(rows) and rows[i][2] < day_end:
+            apply(rows[i])
+            i += 1
+        snapshots[day] = code_distribution(latest, active)
+        day += timedelta(days=1)
+    while i < len(rows):  # 서버 시각보다 늦은 기록
+        apply(rows[i])
+        i += 1
+
+    try:
+        if changed:
+            db.execute(text("""
+                INSERT INTO user_npti_latest (user_id, npti_code, updated_at)
+                VALUES (:user_id, :npti_code, :updated_at)
+                ON DUPLICATE KEY UPDATE npti_code = VALUES(npti_code), updated_at = VALUES(updated_at)
+            """), [{"user_id": user_id, "npti_code": latest[user_id][0], "updated_at": latest[user_id][1]}
+                   for user_id in changed])
+
+        db.execute(text("DELETE FROM npti_daily_stats WHERE stat_date >= :first_day"), {"first_day": first_day})
+        daily_rows = [{"stat_date": d, "npti_code": code, "user_count": count}
+                      for d, counts in snapshots.items() for code, count in counts.items()]
+        if daily_rows:
+            db.execute(text("""
+                INSERT INTO npti_daily_stats (stat_date, npti_code, user_count)
+                VALUES (:stat_date, :npti_code, :user_count)
+            """), daily_rows)
+
+        refresh_current_stats(db, latest, active)
+
+        new_watermark = max([watermark] * (watermark is not None) + [row[2] for row in rows], default=None)
+        db.execute(text("""
+            INSERT INTO member_stats_state (id, watermark, snapshot_day, updated_at)
+            VALUES (1, :watermark, :snapshot_day, :updated_at)
+            ON DUPLICATE KEY UPDATE watermark = VALUES(watermark), snapshot_day = VALUES(snapshot_day),
+                updated_at = VALUES(updated_at)
+        """), {"watermark": new_watermark, "snapshot_day": today, "updated_at": datetime.now()})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"회원 통계 집계 저장 실패: {e}")
+        raise e
+    logger.info(f"회원 통계 집계 완료: 신규 기록 {len(rows)}건 / 스냅샷 {len(snapshots)}일")
+
+
+def refresh_current_stats(db: Session, latest: dict, active: set):
+    # 현재 분포 (NPTI 코드 + 미진단 / 연령대 / 성별) -> member_stats_current 덮어쓰기
+    stats = []
+    npti_counts = code_distribution(latest, active)
+    undiagnosed = len(active - set(latest))
+    if undiagnosed:
+        npti_counts['미진단'] = npti_counts.get('미진단', 0) + undiagnosed
+    stats += [{"dimension": "npti", "bucket": code, "user_count": count} for code, count in npti_counts.items()]
+
+    age_rows = db.execute(text("""
+        SELECT
+            CASE
+                WHEN user_age < 20 THEN '10대 이하'
+                WHEN user_age >= 20 AND user_age < 30 THEN '20대'
+                WHEN user_age >= 30 AND user_age < 40 THEN '30대'
+                WHEN user_age >= 40 AND user_age < 50 THEN '40대'
+                WHEN user_age >= 50 AND user_age < 60 THEN '50대'
+                ELSE '60대 이상'
+            END AS age_group,
+            COUNT(*) AS count
+        FROM user_info
+        WHERE activation = 1 and admin = 1
+        GROUP BY age_group
+    """)).fetchall()
+    stats += [{"dimension": "age", "bucket": row[0], "user_count": row[1]} for row in age_rows]
+
+    gender_rows = db.execute(text("""SELECT user_gender, COUNT(*) as count FROM user_info
+        WHERE activation = 1 and admin = 1 GROUP BY user_gender""")).fetchall()
+    stats += [{"dimension": "gender", "bucket": str(row[0]), "user_count": row[1]} for row in gender_rows]
+
+    db.execute(text("DELETE FROM member_stats_current"))
+    if stats:
+        db.execute(text("""
+            INSERT INTO member_stats_current (dimension, bucket, user_count)
+            VALUES (:dimension, :bucket, :user_count)
+        """), stats)
+
+
+def run_member_stats_job():
+    db = SessionLocal()
+    try:
+        refresh_member_stats(db)
+    except Exception as e:
+        logger.error(f"회원 통계 집계 실패: {e}")
+    finally:
+        db.close()
+
+
+# =========================
+# /members_statistics 응답 (집계 테이블만 조회)
+# =========================
+def axis_counts(code_counts: dict, code_types: dict):
+    result = {f"{letter}_count": 0 for _, letter in AXIS_COUNTS}
+    for code, count in code_counts.items():
+        types = code_types.get(code)
+        if not types:
+            continue
+        for type_col, letter in AXIS_COUNTS:
+            if types[type_col] == letter:
+                result[f"{letter}_count"] += count
+    return result
+
+
+def get_members_statistics(db: Session):
+    today = kst_today()
+    this_monday = today - timedelta(days=today.weekday())
+
+    add_member_stats_db()
+    state = db.execute(text("SELECT snapshot_day FROM member_stats_state WHERE id = 1")).fetchone()
+    if state is None or state[0] is None:
+        refresh_member_stats(db)  # 최초 1회: 집계 테이블 생성 전이면 바로 집계
+
+    code_types = {row[0]: {"length_type": row[1], "article_type": row[2], "info_type": row[3], "view_type": row[4]}
+                  for row in db.execute(text("""
+                      SELECT npti_code, length_type, article_type, info_type, view_type FROM npti_code
+                  """)).fetchall()}
+    all_codes = sorted(code_types)
+
+    # 일 / 주 / 월 기간별 기준 날짜 (기간 마지막 날, 진행 중인 기간은 오늘)
+    days = [today - timedelta(days=6 - i) for i in range(7)]
+    weeks = [this_monday - timedelta(weeks=3 - i) for i in range(4)]
+    months = [month_start(today, 5 - i) for i in range(6)]
+    periods = {
+        "day": [(d.strftime('%Y-%m-%d'), d) for d in days],
+        "week": [(f"{w.strftime('%Y-%m-%d')}\n~ {(w + timedelta(days=6)).strftime('%Y-%m-%d')}",
+                  min(w + timedelta(days=6), today)) for w in weeks],
+        "month": [(m.strftime('%Y-%m'), min(month_start(m, -1) - timedelta(days=1), today)) for m in months],
+    }
+    needed = {d for items in periods.values() for _, d in items}
+
+    daily = {}
+    for stat_date, npti_code, user_count in db.execute(text("""
+        SELECT stat_date, npti_code, user_count FROM npti_daily_stats
+        WHERE stat_date >= :start_date AND stat_date <= :end_date
+    """), {"start_date": min(needed), "end_date": today}).fetchall():
+        if stat_date in needed:
+            daily.setdefault(stat_date, {})[npti_code] = user_count
+
+    current = {}
+    for dimension, bucket, user_count in db.execute(text(
+            "SELECT dimension, bucket, user_count FROM member_stats_current")).fetchall():
+        current.setdefault(dimension, {})[bucket] = user_count
+
+    # 1. NPTI 회원 분포
+    npti_current = current.get("npti", {})
+    result1_1 = sorted(({"npti_code": code, "count": count} for code, count in npti_current.items()),
+                       key=lambda row: -row["count"])
+    age_map = current.get("age", {})
+    result1_2 = [{'age_group': group, 'count': age_map.get(group, 0)} for group in AGE_GROUPS]
+    gender_map = current.get("gender", {})
+    result1_3 = [{'user_gender': g, 'count': gender_map.get(str(g), 0)} for g in TARGET_GENDERS]
+
+    # 2. NPTI 코드별 변화 추이 / 4. 8개 속성별 변화 추이
+    result2, result4 = {}, {}
+    for name, items in periods.items():
+        result2[name] = [{"date_period": label, "npti_code": code, "user_count": daily.get(d, {}).get(code, 0)}
+                         for label, d in items for code in all_codes]
+        result4[name] = [{"date_period": label, **axis_counts(daily.get(d, {}), code_types)} for label, d in items]
+
+    # 3. NPTI 8개 속성별 분포 (현재)
+    result3 = axis_counts({code: count for code, count in npti_current.items() if code != '미진단'}, code_types)
+
+    return {
+        "result1_npti_code": result1_1,
+        "result1_age": result1_2,
+        "result1_gender": result1_3,
+
+        "result2_day": result2["day"],
+        "result2_week": result2["week"],
+        "result2_month": result2["month"],
+
+        "result3_npti_type": result3,
+
+        "result4_day": result4["day"],
+        "result4_week": result4["week"],
+        "result4_month": result4["month"],
+        "time_now": datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S')
+    }
@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from logger import Logger
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timezone, timedelta
 from sqlalchemy import Column, String, Float, DateTime
 from database import Base
 
@@ -103,4 +103,70 @@ def finalize_score(val):
     # 50 예외 처리
     if final_val == 50:
         return 51 if val >= 50 else 49
-    return final_val
\ No newline at end of file
+    return final_val
+
+NPTI_SCORE_NAMES = ["long_score", "short_score", "content_score", "tale_score",
+                    "fact_score", "insight_score", "positive_score", "negative_score"]
+
+# =========================
+# 축 점수 -> 최종 NPTI 결과 (user_npti 저장용 params)
+# =========================
+def npti_code_from_scores(scores: dict):
+    long_score = finalize_score(scores["long_score"])
+    tale_score = finalize_score(scores["tale_score"])
+    insight_score = finalize_score(scores["insight_score"])
+    negative_score = finalize_score(scores["negative_score"])
+    return (("L" if long_score > 100 - long_score else "S")
+            + ("T" if tale_score > 100 - tale_score else "C")
+            + ("I" if insight_score > 100 - insight_score else "F")
+            + ("N" if negative_score > 100 - negative_score else "P"))
+
+def build_user_npti_params(db: Session, user_id: str, scores: dict, latest_update_time=None):
+    final_long_score = finalize_score(scores["long_score"])
+    final_short_score = 100 - final_long_score
+    final_tale_score = finalize_score(scores["tale_score"])
+    final_content_score = 100 - final_tale_score
+    final_insight_score = finalize_score(scores["insight_score"])
+    final_fact_score = 100 - final_insight_score
+    final_negative_score = finalize_score(scores["negative_score"])
+    final_positive_score = 100 - final_negative_score
+    final_user_npti = npti_code_from_scores(scores)
+    updated_at = datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S')
+    query = text("SELECT type_nick, type_de FROM npti_code WHERE npti_code = :code")
+    description = db.execute(query, {"code": final_user_npti}).fetchone()
+    return {
+        "latest_update_time": latest_update_time,
+        "user_id": user_id,
+        "npti_code": final_user_npti,
+        "type_nick": description[0],
+        "type_de": description[1],
+        "long_score": final_long_score,
+        "short_score": final_short_score,
+        "content_score": final_content_score,
+        "tale_score": final_tale_score,
+        "fact_score": final_fact_score,
+        "insight_score": final_insight_score,
+        "positive_score": final_positive_score,
+        "negative_score": final_negative_score,
+        "updated_at": updated_at
+    }
+
+# =========================
+# 저장된 최신 user_npti -> build_user_npti_params 와 같은 형태 (변경 없을 때 응답용)
+# =========================
+def stored_user_npti_params(db: Session, user_id: str):
+    row = get_user_npti_info(db, user_id)
+    if not row:
+        return None
+    updated_at = row.get("updated_at")
+    if isinstance(updated_at, datetime):
+        updated_at = updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    query = text("SELECT type_nick, type_de FROM npti_code WHERE npti_code = :code")
+    description = db.execute(query, {"code": row["npti_code"]}).fetchone()
+    return {
+        **row,
+        "latest_update_time": updated_at,
+        "type_nick": description[0] if description else None,
+        "type_de": description[1] if description else None,
+        "updated_at": updated_at
+    }
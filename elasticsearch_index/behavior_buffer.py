@@ -0,0 +1,175 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from elasticsearch.helpers import async_bulk
+from elasticsearch_index.es_async import get_async_es
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+FLUSH_DOCS = 2000          # 한 번에 bulk 로 보내는 최대 문서 수
+FLUSH_INTERVAL = 1.0       # 문서가 적어도 이 시간(초)마다 flush
+MAX_PENDING_DOCS = 50000   # 버퍼 상한 (넘으면 요청을 잠시 대기 -> backpressure)
+BACKPRESSURE_WAIT = 2.0    # 버퍼가 찼을 때 요청이 기다리는 최대 시간(초)
+RETRY_BACKOFF_MAX = 30.0   # ES 실패 시 재시도 간격 상한(초)
+HOOK_QUEUE_BATCHES = 50    # on_flush 대기 묶음 상한 (넘으면 그 묶음은 on_flush 생략, 저장은 이미 완료)
+
+
+class BehaviorIngestBuffer:
+    """
+    /log/behavior 비콘 수집 버퍼
+    - 요청은 문서를 버퍼에 넣고 바로 반환 (ES 호출 X)
+    - 백그라운드 태스크가 FLUSH_DOCS 개 또는 FLUSH_INTERVAL 초 단위로 모아서 async bulk
+    - 문서마다 submit 시점에 _id 를 붙여둔다 -> 재시도 때 앞 chunk 가 이미 저장됐어도 중복 저장 X
+    - ES 가 느리거나 실패하면 문서를 버퍼에 유지한 채 backoff 재시도,
+      버퍼가 MAX_PENDING_DOCS 를 넘으면 submit() 이 대기하다가 False 반환
+    - on_flush(batch): 저장에 성공한 묶음을 받는 콜백 (예: 사용자 NPTI 온라인 갱신)
+      별도 큐 + 소비 태스크에서 스레드로 실행 -> 느려도 bulk flush 는 기다리지 않음
+    """
+
+    def __init__(self, index: str, flush_docs: int = FLUSH_DOCS, flush_interval: float = FLUSH_INTERVAL,
+                 max_pending_docs: int = MAX_PENDING_DOCS, backpressure_wait: float = BACKPRESSURE_WAIT,
+                 on_flush=None, hook_queue_batches: int = HOOK_QUEUE_BATCHES):
+        self.index = index
+        self.flush_docs = flush_docs
+        self.flush_interval = flush_interval
+        self.max_pending_docs = max_pending_docs
+        self.backpressure_wait = backpressure_wait
+        self.on_flush = on_flush
+        self.hook_queue_batches = hook_queue_batches
+        self.hook_queue = None
+        self.hook_task = None
+        self.pending = deque()
+        self.task = None
+        self.stopping = False
+        self.wakeup = None
+        self.space = None
+        self.stats = {"accepted": 0, "rejected": 0, "indexed": 0, "failed": 0, "flushes": 0, "retries": 0,
+                      "hook_dropped": 0, "hook_failed": 0}
+        self.last_flush_time = None
+
+    def start(self):
+        if self.task is not None:
+            return
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Condition()
+        self.task = asyncio.create_task(self.run())
+        if self.on_flush is not None:
+            self.hook_queue = asyncio.Queue(maxsize=self.hook_queue_batches)
+            self.hook_task = asyncio.create_task(self.run_hooks())
+        logger.info(f"[행동 로그 버퍼] 시작 (index={self.index})")
+
+    async def submit(self, docs: list):
+        """문서를 버퍼에 추가. 버퍼가 가득 차 backpressure_wait 안에 자리가 안 나면 False"""
+        if not docs:
+            return True
+        if self.task is None:
+            self.start()
+
+        if len(self.pending) + len(docs) > self.max_pending_docs:
+            try:
+                async with self.space:
+                    await asyncio.wait_for(
+                        self.space.wait_for(lambda: len(self.pending) + len(docs) <= self.max_pending_docs),
+                        timeout=self.backpressure_wait,
+                    )
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += len(docs)
+                logger.warning(f"[행동 로그 버퍼] 버퍼 가득 참 -> {len(docs)}건 거절 (대기 {len(self.pending)}건)")
+                return False
+
+        self.pending.extend((uuid.uuid4().hex, doc) for doc in docs)
+        self.stats["accepted"] += len(docs)
+        if len(self.pending) >= self.flush_docs:
+            self.wakeup.set()
+        return True
+
+    async def run(self):
+        backoff = self.flush_interval
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            while self.pending:
+                ok = await self.flush_once()
+                if not ok:
+                    # ES 장애/지연: 문서는 버퍼에 남겨두고 점점 길게 쉬었다가 재시도
+                    self.stats["retries"] += 1
+                    if self.stopping:
+                        break
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+                    break
+                backoff = self.flush_interval
+                if len(self.pending) < self.flush_docs:
+                    break
+
+    async def flush_once(self):
+        batch = [self.pending.popleft() for _ in range(min(self.flush_docs, len(self.pending)))]
+        actions = [{"_index": self.index, "_id": doc_id, "_source": doc} for doc_id, doc in batch]
+        t = time.time()
+        try:
+            success_count, errors = await async_bulk(get_async_es(), actions, raise_on_error=False)
+        except Exception as e:
+            logger.error(f"[행동 로그 버퍼] ES bulk 실패 ({len(batch)}건 재시도 예정): {e}")
+            self.pending.extendleft(reversed(batch))
+            return False
+
+        self.stats["flushes"] += 1
+        self.stats["indexed"] += success_count
+        if errors:
+            self.stats["failed"] += len(errors)
+            logger.error(f"ES Bulk Insert 일부 에러 발생: {errors[:3]}")
+        self.last_flush_time = round(time.time() - t, 3)
+        async with self.space:
+            self.space.notify_all()
+        if self.hook_queue is not None:
+            try:
+                self.hook_queue.put_nowait([doc for _, doc in batch])
+            except asyncio.QueueFull:
+                self.stats["hook_dropped"] += len(batch)
+                logger.warning(f"[행동 로그 버퍼] on_flush 대기열 가득 참 -> {len(batch)}건 생략")
+        return True
+
+    async def run_hooks(self):
+        while True:
+            batch = await self.hook_queue.get()
+            try:
+                await asyncio.to_thread(self.on_flush, batch)
+            except Exception as e:
+                self.stats["hook_failed"] += len(batch)
+                logger.error(f"[행동 로그 버퍼] on_flush 처리 실패: {e}")
+            finally:
+                self.hook_queue.task_done()
+
+    async def stop(self):
+        """남은 문서를 모두 flush 하고 태스크 종료"""
+        if self.task is None:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=RETRY_BACKOFF_MAX)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self.task = None
+        while self.pending:
+            if not await self.flush_once():
+                logger.error(f"[행동 로그 버퍼] 종료 시 {len(self.pending)}건 저장 실패")
+                break
+        if self.hook_task is not None:
+            try:
+                await asyncio.wait_for(self.hook_queue.join(), timeout=RETRY_BACKOFF_MAX)
+            except asyncio.TimeoutError:
+                logger.warning(f"[행동 로그 버퍼] 종료 시 on_flush {self.hook_queue.qsize()}묶음 생략")
+            self.hook_task.cancel()
+            self.hook_task = None
+
+    def metrics(self):
+        hook_pending = self.hook_queue.qsize() if self.hook_queue is not None else 0
+        return {"pending": len(self.pending), "hook_pending": hook_pending, "last_flush_time": self.last_flush_time,
+                **self.stats}
@@ -1,23 +1,11 @@
 from logger import Logger
-from elasticsearch import Elasticsearch
-from kiwipiepy import Kiwi
+from elasticsearch_index.es_client import es
+from kiwi_service import get_kiwi_service, aggr_token_str, AGGR_EXCLUDE_TAGS
 
 logger = Logger().get_logger(__name__)
 
-ES_HOST = "http://localhost:9200"
-ES_USER = "elastic"
-ES_PASS = "elastic"
 ES_INDEX = "news_aggr"
 
-es = Elasticsearch( # elasticsearch 연결 객체 생성
-    ES_HOST,
-    basic_auth=(ES_USER, ES_PASS),
-    verify_certs=False,
-    ssl_show_warn=False # type: ignore
-)
-
-kiwi = Kiwi()
-
 def ensure_news_aggr():
     body = {
         "mappings": {
@@ -52,31 +40,35 @@ def ensure_news_aggr():
         logger.error(f"index 생성 오류 : {e}")
 
 
-def tokens_aggr(combined_text: str, kiwi: Kiwi):
+def tokens_aggr(combined_text: str):
     if not combined_text or not combined_text.strip():
         return ""
 
-    # 1. Kiwi 토큰화
-    tokens = kiwi.tokenize(combined_text)
+    # 1. Kiwi 토큰화 (공용 서비스 캐시)
+    tokens = get_kiwi_service().analyze(combined_text)
 
-    # 2. 제거할 품사 태그 정의 (튜플 형태)
+    # 2. 제거할 품사 태그: AGGR_EXCLUDE_TAGS
     # J: 조사, E: 어미, S: 부호 및 숫자(SN 포함),
     # NNB: 의존명사, XP: 접두사, XS: 접미사
-    exclude_tags = ('J', 'E', 'S', 'NNB', 'XP', 'XS')
 
-    # 3. 필터링 및 정제
-    # - 불용어 품사 제외
-    # - 단어 길이가 2글자 이상인 것만 유지 (주제 분류 정확도 향상)
-    filtered_tokens = [
-        token.form for token in tokens
-        if not token.tag.startswith(exclude_tags)
-           # and len(token.form) > 1
-    ]
+    # 3. 필터링 후 공백으로 구분된 문자열로 결합
+    return get_kiwi_service().join_forms(tokens, AGGR_EXCLUDE_TAGS)
+
 
-    # 4. 공백으로 구분된 문자열로 결합
-    tokens_list = " ".join(filtered_tokens)
+def tokens_aggr_many(rows):
+    """
+    rows : [{"title", "content"}, ...]
+    return: 기사별 집계 토큰 문자열 (제목 가중치 3배 + 본문)
+    - 제목/본문을 따로 분석하므로 수집(tokens) 시점에 캐시된 분석 결과를 그대로 재사용
+    """
+    service = get_kiwi_service()
+    texts = []
+    for row in rows:
+        texts.append(str(row.get("title", "") or ""))
+        texts.append(str(row.get("content", "") or ""))
+    analyzed = service.analyze_many(texts)
 
-    return tokens_list
+    return [aggr_token_str(analyzed[2 * i], analyzed[2 * i + 1]) for i in range(len(rows))]
 
 
 
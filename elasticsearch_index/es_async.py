@@ -0,0 +1,47 @@
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from elasticsearch_index.es_client import new_async_es
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+_aes = None
+
+
+# FastAPI startup 에서 1회 생성해 모든 요청이 같은 연결 풀을 공유
+def start_async_es():
+    global _aes
+    if _aes is None:
+        _aes = new_async_es()
+        logger.info("AsyncElasticsearch 연결 풀 생성")
+    return _aes
+
+
+def get_async_es() -> AsyncElasticsearch:
+    return _aes if _aes is not None else start_async_es()
+
+
+async def close_async_es():
+    global _aes
+    if _aes is not None:
+        await _aes.close()
+        _aes = None
+
+
+async def async_search(index: str, body: dict, **kwargs):
+    return await get_async_es().search(index=index, body=body, **kwargs)
+
+
+async def async_index_docs(index: str, docs: list):
+    if not docs:
+        return 0
+    actions = [{"_index": index, "_source": doc} for doc in docs]
+    try:
+        success_count, errors = await async_bulk(get_async_es(), actions)
+        if errors:
+            logger.error(f"ES Bulk Insert 일부 에러 발생: {errors}")
+        logger.info(f"ES 데이터 적재 성공: {success_count}건")
+        return success_count
+    except Exception as e:
+        logger.error(f"ES Indexing 실패: {e}")
+        return 0
@@ -0,0 +1,71 @@
+import os
+import threading
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+ES_HOST = os.environ.get("ES_HOST", "http://localhost:9200")
+ES_USER = os.environ.get("ES_USER", "elastic")
+ES_PASS = os.environ.get("ES_PASS", "elastic")
+
+ES_POOL_SIZE = 10          # 동기 클라이언트: 프로세스당 노드별 연결 수 (스케줄러 하위 프로세스 포함)
+ES_ASYNC_POOL_SIZE = 50    # 비동기 클라이언트: 서버(uvicorn 워커)당 노드별 연결 수
+ES_REQUEST_TIMEOUT = 30
+ES_MAX_RETRIES = 3
+ES_RETRY_STATUS = (429, 502, 503, 504)
+
+
+# 모든 클라이언트 공통 설정 (keep-alive 연결 풀 재사용 + 재시도/노드 backoff)
+def client_options(pool_size: int):
+    return dict(
+        basic_auth=(ES_USER, ES_PASS),
+        verify_certs=False,
+        ssl_show_warn=False,
+        connections_per_node=pool_size,
+        request_timeout=ES_REQUEST_TIMEOUT,
+        max_retries=ES_MAX_RETRIES,
+        retry_on_timeout=True,
+        retry_on_status=ES_RETRY_STATUS,
+        dead_node_backoff_factor=1.0,
+        max_dead_node_backoff=30.0,
+    )
+
+
+_es = None
+_es_pid = None
+_es_lock = threading.Lock()
+
+
+def get_es() -> Elasticsearch:
+    """
+    프로세스별 동기 ES 클라이언트 (처음 사용할 때 생성)
+    - import 시점에는 연결하지 않음
+    - fork 된 스케줄러 하위 프로세스는 부모의 연결 풀을 쓰지 않고 새로 생성
+    """
+    global _es, _es_pid
+    pid = os.getpid()
+    if _es is None or _es_pid != pid:
+        with _es_lock:
+            if _es is None or _es_pid != pid:
+                _es = Elasticsearch(ES_HOST, **client_options(ES_POOL_SIZE))
+                _es_pid = pid
+                logger.info(f"Elasticsearch 클라이언트 생성 (pid={pid})")
+    return _es
+
+
+def new_async_es() -> AsyncElasticsearch:
+    return AsyncElasticsearch(ES_HOST, **client_options(ES_ASYNC_POOL_SIZE))
+
+
+class LazyElasticsearch:
+    """모듈 전역 `es` 용 지연 프록시: 속성 접근 시 get_es() 로 위임"""
+
+    def __getattr__(self, name):
+        return getattr(get_es(), name)
+
+    def __repr__(self):
+        return f"<LazyElasticsearch {ES_HOST}>"
+
+
+es = LazyElasticsearch()
@@ -1,24 +1,14 @@
 # <elasticsearch의 raw_news 생성 & index에 데이터를 추가, 삭제하는 함수 정의>
 from logger import Logger
-from elasticsearch import Elasticsearch
-from kiwipiepy import Kiwi
+from elasticsearch import helpers
+from elasticsearch_index.es_client import es
+from elasticsearch_index.es_async import get_async_es
+from kiwi_service import get_kiwi_service, aggr_token_str
 
 logger = Logger().get_logger(__name__)
 
-ES_HOST = "http://localhost:9200"
-ES_USER = "elastic"
-ES_PASS = "elastic"
 ES_INDEX = "news_raw"
 
-es = Elasticsearch( # elasticsearch 연결 객체 생성
-    ES_HOST,
-    basic_auth=(ES_USER, ES_PASS),
-    verify_certs=False,
-    ssl_show_warn=False # type: ignore
-)
-
-kiwi = Kiwi()
-
 
 # 기사 meta index
 def ensure_news_raw():
@@ -58,7 +48,12 @@ def ensure_news_raw():
                 "writer_tokens": {
                     "type": "text", "analyzer": "korean_whitespace"
                 },
+                "aggr_tokens": {"type": "text", "index": False},
                 "classified": {"type":"boolean"},
+                "npti": {"type":"keyword"},
+                "npti_confidence": {"type":"float"},
+                "n_words": {"type":"integer"},
+                "n_chars": {"type":"integer"},
             }
         }
     }
@@ -67,6 +62,7 @@ def ensure_news_raw():
         logger.info(f"이미 존재하는 index : {ES_INDEX}")
         cnt = es.count(index=ES_INDEX)["count"]  # raw_news 데이터 수를 cnt 변수에 저장
         logger.info(f"문서 수 : {cnt}")
+        ensure_news_raw_fields(body["mappings"]["properties"])
         return None
 
     try:
@@ -79,18 +75,67 @@ def ensure_news_raw():
         logger.error(f"index 생성 오류 : {e}")
 
 
-def tokens(row:dict, kiwi: Kiwi):
-    def analyze_token(text:str):
-        text = row.get(text,"")
+# 기존 index 에 나중에 추가된 필드 매핑 반영 (이미 다른 타입으로 동적 매핑된 필드는 그대로 둠)
+def ensure_news_raw_fields(properties:dict):
+    global _npti_field
+    mapped = es.indices.get_mapping(index=ES_INDEX)[ES_INDEX]["mappings"].get("properties", {})
+    _npti_field = npti_field_from_mapping(mapped)
+    for field in ("aggr_tokens", "npti", "npti_confidence", "n_words", "n_chars"):
+        if field in mapped:
+            continue
+        try:
+            es.indices.put_mapping(index=ES_INDEX, properties={field: properties[field]})
+            logger.info(f"필드 매핑 추가 : {field}")
+        except Exception as e:
+            logger.error(f"필드 매핑 추가 오류 {field} : {e}")
+
+
+# NPTI 코드 필터에 쓸 keyword 필드 (keyword 매핑 전 동적 매핑된 index 는 npti.keyword)
+# - startup(async 클라이언트) / ensure_news_raw_fields 에서 1번만 정함, 요청 경로에서는 ES 조회 X
+_npti_field = None
+def npti_field_from_mapping(mapped:dict):
+    npti = mapped.get("npti", {"type": "keyword"})
+    if npti.get("type") != "keyword" and "keyword" in npti.get("fields", {}):
+        return "npti.keyword"
+    return "npti"
+
+
+async def resolve_npti_field():
+    global _npti_field
+    try:
+        res = await get_async_es().indices.get_mapping(index=ES_INDEX)
+        _npti_field = npti_field_from_mapping(res[ES_INDEX]["mappings"].get("properties", {}))
+    except Exception as e:
+        logger.error(f"npti 매핑 조회 오류 -> npti 사용 : {e}")
+        _npti_field = "npti"  # 실패해도 캐시 (요청마다 재조회 X)
+    logger.info(f"NPTI 필터 필드 : {_npti_field}")
+    return _npti_field
+
+
+def npti_field():
+    return _npti_field or "npti"
+
+
+def tokens(row:dict):
+    # 제목/본문을 한 번에 배치 분석 (공용 Kiwi 서비스 캐시 사용)
+    texts = [row.get('title', "") or "", row.get('content', "") or ""]
+    analyzed = get_kiwi_service().analyze_many(texts)
+
+    def analyze_token(text:str, result):
         if not text.strip():
             return []
+        return get_kiwi_service().join_forms(result)
+
+    # aggr_tokens: news_aggr 가 재분석 없이 _source 에서 바로 쓰는 품사 필터 토큰 (제목 3배 + 본문)
+    return {"title_tokens": analyze_token(texts[0], analyzed[0]),
+        "content_tokens": analyze_token(texts[1], analyzed[1]),
+        "aggr_tokens": aggr_token_str(analyzed[0], analyzed[1])}
 
-        tokens = kiwi.tokenize(text)
-        tokens_list = " ".join([token.form for token in tokens])
-        return tokens_list
 
-    return {"title_tokens": analyze_token('title'),
-        "content_tokens": analyze_token('content')}
+def text_stats(content:str):
+    # 본문 길이 지표 (수집 시 1번 계산해서 저장 -> 소비자는 본문 대신 숫자 필드만 조회)
+    content = content or ""
+    return {"n_words": len(content.split()), "n_chars": len(content)}
 
 
 def index_sample_row(row:dict): # raw_news 데이터를 indexing하는 함수
@@ -109,6 +154,49 @@ def search_news_row(id_:str):
         logger.error(f"ES 중복 확인 실패 {id_}: {e}")
         return False
 
+def news_word_counts(news_ids:list):
+    # 기사 본문 단어 수(n_words)를 _mget 으로 조회 -> {news_id: n_word} (없는 기사는 0)
+    # n_words 가 없는 예전 문서만 본문을 받아서 계산 (backfill_text_stats 이후에는 본문 조회 없음)
+    if not news_ids:
+        return {}
+    counts = {news_id: 0 for news_id in news_ids}
+    try:
+        res = es.mget(index=ES_INDEX, ids=list(counts), _source=["n_words"])
+        legacy = []
+        for doc in res["docs"]:
+            if not doc.get("found"):
+                continue
+            n_words = doc["_source"].get("n_words")
+            if n_words is None:
+                legacy.append(doc["_id"])
+            else:
+                counts[doc["_id"]] = n_words
+        if legacy:
+            res = es.mget(index=ES_INDEX, ids=legacy, _source=["content"])
+            for doc in res["docs"]:
+                if doc.get("found"):
+                    counts[doc["_id"]] = text_stats(doc["_source"].get("content"))["n_words"]
+    except Exception as e:
+        logger.error(f"본문 단어 수 조회 실패 : {e}")
+    return counts
+
+def backfill_text_stats(batch_size:int = 500):
+    """n_words / n_chars 가 없는 기존 문서에 길이 지표 채우기 (1회성 작업, 다시 실행해도 남은 문서만 처리)"""
+    query = {"query": {"bool": {"must_not": {"exists": {"field": "n_words"}}}}, "_source": ["content"]}
+    actions, count = [], 0
+    for row in helpers.scan(es, index=ES_INDEX, query=query, size=batch_size):
+        actions.append({"_op_type": "update", "_index": ES_INDEX, "_id": row["_id"],
+                        "doc": text_stats(row["_source"].get("content"))})
+        if len(actions) >= batch_size:
+            success, _ = helpers.bulk(es, actions, raise_on_error=False)
+            count += success
+            actions = []
+    if actions:
+        success, _ = helpers.bulk(es, actions, raise_on_error=False)
+        count += success
+    logger.info(f"n_words / n_chars backfill 완료 : {count}건")
+    return count
+
 def search_news_condition(search_condition:dict):
     try:
         result = es.search(index=ES_INDEX, body=search_condition, request_timeout=300)
@@ -132,6 +220,7 @@ if __name__ == "__main__": # 이 파일에서 직접 실행할 때만 아래 내
         # logger.info(f'{ES_INDEX} 삭제 완료')
         cnt = es.count(index=ES_INDEX)["count"] # raw_news 데이터 수를 cnt 변수에 저장
         logger.info(f"문서 수 : {cnt}")
+        backfill_text_stats() # 기존 문서 n_words / n_chars 채우기
     except Exception as e:
         logger.info(f"문서 수 조회 오류 : {e}") # error 시 error log 출력
 
@@ -1,21 +1,36 @@
+import os
+import json
 from collections import defaultdict
 
+import numpy as np
 from logger import Logger
-from elasticsearch import Elasticsearch,helpers
+from elasticsearch import helpers
+from elasticsearch_index.es_client import es
 
 logger = Logger().get_logger(__name__)
 
-ES_HOST = "http://localhost:9200"
-ES_USER = "elastic"
-ES_PASS = "elastic"
 ES_INDEX = "user_behavior"
+PACKED_INDEX = "user_behavior_packed"
 
-es = Elasticsearch( # elasticsearch 연결 객체 생성
-    ES_HOST,
-    basic_auth=(ES_USER, ES_PASS),
-    verify_certs=False,
-    ssl_show_warn=False # type: ignore
-)
+# 행동 로그 저장 방식
+# - row    : 1초 샘플 1개 = ES 문서 1개 (기존 방식, ES_INDEX)
+# - packed : 비콘 1번(user, news) = ES 문서 1개, 샘플 필드는 배열로 저장 (PACKED_INDEX)
+BEHAVIOR_STORAGE = os.environ.get("BEHAVIOR_STORAGE", "row")
+
+# ES 필드명 -> (JS 필드명, dtype)
+SAMPLE_FIELDS = {
+    "timestamp": ("elapsedMs", np.int64),
+    "MMF_X_inf": ("MMF_X", np.float64),
+    "MMF_Y_inf": ("MMF_Y", np.float64),
+    "MSF_Y_inf": ("MSF_Y", np.float64),
+    "mouseX": ("mouseX", np.float64),
+    "mouseY": ("mouseY", np.float64),
+    "baseline": ("baseline", np.float64),
+}
+
+
+def behavior_index():
+    return PACKED_INDEX if BEHAVIOR_STORAGE == "packed" else ES_INDEX
 
 def ensure_index():
     body = {
@@ -49,6 +64,103 @@ def ensure_index():
     except Exception as e:
         logger.error(f"index 생성 오류 : {e}")
 
+def ensure_packed_index():
+    # 샘플 배열(samples)은 검색/집계에 쓰지 않으므로 색인하지 않고 _source 에만 저장
+    body = {
+        "mappings": {
+            "properties": {
+                "user_id": {"type": "keyword"},
+                "news_id": {"type": "keyword"},
+                "n_samples": {"type": "integer"},
+                "stored_time": {"type": "date", "format": "strict_date_optional_time||epoch_millis"},
+                "samples": {"type": "object", "enabled": False},
+            }
+        }
+    }
+    if es.indices.exists(index=PACKED_INDEX):
+        logger.info(f"이미 존재하는 index : {PACKED_INDEX}")
+        return None
+
+    try:
+        res = es.indices.create(index=PACKED_INDEX, body=body)
+        if res.get("acknowledged"):
+            logger.info(f"index 생성 완료 : {PACKED_INDEX}")
+        else:
+            logger.error(f"index 생성 실패 : {res}")
+    except Exception as e:
+        logger.error(f"index 생성 오류 : {e}")
+
+def behavior_row_docs(user_id, news_id, stored_time, raw_logs: list):
+    # JS 변수명 -> ES 매핑 변수명 변환 (샘플 1개 = 문서 1개)
+    return [
+        {
+            "user_id": user_id,
+            "news_id": news_id,
+            **{field: (int(log.get(js_name, 0)) if dtype is np.int64 else log.get(js_name, 0.0))
+               for field, (js_name, dtype) in SAMPLE_FIELDS.items()},
+            "stored_time": stored_time,
+        }
+        for log in raw_logs
+    ]
+
+def pack_behavior_doc(user_id, news_id, stored_time, raw_logs: list):
+    # 비콘 1번의 샘플들을 필드별 배열로 묶은 문서 1개 (user_id / news_id / stored_time 반복 제거)
+    samples = {
+        field: [(int(log.get(js_name, 0)) if dtype is np.int64 else log.get(js_name, 0.0)) for log in raw_logs]
+        for field, (js_name, dtype) in SAMPLE_FIELDS.items()
+    }
+    return {
+        "user_id": user_id,
+        "news_id": news_id,
+        "n_samples": len(raw_logs),
+        "stored_time": stored_time,
+        "samples": samples,
+    }
+
+def behavior_docs(user_id, news_id, stored_time, raw_logs: list):
+    # 저장 방식(BEHAVIOR_STORAGE)에 맞는 문서 목록
+    if not raw_logs:
+        return []
+    if BEHAVIOR_STORAGE == "packed":
+        return [pack_behavior_doc(user_id, news_id, stored_time, raw_logs)]
+    return behavior_row_docs(user_id, news_id, stored_time, raw_logs)
+
+def group_behavior_docs(docs: list):
+    """
+    flush 된 문서 묶음(row / packed 섞여도 됨) -> {(user_id, news_id): 기사별 로그}
+    - row    : [{},{}] (timestamp 오름차순)
+    - packed : 컬럼 dict (NumPy 배열)
+    """
+    rows, packed = defaultdict(list), defaultdict(list)
+    for doc in docs:
+        key = (doc.get("user_id"), doc.get("news_id"))
+        if not key[0] or not key[1]:
+            continue
+        (packed if "samples" in doc else rows)[key].append(doc)
+    groups = {key: sorted(logs, key=lambda d: (d.get("stored_time") or "", d.get("timestamp", 0)))
+              for key, logs in rows.items()}
+    for key, logs in packed.items():
+        groups[key] = unpack_behavior_docs(logs)
+    return groups
+
+def unpack_behavior_docs(docs: list):
+    """
+    같은 (user, news) 의 packed 문서들 -> model_predict_proba 입력용 컬럼 dict
+    {"user_id": str, "news_id": str, "timestamp": ndarray(int64), "MMF_X_inf": ndarray(float64), ...}
+    (stored_time, timestamp 오름차순 = 기존 row 방식 검색 정렬과 동일)
+    """
+    docs = sorted(docs, key=lambda d: d.get("stored_time") or "")
+    columns = {}
+    for field, (js_name, dtype) in SAMPLE_FIELDS.items():
+        parts = [np.asarray(d["samples"].get(field, []), dtype=dtype) for d in docs]
+        columns[field] = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    # 같은 stored_time(비콘) 안에서는 timestamp 순 -> 비콘 번호, timestamp 로 안정 정렬
+    beacon_no = np.repeat(np.arange(len(docs)), [len(d["samples"].get("timestamp", [])) for d in docs])
+    order = np.lexsort((columns["timestamp"], beacon_no))
+    columns = {field: col[order] for field, col in columns.items()}
+    return {"user_id": docs[0]["user_id"], "news_id": docs[0]["news_id"], **columns}
+
 def index_user_behavior(behavior_list:list): # raw_news 데이터를 indexing하는 함수
     if not behavior_list:
         return 0
@@ -73,47 +185,119 @@ def index_user_behavior(behavior_list:list): # raw_news 데이터를 indexing하
         logger.error(f"ES Indexing 실패: {e}")
         return 0
 
-def search_user_behavior(user_id: str, start_timestamp):
-    body = {
-        "query": {
-            "bool": {
-                "filter": [
-                    # 1. user_id 일치 (keyword 타입이므로 term 사용)
-                    {"term": {"user_id": user_id}},
-
-                    # 2. timestamp가 start_timestamp 이상 (gte)
-                    {"range": {"stored_time": {"gte": start_timestamp}}}
-                ]
-            }
-        },
-        # 3. 시간 순서대로 정렬 (오름차순)
-        "sort": [
-            {"stored_time": {"order": "asc"}},
-            {"news_id": {"order": "asc"}},
-            {"timestamp":{"order":"asc"}}
-        ],
-        "size": 10000
+BEHAVIOR_PAGE_SIZE = 5000   # search_after 페이지 크기
+PIT_KEEP_ALIVE = "1m"       # 페이지 사이 point-in-time 유지 시간
+
+def behavior_query(user_id: str, start_timestamp, end_timestamp=None):
+    stored_range = {"gte": start_timestamp}
+    if end_timestamp is not None:
+        stored_range["lt"] = end_timestamp
+    return {
+        "bool": {
+            "filter": [
+                # 1. user_id 일치 (keyword 타입이므로 term 사용)
+                {"term": {"user_id": user_id}},
+
+                # 2. timestamp가 start_timestamp 이상 (gte), end_timestamp 미만 (lt)
+                {"range": {"stored_time": stored_range}}
+            ]
+        }
     }
-    try:
-        response = es.search(index="user_behavior", body=body)
 
-        # 검색된 문서들의 _source만 리스트로 반환
-        hits = response['hits']['hits']
-        logs = [hit['_source'] for hit in hits]
+def iter_behavior_hits(index: str, query: dict, sort: list, source=None, page_size: int = BEHAVIOR_PAGE_SIZE):
+    """
+    point-in-time + search_after 로 조건에 맞는 hit 을 끝까지 순회 (10000 건 제한 없음)
+    - PIT 로 페이지 사이에 들어온 새 로그 / refresh 영향 없이 같은 스냅샷을 읽음
+    - 메모리에는 한 페이지만 유지
+    """
+    pit_id = es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE)["id"]
+    search_after = None
+    try:
+        while True:
+            body = {
+                "query": query,
+                "sort": sort + [{"_shard_doc": "asc"}], # 동일 정렬값 tiebreaker
+                "size": page_size,
+                "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                "track_total_hits": False,
+            }
+            if source is not None:
+                body["_source"] = source
+            if search_after is not None:
+                body["search_after"] = search_after
+            res = es.search(body=body)
+            pit_id = res.get("pit_id", pit_id)
+            hits = res["hits"]["hits"]
+            if not hits:
+                break
+            yield from hits
+            if len(hits) < page_size:
+                break
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.warning(f"PIT 종료 실패 : {e}")
 
-        grouped_dict = defaultdict(list) #
-        for log in logs:
-            n_id = log.get('news_id')
-            if n_id:
-                grouped_dict[n_id].append(log)
-        grouped_logs = list(grouped_dict.values())
-        print(f'[검색 완료] User: {user_id} | Total logs: {len(logs)} | Groups: {len(grouped_logs)}')
-        return grouped_logs
+def group_by_news(hits):
+    # news_id 순으로 정렬된 hit 을 기사 단위로 끊어서 반환 (기사 1개 분량만 메모리에 유지)
+    current_id, group = None, []
+    for hit in hits:
+        doc = hit['_source']
+        n_id = doc.get('news_id')
+        if not n_id:
+            continue
+        if n_id != current_id and group:
+            yield current_id, group
+            group = []
+        current_id = n_id
+        group.append(doc)
+    if group:
+        yield current_id, group
 
+def search_user_behavior(user_id: str, start_timestamp, end_timestamp=None):
+    """
+    기사별 행동 로그를 하나씩 yield 하는 generator
+    - row    : [{},{}] (stored_time, timestamp 오름차순)
+    - packed : 컬럼 dict (NumPy 배열)
+    news_id 를 1순위로 정렬해 같은 기사의 로그가 연속으로 오므로 기사 단위로 바로 처리 가능
+    """
+    packed = BEHAVIOR_STORAGE == "packed"
+    index = PACKED_INDEX if packed else ES_INDEX
+    sort = [{"news_id": {"order": "asc"}}, {"stored_time": {"order": "asc"}}]
+    if not packed:
+        sort.append({"timestamp": {"order": "asc"}})
 
+    total, groups = 0, 0
+    try:
+        hits = iter_behavior_hits(index, behavior_query(user_id, start_timestamp, end_timestamp), sort)
+        for news_id, docs in group_by_news(hits):
+            group = unpack_behavior_docs(docs) if packed else docs
+            total += len(group["timestamp"]) if packed else len(group)
+            groups += 1
+            yield group
     except Exception as e:
         print(f"[검색 실패] {e}")
-        return []
+    print(f'[검색 완료] User: {user_id} | Total logs: {total} | Groups: {groups}')
+
+def encoding_size_report(n_beacons: int = 100, samples_per_beacon: int = 30):
+    """row / packed 방식의 문서 수, _source JSON 크기 비교 (ES 없이 확인)"""
+    rng = np.random.default_rng(0)
+    stored_time = "2026-01-07T12:00:00+09:00"
+    row_docs, packed_docs = [], []
+    for b in range(n_beacons):
+        raw_logs = [{"elapsedMs": (i + 1) * 1000, "MMF_X": float(rng.random()), "MMF_Y": float(rng.random()),
+                     "MSF_Y": float(rng.random()), "mouseX": float(rng.random() * 1000),
+                     "mouseY": float(rng.random() * 1000), "baseline": float(rng.random())}
+                    for i in range(samples_per_beacon)]
+        row_docs += behavior_row_docs("user01", f"news{b:04d}", stored_time, raw_logs)
+        packed_docs.append(pack_behavior_doc("user01", f"news{b:04d}", stored_time, raw_logs))
+    row_bytes = sum(len(json.dumps(d)) for d in row_docs)
+    packed_bytes = sum(len(json.dumps(d)) for d in packed_docs)
+    print(f"row    : 문서 {len(row_docs)}개 | _source {row_bytes / 1024:.1f} KB")
+    print(f"packed : 문서 {len(packed_docs)}개 | _source {packed_bytes / 1024:.1f} KB")
+    print(f"문서 수 {len(row_docs) / len(packed_docs):.0f}배 감소 | _source {row_bytes / packed_bytes:.1f}배 감소")
 
 if __name__ == "__main__": # 이 파일에서 직접 실행할 때만 아래 내용이 실행되도록 하는 조건문
     if es.ping(): # elasticsearch에 요청을 보냈을 때 응답이 오는지 확인하는 함수(es 연결 확인 -> True/False)
@@ -121,12 +305,14 @@ if __name__ == "__main__": # 이 파일에서 직접 실행할 때만 아래 내
     else:
         logger.info(f"ES 연결 실패")
     ensure_index()
+    ensure_packed_index()
+    encoding_size_report()
     try:
         # es.indices.delete(index=ES_INDEX)
         # logger.info(f'{ES_INDEX} 삭제 완료')
         cnt = es.count(index=ES_INDEX)["count"] # raw_news 데이터 수를 cnt 변수에 저장
         logger.info(f"문서 수 : {cnt}")
-        logs = search_user_behavior(user_id="admin")
-        print(logs)
+        for logs in search_user_behavior(user_id="admin", start_timestamp="now-1d"):
+            print(logs)
     except Exception as e:
         logger.info(f"문서 수 조회 오류 : {e}") # error 시 error log 출력
\ No newline at end of file
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from kiwipiepy import Kiwi
+from logger import Logger
+
+logger = Logger().get_logger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+KIWI_CACHE_PATH = os.path.join(base_dir, "kiwi_cache", "kiwi_tokens.sqlite3")
+KIWI_WORKERS = max((os.cpu_count() or 2) - 1, 1)   # Kiwi 배치 분석 스레드 수
+KIWI_LRU_SIZE = 20000                                # 메모리 LRU 항목 수
+KIWI_CACHE_TTL = 14 * 86400                          # 디스크 캐시: 이 기간(초) 동안 안 쓰인 항목 삭제
+KIWI_CACHE_MAX_ROWS = 300000                         # 디스크 캐시 최대 항목 수 (넘으면 오래 안 쓰인 순으로 삭제)
+KIWI_CACHE_PRUNE_INTERVAL = 3600                     # 정리 주기(초), 저장할 때 확인
+KIWI_CACHE_TOUCH_INTERVAL = 86400                    # 조회 시 used_at 갱신은 이 간격(초) 이상 지났을 때만
+
+# tokens_aggr 에서 제거하는 품사 (J: 조사, E: 어미, S: 부호/숫자, NNB: 의존명사, XP: 접두사, XS: 접미사)
+AGGR_EXCLUDE_TAGS = ('J', 'E', 'S', 'NNB', 'XP', 'XS')
+
+
+def text_key(text: str):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class KiwiService:
+    """
+    프로세스 공용 Kiwi 형태소 분석 서비스
+    - Kiwi 사전은 프로세스당 1회만 로드 (fork 된 자식 프로세스에서는 새로 로드)
+    - 분석 결과 [(form, tag), ...] 를 본문 해시로 캐시 (메모리 LRU + 디스크 sqlite)
+    - 캐시에 없는 본문만 모아서 Kiwi 배치 분석 (num_workers 스레드, 캐시 lock 과 분리)
+    """
+
+    def __init__(self, num_workers: int = KIWI_WORKERS, lru_size: int = KIWI_LRU_SIZE,
+                 cache_path: str = KIWI_CACHE_PATH):
+        self.num_workers = num_workers
+        self.lru_size = lru_size
+        self.cache_path = cache_path
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()            # 메모리 LRU / sqlite 캐시용
+        self.tokenize_lock = threading.Lock()   # Kiwi 분석용 (Kiwi 자체가 num_workers 스레드로 병렬 처리)
+        self.pid = None
+        self._kiwi = None
+        self._db = None
+        self.last_prune = 0
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "analyzed": 0, "pruned": 0}
+
+    # ---------- 리소스 (프로세스별 지연 생성) ----------
+    def check_pid(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._kiwi = None
+            self._db = None
+
+    @property
+    def kiwi(self):
+        self.check_pid()
+        if self._kiwi is None:
+            logger.info(f"[KIWI] 사전 로드 (num_workers={self.num_workers})")
+            self._kiwi = Kiwi(num_workers=self.num_workers)
+        return self._kiwi
+
+    @property
+    def db(self):
+        self.check_pid()
+        if self._db is None and self.cache_path:
+            try:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                self._db = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS kiwi_cache (key TEXT PRIMARY KEY, tokens TEXT, used_at REAL)"
+                )
+                columns = {row[1] for row in self._db.execute("PRAGMA table_info(kiwi_cache)")}
+                if "used_at" not in columns:  # 이전 버전 캐시 파일: 지금 시각으로 채워서 TTL 적용
+                    self._db.execute("ALTER TABLE kiwi_cache ADD COLUMN used_at REAL")
+                    self._db.execute("UPDATE kiwi_cache SET used_at = ?", (time.time(),))
+                self._db.execute("CREATE INDEX IF NOT EXISTS kiwi_cache_used_at ON kiwi_cache (used_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[KIWI] 디스크 캐시 사용 불가 -> 메모리 캐시만 사용: {e}")
+                self.cache_path = None
+                self._db = None
+        return self._db
+
+    # ---------- 캐시 ----------
+    def lru_put(self, key, value):
+        self.lru[key] = value
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def disk_get(self, keys):
+        db = self.db
+        if db is None or not keys:
+            return {}
+        found = {}
+        stale = []
+        now = time.time()
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            rows = db.execute(
+                f"SELECT key, tokens, used_at FROM kiwi_cache WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for key, value, used_at in rows:
+                found[key] = [tuple(t) for t in json.loads(value)]
+                if used_at is None or now - used_at > KIWI_CACHE_TOUCH_INTERVAL:
+                    stale.append(key)
+        if stale:
+            try:
+                db.executemany("UPDATE kiwi_cache SET used_at = ? WHERE key = ?", [(now, key) for key in stale])
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[KIWI] 디스크 캐시 used_at 갱신 실패: {e}")
+        return found
+
+    def disk_put(self, items):
+        db = self.db
+        if db is None or not items:
+            return
+        try:
+            now = time.time()
+            db.executemany(
+                "INSERT OR REPLACE INTO kiwi_cache (key, tokens, used_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now) for key, value in items.items()],
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[KIWI] 디스크 캐시 저장 실패: {e}")
+            return
+        if now - self.last_prune >= KIWI_CACHE_PRUNE_INTERVAL:
+            self.disk_prune(now)
+
+    def disk_prune(self, now=None):
+        """TTL 지난 항목 삭제 후, 그래도 KIWI_CACHE_MAX_ROWS 를 넘으면 오래 안 쓰인 순으로 삭제"""
+        db = self.db
+        if db is None:
+            return 0
+        now = now or time.time()
+        self.last_prune = now
+        try:
+            removed = db.execute("DELETE FROM kiwi_cache WHERE used_at < ?", (now - KIWI_CACHE_TTL,)).rowcount
+            excess = db.execute("SELECT COUNT(*) FROM kiwi_cache").fetchone()[0] - KIWI_CACHE_MAX_ROWS
+            if excess > 0:
+                removed += db.execute(
+                    "DELETE FROM kiwi_cache WHERE key IN (SELECT key FROM kiwi_cache ORDER BY used_at LIMIT ?)",
+                    (excess,)
+                ).rowcount
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[KIWI] 디스크 캐시 정리 실패: {e}")
+            return 0
+        if removed:
+            self.stats["pruned"] += removed
+            logger.info(f"[KIWI] 디스크 캐시 정리 {removed}건")
+        return removed
+
+    # ---------- 분석 ----------
+    def analyze_many(self, texts):
+        """texts 각각의 [(form, tag), ...] 리스트 (입력 순서 유지)"""
+        texts = [text or "" for text in texts]
+        keys = [text_key(text) for text in texts]
+        results = {}
+
+        with self.lock:
+            for key in keys:
+                if key in self.lru:
+                    self.lru.move_to_end(key)
+                    results[key] = self.lru[key]
+                    self.stats["lru_hits"] += 1
+
+            missing = {key for key in keys if key not in results}
+            for key, value in self.disk_get(missing).items():
+                results[key] = value
+                self.lru_put(key, value)
+                self.stats["disk_hits"] += 1
+
+            todo = {}
+            for key, text in zip(keys, texts):
+                if key not in results and key not in todo:
+                    todo[key] = text
+
+        if todo:
+            # 캐시 lock 밖에서 분석 -> 다른 스레드의 캐시 조회는 분석을 기다리지 않음
+            todo_keys = list(todo)
+            with self.tokenize_lock:
+                tokenized = list(self.kiwi.tokenize([todo[k] for k in todo_keys]))  # 제너레이터 -> lock 안에서 소비
+            analyzed = {key: [(token.form, token.tag) for token in tokens]
+                        for key, tokens in zip(todo_keys, tokenized)}
+            results.update(analyzed)
+            with self.lock:
+                for key, value in analyzed.items():
+                    self.lru_put(key, value)
+                self.disk_put(analyzed)
+                self.stats["analyzed"] += len(analyzed)
+
+        return [results[key] for key in keys]
+
+    def analyze(self, text: str):
+        return self.analyze_many([text])[0]
+
+    @staticmethod
+    def join_forms(analyzed, exclude_tags=()):
+        if exclude_tags:
+            return " ".join(form for form, tag in analyzed if not tag.startswith(exclude_tags))
+        return " ".join(form for form, _ in analyzed)
+
+
+# 집계(news_aggr)용 토큰 문자열: 품사 필터 후 제목 3배 가중치 + 본문
+def aggr_token_str(title_analyzed, content_analyzed):
+    title = KiwiService.join_forms(title_analyzed, AGGR_EXCLUDE_TAGS)
+    content = KiwiService.join_forms(content_analyzed, AGGR_EXCLUDE_TAGS)
+    return " ".join(part for part in [title] * 3 + [content] if part)
+
+
+_kiwi_service = None
+_kiwi_service_lock = threading.Lock()
+
+
+def get_kiwi_service() -> KiwiService:
+    global _kiwi_service
+    with _kiwi_service_lock:
+        if _kiwi_service is None:
+            _kiwi_service = KiwiService()
+    return _kiwi_service
@@ -1,17 +1,19 @@
 from fastapi import FastAPI, Depends, Query, Request, Body, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from starlette.responses import JSONResponse, RedirectResponse, HTMLResponse
 from starlette.staticfiles import StaticFiles
 import random
+import time
 import pandas as pd
 import asyncio
-from algorithm.user_NPTI import model_predict_proba
-from bigkinds_crawling.scheduler import sch_start, result_queue
+from algorithm.user_npti_online import get_online_updater
+from bigkinds_crawling.scheduler import sch_start, result_queue, classify_pool
+from bigkinds_crawling.result_bridge import ResultQueueBridge
 from bigkinds_crawling.sample import sample_crawling, get_sample
 from logger import Logger
 from typing import Optional
-from bigkinds_crawling.news_raw import news_crawling, get_news_raw, search_article
-from bigkinds_crawling.news_aggr_grouping import news_aggr, related_news
+from bigkinds_crawling.news_raw import news_crawling, get_news_raw, article_body, article_info
+from bigkinds_crawling.news_aggr_grouping import news_aggr, related_news_body, related_news_results
 from sqlalchemy.orm import Session
 from database import get_db
 from db_index.db_npti_type import get_all_npti_type, get_npti_type_by_group, npti_type_response, NptiTypeTable
@@ -19,19 +21,24 @@ from db_index.db_npti_code import get_all_npti_codes, get_npti_code_by_code, npt
 from db_index.db_npti_question import get_all_npti_questions, get_npti_questions_by_axis, npti_question_response
 from db_index.db_user_info import UserCreateRequest, insert_user, authenticate_user, deactivate_user, get_my_page_data, \
     UserInfo, verify_password, UserUpdate, hash_password, get_user_info
-from db_index.db_user_npti import get_user_npti_info, finalize_score
+from db_index.db_user_npti import get_user_npti_info
 from sqlalchemy import text
 from starlette.middleware.sessions import SessionMiddleware
-from elasticsearch import Elasticsearch, ConnectionError as ESConnectionError
+from elasticsearch import ConnectionError as ESConnectionError
 from datetime import timedelta, datetime, timezone
 from db_index.db_user_answers import insert_user_answers
 from db_index.db_user_npti import insert_user_npti
+from db_index.db_member_stats import get_members_statistics
 import json
-from elasticsearch_index.es_user_behavior import index_user_behavior, search_user_behavior
+import base64
+import hashlib
+from email.utils import format_datetime
+from elasticsearch_index.es_user_behavior import behavior_docs, behavior_index, \
+    ensure_packed_index, BEHAVIOR_STORAGE
+from elasticsearch_index.es_async import start_async_es, get_async_es, close_async_es, async_search
+from elasticsearch_index.behavior_buffer import BehaviorIngestBuffer
 from db_index.db_user_npti import UserNPTITable, UserNPTIResponse
-from elasticsearch_index.es_raw import ES_INDEX, search_news_condition
-from db_index.db_articles_NPTI import ArticlesNPTI
-import math
+from elasticsearch_index.es_raw import ES_INDEX, search_news_condition, npti_field, resolve_npti_field
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -55,6 +62,11 @@ app.add_middleware(
     same_site="lax"         # 기본 보안 옵션
 )
 
+# /log/behavior 비콘 수집 버퍼 (user_behavior 로 배치 인덱싱)
+# 저장된 묶음은 사용자 NPTI 온라인 갱신기에 바로 반영
+npti_online = get_online_updater()
+behavior_buffer = BehaviorIngestBuffer(behavior_index(), on_flush=npti_online.fold_docs)
+
 @app.get("/")
 def main():
     return FileResponse("view/html/main.html")
@@ -67,14 +79,24 @@ async def view_page():
 
 @app.get("/article/{news_id}")
 async def get_article(news_id:str):
-    news_info = search_article(news_id)
-    related = related_news(news_info["title"], news_id, news_info["category"])
+    # 기사 / 관련 기사 모두 AsyncElasticsearch 로 조회 (이벤트 루프 블로킹 X)
+    try:
+        news_info = article_info(await async_search(ES_INDEX, article_body(news_id)))
+    except Exception as e:
+        logger.error(f"{news_id}에 해당하는 기사가 없습니다 : {e}")
+        news_info = None
+    if not news_info:
+        return JSONResponse(content=None, status_code=404)
+
+    try:
+        res = await async_search(ES_INDEX, related_news_body(news_info["title"], news_id, news_info["category"]))
+        related = related_news_results(res)
+    except Exception as e:
+        logger.info(f"검색 중 에러 발생 : {e}")
+        related = None
     news_info["related_news"] = related
     print(f"related : {related}")
-    if news_info:
-        return JSONResponse(content=news_info,  status_code=200)
-    else:
-        return JSONResponse(content=None, status_code=404)
+    return JSONResponse(content=news_info,  status_code=200)
 
 
 # JS의 sendBeacon('/log/behavior') 경로와 일치시킴
@@ -92,27 +114,15 @@ async def collect_behavior_log(request: Request):
         raw_logs = data.get("logs", [])
         stored_time = datetime.now(timezone(timedelta(hours=9))).isoformat(timespec='seconds')
 
-        processed_docs = []
-        for log in raw_logs:
-            # JS 변수명 -> ES 매핑 변수명 변환
-            doc = {
-                "user_id": user_id,
-                "news_id": news_id,
-                "MMF_X_inf": log.get("MMF_X", 0.0),  # JS: MMF_X -> ES: MMF_X_inf
-                "MMF_Y_inf": log.get("MMF_Y", 0.0),  # JS: MMF_Y -> ES: MMF_Y_inf
-                "MSF_Y_inf": log.get("MSF_Y", 0.0),  # JS: MSF_Y -> ES: MSF_Y_inf
-                "mouseX": log.get("mouseX", 0.0),
-                "mouseY": log.get("mouseY", 0.0),
-                "timestamp": int(log.get("elapsedMs", 0)),
-                "baseline": log.get("baseline", 0.0),
-                "stored_time": stored_time
-            }
-            processed_docs.append(doc)
+        # 3. JS 변수명 -> ES 매핑 변수명 변환 (BEHAVIOR_STORAGE 에 따라 샘플별 문서 / 비콘당 packed 문서 1개)
+        processed_docs = behavior_docs(user_id, news_id, stored_time, raw_logs)
 
-        # 4. [저장] ES 인덱싱
+        # 4. [저장] 수집 버퍼에 적재 -> 백그라운드에서 모아서 ES bulk 인덱싱
         if processed_docs:
-            count = index_user_behavior(processed_docs)
-            print(f"[Log] User:{user_id} | News:{news_id} | {count} 개 데이터 저장 완료")
+            accepted = await behavior_buffer.submit(processed_docs)
+            if not accepted:
+                return JSONResponse(status_code=503, content={"status": "busy", "message": "로그 수집 지연"})
+            count = len(raw_logs)
             return {"status": "ok", "message": f"{count}개 로그 저장"}
         else:
             return {"status": "ok", "message": "저장할 로그 없음"}
@@ -167,6 +177,14 @@ async def scheduler_start():
     else:
         return {'msg': '이미 실행 중입니다.'}
 
+@app.get("/log/behavior/metrics") # 행동 로그 수집 버퍼 상태 (대기 / 적재 / 거절 건수)
+def behavior_buffer_metrics():
+    return behavior_buffer.metrics()
+
+@app.get("/classify_worker/metrics") # NPTI 분류 워커 상태 (지연시간 / 큐 적재량)
+def classify_worker_metrics():
+    return classify_pool.metrics()
+
 @app.get("/news_aggr")
 def news_aggr_start():
     tfid = news_aggr()
@@ -235,6 +253,8 @@ async def save_test_result(request: Request, payload: dict = Body(...), db: Sess
         insert_user_npti(db, npti_params)
 
         db.commit()  # 최종 커밋
+        # 재검사: 예전 결과에서 누적 중이던 온라인 상태는 버리고 이번 결과부터 다시 누적
+        npti_online.reset_user(user_id)
         request.session['hasNPTI']=True
         request.session['npti_result'] = payload.get("npti_result")
         return {"success": True, "message": "저장 완료"}
@@ -292,12 +312,6 @@ def main():
     return FileResponse("view/html/search.html")
 
 
-es = Elasticsearch(
-    "http://localhost:9200",
-    basic_auth=("elastic", "elastic"),
-    verify_certs=False
-)
-
 FIELD_MAP = {
     "title": "title_tokens",
     "content": "content_tokens",
@@ -306,7 +320,7 @@ FIELD_MAP = {
 }
 
 @app.post("/search")
-def search_news(payload: dict = Body(...)):
+async def search_news(payload: dict = Body(...)):
     # 1. 요청 데이터 추출
     query_obj = payload.get("query", {}).get("multi_match", {})
     q = query_obj.get("query", "")
@@ -338,12 +352,12 @@ def search_news(payload: dict = Body(...)):
 
     try:
         # 3. ES 검색 실행 (JS 렌더링에 필요한 필드들을 _source에 명시)
-        res = es.search(
-            index="news_raw",
-            body=search_condition,
+        res = await async_search(
+            "news_raw",
+            search_condition,
             _source=["title", "content", "media", "category", "img", "pubdate"]
         )
-        return res  # Elasticsearch 응답 구조 그대로 반환
+        return res.body  # Elasticsearch 응답 구조 그대로 반환
 
     except ESConnectionError as e:
         logger.error(f"ES 연결 실패: {e}")
@@ -670,35 +684,40 @@ async def get_user_npti(request: Request,db: Session = Depends(get_db)):
     }
 
 
+def encode_cursor(sort_values):
+    return base64.urlsafe_b64encode(json.dumps(sort_values, ensure_ascii=False).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="잘못된 cursor 값입니다.")
+
+
 @app.get("/curated/news")
 async def get_curated_news(
         npti: str = Query(...),
         category: str = "all",
         sort_type: str = "accuracy",
         page: int = 1,
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = None,
 ):
-
+    """
+    NPTI 코드별 큐레이션 기사
+    - news_raw 문서의 npti(keyword) 필드로 바로 필터 (MySQL news_id 목록 조회 X)
+    - page: from/size 페이지네이션 / cursor: search_after 커서 페이지네이션 (응답의 next_cursor 전달, 첫 페이지는 cursor="")
+    """
     ITEMS_PER_PAGE = 20  # 한 페이지에 기사 20개
-    offset = (page - 1) * ITEMS_PER_PAGE
-
-    # DB에서 해당 NPTI_code를 가진 news_id 리스트를 먼저 가져옴
-    news_ids = db.query(ArticlesNPTI.news_id).filter(
-        ArticlesNPTI.NPTI_code == npti
-    ).all()
-
-    id_list = [id[0] for id in news_ids]
-    if not id_list:
-        return {"articles": [], "total": 0}
 
     # ES 쿼리 작성
     body = {
         "track_total_hits": True,
-        "from": offset,
         "size": ITEMS_PER_PAGE,
+        "_source": ["news_id", "title", "content", "media", "pubdate", "img", "category"],
         "query": {
             "bool": {
-                "must": [{"terms": {"news_id": id_list}}]
+                "must": [{"term": {npti_field(): npti}}]
             }
         }
     }
@@ -708,14 +727,22 @@ async def get_curated_news(
             {"match": {"category": category}}  #term 쓰려면 ES 매핑 수정해야함
         ]
 
-    # 3. 정렬 조건 처리
+    # 3. 정렬 조건 처리 (search_after 를 위해 news_id 로 동점 정렬 고정)
     if sort_type == "latest":
         body["sort"] = [{"pubdate": {"order": "desc"}}]
+    elif sort_type == "confidence": # 분류 시 저장된 NPTI 예측 확신도 순
+        body["sort"] = [{"npti_confidence": {"order": "desc", "missing": "_last", "unmapped_type": "float"}}]
     else:
         body["sort"] = [{"_score": {"order": "desc"}}]
+    body["sort"].append({"news_id": {"order": "asc"}})
+
+    if cursor is None:
+        body["from"] = (page - 1) * ITEMS_PER_PAGE
+    elif cursor:
+        body["search_after"] = decode_cursor(cursor)
 
     try:
-        res = es.search(index=ES_INDEX, body=body)
+        res = await async_search(ES_INDEX, body)
         hits = res["hits"]["hits"]
 
         # 3. 기존 search_article의 데이터 가공 방식을 그대로 활용
@@ -736,7 +763,8 @@ async def get_curated_news(
         return {
             "articles": articles,
             "total": total_count,
-            "sort":body["sort"][0]
+            "sort":body["sort"][0],
+            "next_cursor": encode_cursor(hits[-1]["sort"]) if len(hits) == ITEMS_PER_PAGE else None
         }
     except Exception as e:
         logger.error(f"큐레이션 뉴스 검색 오류: {e}")
@@ -744,97 +772,12 @@ async def get_curated_news(
 
 @app.get("/update_user_npti")
 def update_user_npti(request: Request, db: Session = Depends(get_db)):
+    # 비콘 flush 때마다 누적해 둔 점수를 읽어서 저장 (전체 로그 재생 X, 추적 전 사용자만 1회 재생)
     user_id = request.session.get("user_id")
-    latest_user_npti = get_user_npti_info(db, user_id)
-    long_score = latest_user_npti.get("long_score")
-    short_score = latest_user_npti.get("short_score")
-    content_score = latest_user_npti.get("content_score")
-    tale_score = latest_user_npti.get("tale_score")
-    fact_score = latest_user_npti.get("fact_score")
-    insight_score = latest_user_npti.get("insight_score")
-    positive_score = latest_user_npti.get("positive_score")
-    negative_score = latest_user_npti.get("negative_score")
-    latest_update_time = latest_user_npti.get('timestamp')
-    behavior_log_per_news = search_user_behavior(user_id, latest_update_time) # [[{},{}],[{},{},{},],[{}]] 형태
-    for behavior_log in behavior_log_per_news: # [{},{}]
-        if not behavior_log:
-            continue
-        result = model_predict_proba(behavior_log)# {userid:, news_id:, dwell time:, final_read_time:, reading_efficiency: } 같은 dictionary
-        reading_efficiency = result.get('reading_efficiency')
-        id = result.get('news_id')
-        body = {"query": {"term": {"news_id": id}},"_source": ["content"]}
-        response = search_news_condition(body)
-        n_word = 0
-        if response and response['hits']['hits']:
-            source_data = response['hits']['hits'][0]['_source']
-            content = source_data.get('content',"")
-            if content :
-                n_word = len(content.split())
-                print(f"news_id : {id} | n_word : {n_word}")
-        interest_score = min(1, reading_efficiency * (math.log(n_word+1) / math.log(501)))*10
-        result = db.query(ArticlesNPTI).filter(ArticlesNPTI.news_id == id).first()
-        news_length_type = result.length_type
-        news_article_type = result.article_type
-        news_info_type = result.info_type
-        news_view_type = result.view_type
-        # user_npti 점수에 interest_score 반영하는 로직 !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! (까먹으면 안됨)
-        if news_length_type == "L":
-            long_score += interest_score
-            short_score -= interest_score
-        else:
-            short_score += interest_score
-            long_score -= interest_score
-        if news_article_type == "C":
-            content_score += interest_score
-            tale_score -= interest_score
-        else:
-            tale_score += interest_score
-            content_score -= interest_score
-        if news_info_type == "F":
-            fact_score += interest_score
-            insight_score -= interest_score
-        else:
-            insight_score += interest_score
-            fact_score -= interest_score
-        if news_view_type == "P":
-            positive_score += interest_score
-            negative_score -= interest_score
-        else:
-            negative_score += interest_score
-            positive_score -= interest_score
-    final_long_score = finalize_score(long_score)
-    final_short_score = 100 - final_long_score
-    final_tale_score = finalize_score(tale_score)
-    final_content_score = 100 - final_tale_score
-    final_insight_score = finalize_score(insight_score)
-    final_fact_score = 100 - final_insight_score
-    final_negative_score = finalize_score(negative_score)
-    final_positive_score = 100 - final_negative_score
-    final_length_type = "L" if final_long_score > final_short_score else "S"
-    final_article_type = "T" if final_tale_score > final_content_score else "C"
-    final_info_type = "I" if final_insight_score > final_fact_score else "F"
-    final_view_type = "N" if final_negative_score > final_positive_score else "P"
-    final_user_npti = final_length_type+final_article_type+final_info_type+final_view_type
-    updated_at = datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S')
-    query = text("SELECT type_nick, type_de FROM npti_code WHERE npti_code = :code")
-    description = db.execute(query, {"code": final_user_npti}).fetchone()
-    params = {
-        "latest_update_time":latest_update_time,
-        "user_id": user_id,
-        "npti_code": final_user_npti,
-        "type_nick" : description[0],
-        "type_de" : description[1],
-        "long_score": final_long_score,
-        "short_score": final_short_score,
-        "content_score": final_content_score,
-        "tale_score": final_tale_score,
-        "fact_score": final_fact_score,
-        "insight_score": final_insight_score,
-        "positive_score": final_positive_score,
-        "negative_score": final_negative_score,
-        "updated_at": updated_at
-    }
-    insert_user_npti(db, params)
+    params = npti_online.refresh_user(db, user_id)
+    if params is None:
+        raise HTTPException(status_code=404, detail="NPTI 진단 결과가 없습니다.")
+    final_user_npti = params["npti_code"]
     # long, content, insight, positive
     request.session['user_npti'] = final_user_npti
     request.session['nptiResult'] = final_user_npti
@@ -843,202 +786,283 @@ def update_user_npti(request: Request, db: Session = Depends(get_db)):
 
     return params
 
-async def update_state_loop():
-    while True:
-        if not result_queue.empty():
-            latest_breaking = result_queue.get()
-            if isinstance(latest_breaking, dict) and "final_group" in latest_breaking:
-                app.state.breaking_news = latest_breaking
-                print("New breaking news data updated!")
-        await asyncio.sleep(1)
+@app.get("/update_user_npti/metrics") # 사용자 NPTI 온라인 갱신 상태
+def user_npti_online_metrics():
+    return npti_online.metrics()
+
+EMPTY_BREAKING = {"breaking_news": None, "msg":"데이터 없음"}
+
+
+async def build_breaking_payload(grouping_result):
+    """
+    그룹핑 결과(final_group)가 바뀔 때 1회만 호출
+    - 모든 토픽의 news_id 를 terms 쿼리 1번으로 조회 (timestamp 내림차순)
+    - 토픽별 가장 최신 기사 제목을 골라 바로 응답 가능한 payload + ETag/Last-Modified 생성
+    """
+    breaking_topic = grouping_result.get('final_group') # None or [['news_id1', 'news_id2'], ...]
+    body = EMPTY_BREAKING
+    if breaking_topic:
+        all_ids = list({news_id for topic in breaking_topic for news_id in topic})
+        query = {"size": len(all_ids), "_source": ["news_id", "title", "timestamp"],
+          "query": {"terms": {"news_id": all_ids}},
+          "sort": [{"timestamp": {"order": "desc"}}]}
+        try:
+            res = await async_search(ES_INDEX, query)
+            hits = res["hits"]["hits"]
+        except Exception as e:
+            logger.error(e)
+            hits = []
+        latest_rank = {hit["_source"]["news_id"]: i for i, hit in enumerate(hits)}
+        id_title_list = []
+        for topic in breaking_topic:
+            ranked = [news_id for news_id in topic if news_id in latest_rank]
+            if ranked:
+                first_hit = hits[min(latest_rank[news_id] for news_id in ranked)]["_source"]
+                id_title_list.append({"id":first_hit["news_id"], "title":first_hit["title"]})
+        body = {"breaking_news": id_title_list, "msg":"데이터 있음"}
+
+    return {
+        "body": body,
+        "etag": '"' + hashlib.sha1(json.dumps(body, ensure_ascii=False, sort_keys=True).encode()).hexdigest() + '"',
+        "last_modified": format_datetime(datetime.now(timezone.utc), usegmt=True),
+    }
+
+
+breaking_subscribers = set()   # SSE 연결별 asyncio.Queue
+breaking_bridge = ResultQueueBridge(result_queue)
+SSE_KEEPALIVE = 25             # 프록시 연결 유지를 위한 주석 이벤트 간격(초)
+
+
+def publish_breaking(payload):
+    for subscriber in list(breaking_subscribers):
+        subscriber.put_nowait(payload)
+
+
+async def apply_breaking_result(latest_breaking):
+    app.state.breaking_news = latest_breaking
+    try:
+        payload = await build_breaking_payload(latest_breaking)
+        # 내용이 같으면 Last-Modified 유지, 구독자에게도 보내지 않음
+        if payload["etag"] != app.state.breaking_payload["etag"]:
+            app.state.breaking_payload = payload
+            publish_breaking(payload)
+    except Exception as e:
+        logger.error(f"속보 payload 생성 오류: {e}")
+    print("New breaking news data updated!")
+
+
+breaking_tasks = set()  # 실행 중인 속보 갱신 태스크 (이벤트 루프는 약한 참조만 가지므로 끝날 때까지 보관)
+
+
+def breaking_task_done(task):
+    breaking_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"속보 갱신 태스크 오류: {task.exception()}")
+
+
+# 결과 브리지 reader 스레드 -> 이벤트 루프에서 호출됨
+def on_breaking_result(latest_breaking):
+    if isinstance(latest_breaking, dict) and "final_group" in latest_breaking:
+        task = asyncio.create_task(apply_breaking_result(latest_breaking))
+        breaking_tasks.add(task)
+        task.add_done_callback(breaking_task_done)
 
 @app.on_event("startup")
 async def startup_event():
     if not sch.running:
         sch.start()
     app.state.breaking_news = {'msg':'스케쥴러 가동 중 - 데이터 준비 중'} # 초기값
-    asyncio.create_task(update_state_loop())
+    start_async_es()
+    await resolve_npti_field()  # NPTI 필터 필드 1회 확인 (요청 경로에서 동기 ES 조회 X)
+    if BEHAVIOR_STORAGE == "packed":
+        await asyncio.to_thread(ensure_packed_index) # 샘플 배열이 동적 매핑으로 색인되지 않도록 먼저 생성
+    behavior_buffer.start()
+    app.state.breaking_payload = await build_breaking_payload(app.state.breaking_news)
+    breaking_bridge.start(asyncio.get_running_loop(), on_breaking_result)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if sch.running:
+        sch.shutdown(wait=False)
+    breaking_bridge.stop()
+    classify_pool.shutdown()
+    await behavior_buffer.stop()
+    await close_async_es()
 
 @app.get("/render_breaking")
-def render_breaking():
-    grouping_result = getattr(app.state, "breaking_news", {"msg": "데이터가 아직 없습니다."})
-    breaking_topic = grouping_result.get('final_group') # None or ['news_id1', 'news_id2']
-    if not breaking_topic:
-        return {"breaking_news": None, "msg":"데이터 없음"}
-    id_title_list = []
-    for topic in breaking_topic:
-        query = {"size": 1,"_source": ["news_id", "title", "timestamp"],
-          "query": {"terms": {"news_id": topic}},
-          "sort": [{"timestamp": {"order": "desc"}}]}
-        res = search_news_condition(query)
-        if res and res.get("hits") and res["hits"]["hits"]:
-            first_hit = res["hits"]["hits"][0]["_source"]
-            id_title = {"id":first_hit["news_id"], "title":first_hit["title"]}
-            id_title_list.append(id_title)
+async def render_breaking(request: Request):
+    # 그룹핑 결과 수신 시 만들어 둔 payload 를 그대로 반환 (요청당 ES 조회 없음)
+    payload = getattr(app.state, "breaking_payload", None) or await build_breaking_payload({})
+    headers = {"ETag": payload["etag"], "Last-Modified": payload["last_modified"], "Cache-Control": "no-cache"}
 
-    return {"breaking_news": id_title_list, "msg":"데이터 있음"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if payload["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since") == payload["last_modified"]:
+        return Response(status_code=304, headers=headers)
 
+    return JSONResponse(content=payload["body"], headers=headers)
 
-@app.get("/render_general")
-def render_general(category: str):
-    news_list = []
 
-    # 공통적으로 사용할 쿼리 옵션
-    base_source = ["news_id", "title", "content", "img"]
-    sort_order = [{"pubdate": {"order": "desc"}}]
-
-    if category in ["전체", "all"]:
-        cate_list = ["정치", "경제", "사회", "생활/문화", "IT/과학", "세계", "스포츠", "연예", "지역"]
-        for cat in cate_list:  # 변수명 category -> cat 으로 변경 (충돌 방지)
-            query = {
-                "sort": sort_order,
-                "size": 5,
-                "_source": base_source,
-                "query": {
-                    "bool": {
-                        "must": {"match": {"category": cat}},
-                        # filter와 must_not은 bool 안에 있어야 합니다.
-                        "filter": [{"exists": {"field": "img"}}],
-                        "must_not": [{"term": {"img": ""}}]
-                    }
-                }
-            }
-            res = search_news_condition(query)
-
-            # [중요] 검색 결과가 있을 때만 접근 (IndexError 방지)
-            hits = res.get("hits", {}).get("hits", [])
-            if hits:
-                random_hit = random.choice(hits)
-                src = random_hit["_source"]
-                news_item = {
-                    "news_id": src.get("news_id", ""),
-                    "title": src.get("title", ""),
-                    "desc": src.get("content", ""),
-                    "img": src.get("img", ""),
-                    "link": f"/article?news_id={src.get('news_id', '')}"
-                }
-                news_list.append(news_item)
+@app.get("/render_breaking/stream")
+async def render_breaking_stream(request: Request):
+    """속보 payload 를 SSE 로 push (연결 직후 현재 값 1회 + 변경될 때마다)"""
+    subscriber = asyncio.Queue()
+    breaking_subscribers.add(subscriber)
 
-    else:
-        query = {
-            "sort": sort_order,
-            "size": 20,
-            "_source": base_source,
-            "query": {
-                "bool": {
-                    "must": {"match": {"category": category}},
-                    "filter": [{"exists": {"field": "img"}}],
-                    "must_not": [{"term": {"img": ""}}]
+    async def event_stream():
+        try:
+            payload = app.state.breaking_payload
+            while True:
+                data = json.dumps(payload["body"], ensure_ascii=False)
+                yield f"id: {payload['etag']}\nevent: breaking\ndata: {data}\n\n"
+                while True:
+                    try:
+                        payload = await asyncio.wait_for(subscriber.get(), timeout=SSE_KEEPALIVE)
+                        break
+                    except asyncio.TimeoutError:
+                        if await request.is_disconnected():
+                            return
+                        yield ": keep-alive\n\n"
+        finally:
+            breaking_subscribers.discard(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+CATE_LIST = ["정치", "경제", "사회", "생활/문화", "IT/과학", "세계", "스포츠", "연예", "지역"]
+SUMMARY_CHARS = 200        # 홈 카드에 쓰는 본문 앞부분 길이 (content 전체는 가져오지 않음)
+RENDER_CACHE_TTL = 30      # 카테고리별 검색 결과 캐시 시간(초)
+render_cache = {}          # (category, size, npti_code) -> (만료 시각, hits), 키는 아래 검증을 통과한 값만
+ALL_CATEGORIES = ["전체", "all"]
+NPTI_CODES = {a + b + c + d for a in "LS" for b in "CT" for c in "IF" for d in "PN"}
+
+
+def check_render_params(category: str, npti_code: Optional[str] = None):
+    # 캐시 키로 쓰이므로 임의 문자열은 거절 (render_cache 무한 증가 방지)
+    if category not in CATE_LIST and category not in ALL_CATEGORIES:
+        raise HTTPException(status_code=400, detail="지원하지 않는 카테고리입니다.")
+    if npti_code is not None and npti_code not in NPTI_CODES:
+        raise HTTPException(status_code=400, detail="올바르지 않은 NPTI 코드입니다.")
+
+
+def purge_render_cache(now: float):
+    for key in [key for key, (expires, _) in render_cache.items() if expires <= now]:
+        del render_cache[key]
+
+
+def general_query(category: str, size: int, npti_code: Optional[str] = None):
+    filters = [{"exists": {"field": "img"}}]
+    if npti_code:
+        filters.append({"term": {npti_field(): npti_code}})
+    return {
+        "sort": [{"pubdate": {"order": "desc"}}],
+        "size": size,
+        "_source": ["news_id", "title", "img"],
+        # content 는 앞부분만 잘라서 반환
+        "script_fields": {
+            "summary": {
+                "script": {
+                    "source": "def c = params._source.content; if (c == null) { return ''; } "
+                              "return c.length() > params.n ? c.substring(0, params.n) : c;",
+                    "params": {"n": SUMMARY_CHARS}
                 }
             }
+        },
+        "query": {
+            "bool": {
+                "must": {"match": {"category": category}},
+                # filter와 must_not은 bool 안에 있어야 합니다.
+                "filter": filters,
+                "must_not": [{"term": {"img": ""}}]
+            }
         }
-        res = search_news_condition(query)
+    }
 
-        # 검색 결과 반복문
-        hits = res.get("hits", {}).get("hits", [])
-        if hits:
-            random.shuffle(hits)
-            selected_hit = hits[:9]
-            for hit in selected_hit:
-                src = hit["_source"]
-                news_item = {
-                    "news_id": src.get("news_id", ""),
-                    "title": src.get("title", ""),
-                    "desc": src.get("content", ""),
-                    "img": src.get("img", ""),
-                    "link": f"/article?news_id={src.get('news_id', '')}"
-                }
-                news_list.append(news_item)
 
-    return news_list
+def general_news_item(hit):
+    src = hit["_source"]
+    return {
+        "news_id": src.get("news_id", ""),
+        "title": src.get("title", ""),
+        "desc": hit.get("fields", {}).get("summary", [""])[0],
+        "img": src.get("img", ""),
+        "link": f"/article?news_id={src.get('news_id', '')}"
+    }
 
 
-@app.get("/render_general_npti")
-def render_general_npti(category: str, npti_code: str, db: Session = Depends(get_db)):
-    news_list = []
-
-    # SQL 파라미터 바인딩
-    sql = text("select news_id from articles_npti where npti_code = :code")
-    params = {"code": npti_code}
-
-    # .scalars().all()을 사용하여 확실하게 리스트로 변환
-    news_ids = db.execute(sql, params).scalars().all()
-
-    if not news_ids:
-        return []
-
-    base_source = ["news_id", "title", "content", "img"]
-    sort_order = [{"pubdate": {"order": "desc"}}]
-
-    if category in ["전체", "all"]:
-        cate_list = ["정치", "경제", "사회", "생활/문화", "IT/과학", "세계", "스포츠", "연예", "지역"]
-        for cat in cate_list:
-            query = {
-                "size": 10,
-                "_source": base_source,
-                "sort": sort_order,
-                "query": {
-                    "bool": {
-                        "must": {"match": {"category": cat}},
-                        # terms 쿼리에 news_ids 리스트 전달
-                        "filter": [
-                            {"terms": {"news_id": news_ids}},
-                            {"exists": {"field": "img"}}
-                        ],
-                        "must_not": [{"term": {"img": ""}}]
-                    }
-                }
-            }
-            res = search_news_condition(query)
+async def search_general_hits(categories, size: int, npti_code: Optional[str] = None):
+    """
+    카테고리별 기사 hits 를 _msearch 1회로 조회 (결과는 RENDER_CACHE_TTL 동안 캐시)
+    return: [hits(카테고리 순서)]
+    """
+    now = time.monotonic()
+    results = {}
+    missing = []
+    for cat in categories:
+        cached = render_cache.get((cat, size, npti_code))
+        if cached and cached[0] > now:
+            results[cat] = cached[1]
+        else:
+            missing.append(cat)
 
-            # [중요] 빈 결과 체크
-            hits = res.get("hits", {}).get("hits", [])
+    if missing:
+        searches = []
+        for cat in missing:
+            searches.append({})
+            searches.append(general_query(cat, size, npti_code))
+        try:
+            res = await get_async_es().msearch(index=ES_INDEX, searches=searches)
+            purge_render_cache(now)
+            for cat, response in zip(missing, res["responses"]):
+                if "error" in response:
+                    logger.error(f"카테고리 검색 오류({cat}): {response['error']}")
+                    results[cat] = []
+                    continue
+                results[cat] = response["hits"]["hits"]
+                render_cache[(cat, size, npti_code)] = (now + RENDER_CACHE_TTL, results[cat])
+        except Exception as e:
+            logger.error(f"카테고리 검색 오류: {e}")
+            for cat in missing:
+                results[cat] = []
+
+    return [results[cat] for cat in categories]
+
+
+async def render_news_list(category: str, npti_code: Optional[str] = None):
+    check_render_params(category, npti_code)
+    news_list = []
+    if category in ALL_CATEGORIES:
+        # 카테고리별 5(npti 10)건 중 1건씩 랜덤 노출
+        size = 10 if npti_code else 5
+        for hits in await search_general_hits(CATE_LIST, size, npti_code):
+            # [중요] 검색 결과가 있을 때만 접근 (IndexError 방지)
             if hits:
-                random_hit = random.choice(hits)
-                src = random_hit["_source"]
-                news_item = {
-                    "news_id": src.get("news_id", ""),
-                    "title": src.get("title", ""),
-                    "desc": src.get("content", ""),
-                    "img": src.get("img", ""),
-                    "link": f"/article?news_id={src.get('news_id', '')}"
-                }
-                news_list.append(news_item)
+                news_list.append(general_news_item(random.choice(hits)))
     else:
-        query = {
-            "size": 20,
-            "_source": base_source,
-            "sort": sort_order,
-            "query": {
-                "bool": {
-                    "must": {"match": {"category": category}},
-                    "filter": [
-                        {"terms": {"news_id": news_ids}},
-                        {"exists": {"field": "img"}}
-                    ],
-                    "must_not": [{"term": {"img": ""}}]
-                }
-            }
-        }
-        res = search_news_condition(query)
-
-        hits = res.get("hits", {}).get("hits", [])
+        hits = list((await search_general_hits([category], 20, npti_code))[0])
         if hits:
             random.shuffle(hits)
-            selected_hits = hits[:9]
-            for hit in selected_hits:
-                src = hit["_source"]
-                news_item = {
-                    "news_id": src.get("news_id", ""),
-                    "title": src.get("title", ""),
-                    "desc": src.get("content", ""),
-                    "img": src.get("img", ""),
-                    "link": f"/article?news_id={src.get('news_id', '')}"
-                }
-                news_list.append(news_item)
-
+            for hit in hits[:9]:
+                news_list.append(general_news_item(hit))
     return news_list
 
+
+@app.get("/render_general")
+async def render_general(category: str):
+    return await render_news_list(category)
+
+
+@app.get("/render_general_npti")
+async def render_general_npti(category: str, npti_code: str):
+    # news_raw 의 npti(keyword) 필드로 바로 필터 (articles_npti news_id 목록 조회 X)
+    return await render_news_list(category, npti_code)
+
 @app.get("/profile-edit")
 async def get_profile_edit_page(request: Request):
     user_id = request.session.get("user_id")
@@ -1138,501 +1162,9 @@ def dashboard(request: Request, db: Session = Depends(get_db)):
 
 @app.get("/members_statistics")
 def members_statistics(db: Session = Depends(get_db)):
-    today_str = datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d')
-    today = datetime.now(timezone(timedelta(hours=9)))
-    this_monday = today - timedelta(days=today.weekday())
-    this_monday_str = this_monday.strftime('%Y-%m-%d')
-    this_month_start = today.replace(day=1)
-    this_month_str = this_month_start.strftime('%Y-%m-%d')
-
-    print(f'데이터 추출 시작')
-
-    # [Helper 함수] DB 결과를 딕셔너리 리스트로 변환
-    def rows_to_dict(result_proxy):
-        return [dict(row._asdict()) for row in result_proxy]
-
-    # [Helper 함수] 단일 행(1 row) 결과를 딕셔너리로 변환
-    def row_to_dict(row):
-        return dict(row._asdict()) if row else {}
-
+    # 집계 테이블(db_member_stats, 스케줄러가 1분마다 갱신)만 조회 -> user_npti 전체 스캔 없음
     try:
-        # =========================================================
-        # 1. NPTI 회원 분포 (Pie Chart용)
-        # =========================================================
-
-        # 1-1) NPTI 코드별 비율 -------------------------------- 쿼리 검증 완료
-        sql1_1 = text("""
-            WITH LatestUserNPTI AS (
-                SELECT 
-                    user_id,  
-                    npti_code,
-                    ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY updated_at DESC) as rn
-                FROM user_npti
-            )
-            SELECT 
-                IFNULL(L.npti_code, '미진단') AS npti_code, 
-                COUNT(*) as count 
-            FROM user_info U
-            LEFT JOIN LatestUserNPTI L 
-                ON U.user_id = L.user_id AND L.rn = 1 
-            WHERE U.activation = 1 AND U.admin = 1
-            GROUP BY IFNULL(L.npti_code, '미진단')
-            ORDER BY count DESC;
-        """)
-        result1_1 = rows_to_dict(db.execute(sql1_1).fetchall())
-        print('result1_1 완료')
-
-
-        # 1-2) 연령대별 비율 ----------------------------------- 쿼리 검증 완료
-        sql1_2 = text("""
-            SELECT 
-                CASE 
-                    WHEN user_age < 20 THEN '10대 이하' 
-                    WHEN user_age >= 20 AND user_age < 30 THEN '20대'
-                    WHEN user_age >= 30 AND user_age < 40 THEN '30대' 
-                    WHEN user_age >= 40 AND user_age < 50 THEN '40대'
-                    WHEN user_age >= 50 AND user_age < 60 THEN '50대' 
-                    ELSE '60대 이상' 
-                END AS age_group, 
-                COUNT(*) AS count
-            FROM user_info 
-            WHERE activation = 1 and admin = 1
-            GROUP BY age_group 
-            ORDER BY age_group;
-        """)
-        # DB 실행 결과
-        result1_2_1 = rows_to_dict(db.execute(sql1_2).fetchall())
-        # [후처리] 모든 연령대 카테고리 정의
-        all_groups = ['10대 이하', '20대', '30대', '40대', '50대', '60대 이상']
-        # 딕셔너리로 변환하여 매핑 (예: {'20대': 50, '10대 이하': 15 ...})
-        result_map = {row['age_group']: row['count'] for row in result1_2_1}
-        # 빈 카테고리는 0으로 채워서 최종 리스트 생성
-        result1_2 = [
-            {'age_group': group, 'count': result_map.get(group, 0)}
-            for group in all_groups
-        ]
-        print(result1_2) # 결과: 모든 연령대가 순서대로 존재하며, 없는 그룹은 count: 0으로 보장됨
-
-        # 1-3) 성별 비율 --------------------------------------- 쿼리 검증 완료
-        sql1_3 = text("""SELECT user_gender, COUNT(*) as count FROM user_info 
-            WHERE activation = 1 and admin = 1 GROUP BY user_gender;""")
-
-        # 1. DB 결과 가져오기 (데이터가 있는 성별만 나옴)
-        result1_3_raw = rows_to_dict(db.execute(sql1_3).fetchall())
-
-        # 2. [후처리] 0값 채우기
-        # 보장해야 할 키값 목록 (0과 1)
-        target_genders = [0, 1]
-
-        # 검색 속도를 위해 DB 결과를 딕셔너리로 변환 ( {0: 15, 1: 20} 형태 )
-        gender_map = {row['user_gender']: row['count'] for row in result1_3_raw}
-
-        # 타겟 리스트(0, 1)를 순회하며 데이터가 없으면 count: 0으로 설정
-        result1_3 = [
-            {'user_gender': g, 'count': gender_map.get(g, 0)}
-            for g in target_genders
-        ]
-
-        print('result1_3 (성별 0, 1 포함) 완료')
-
-        # =========================================================
-        # 2. NPTI 코드별 변화 추이 (Line Graph용)
-        # =========================================================
-
-        # 2-1) 일별 누적 (최근 7일 날짜별 모든 유저의 최종 상태) --------------- 쿼리 검증 완료
-        sql2_1 = text(f"""
-            WITH RECURSIVE Past7Days AS (
-                -- 1. [타임라인] 최근 7일 날짜 생성
-                SELECT '{today_str}' - INTERVAL 6 DAY AS date_period
-                UNION ALL
-                SELECT date_period + INTERVAL 1 DAY
-                FROM Past7Days
-                WHERE date_period < '{today_str}'
-            ),
-            AllNPTICodes AS (
-                -- 2. [코드 목록] 존재하는 모든 NPTI 코드 가져오기 (16개 유형 등)
-                -- (npti_code 테이블이 있다고 가정, 만약 없다면 DISTINCT npti_code FROM user_npti 사용)
-                SELECT npti_code FROM npti_code
-            ),
-            DateCodeGrid AS (
-                -- 3. [그리드 생성] (7일 날짜) x (모든 NPTI 코드) 조합 생성
-                -- 데이터가 없어도 이 조합은 무조건 존재해야 함
-                SELECT d.date_period, c.npti_code
-                FROM Past7Days d
-                CROSS JOIN AllNPTICodes c
-            ),
-            DailySnapshot AS (
-                -- 4. [실제 데이터] 유저별 일자별 최종 상태 계산
-                SELECT 
-                    d.date_period,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY d.date_period, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past7Days d
-                LEFT JOIN user_npti u
-                    ON u.updated_at < d.date_period + INTERVAL 1 DAY
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                G.date_period, 
-                G.npti_code, 
-                -- 5. 그리드(G)를 기준으로 데이터(S)를 붙여서 카운트
-                COUNT(CASE WHEN S.rn = 1 THEN 1 END) as user_count
-            FROM DateCodeGrid G
-            LEFT JOIN DailySnapshot S
-              ON G.date_period = S.date_period 
-              AND G.npti_code = S.npti_code
-            GROUP BY G.date_period, G.npti_code
-            ORDER BY G.date_period ASC, G.npti_code ASC;
-        """)
-
-        result2_1 = rows_to_dict(db.execute(sql2_1).fetchall())
-        print('result2_1 (최근 7일 누적 - 0포함) 완료')
-
-        # 2-2) 주별 누적 (해당 주차 기준, 모든 유저의 최종 상태) --------------- 쿼리 검증 완료
-        sql2_2 = text(f"""
-            WITH RECURSIVE Past4Weeks AS (
-                -- 1. [타임라인] 최근 4주 월요일 날짜 생성
-                SELECT '{this_monday_str}' AS week_start
-                UNION ALL
-                SELECT week_start - INTERVAL 1 WEEK
-                FROM Past4Weeks
-                WHERE week_start > '{this_monday_str}' - INTERVAL 3 WEEK
-            ),
-            AllNPTICodes AS (
-                -- 2. [코드 목록] 모든 NPTI 코드 가져오기 (16개 유형)
-                SELECT npti_code FROM npti_code
-            ),
-            WeekCodeGrid AS (
-                -- 3. [그리드 생성] (4주) x (모든 NPTI 코드) 조합
-                -- 데이터 유무와 상관없이 무조건 존재하는 뼈대
-                SELECT w.week_start, c.npti_code
-                FROM Past4Weeks w
-                CROSS JOIN AllNPTICodes c
-            ),
-            WeeklySnapshot AS (
-                -- 4. [실제 데이터] 주차별 유저의 최종 상태 스냅샷
-                SELECT 
-                    w.week_start,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY w.week_start, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past4Weeks w
-                LEFT JOIN user_npti u
-                    -- 해당 주차 일요일 밤(다음주 월요일 0시)까지의 누적 기록
-                    ON u.updated_at < w.week_start + INTERVAL 1 WEEK
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                -- 날짜를 'YYYY-MM-DD ~ YYYY-MM-DD' 형태로 변환
-                CONCAT(G.week_start, '\n~ ', DATE_ADD(G.week_start, INTERVAL 6 DAY)) AS date_period,
-
-                G.npti_code, 
-
-                -- 5. 그리드(G)에 데이터(S)를 매핑하여 카운트 (없으면 0)
-                COUNT(CASE WHEN S.rn = 1 THEN 1 END) as user_count
-            FROM WeekCodeGrid G
-            LEFT JOIN WeeklySnapshot S
-              ON G.week_start = S.week_start 
-              AND G.npti_code = S.npti_code
-            GROUP BY G.week_start, G.npti_code
-            ORDER BY G.week_start ASC, G.npti_code ASC;
-        """)
-
-        result2_2 = rows_to_dict(db.execute(sql2_2).fetchall())
-        print('result2_2 (주간 기간 표시 - 0포함) 완료')
-
-        # 2-3) 월별 누적 (해당 월 기준, 모든 유저의 최종 상태) ------------- 쿼리 검증 완료
-        sql2_3 = text(f"""
-            WITH RECURSIVE Past6Months AS (
-                -- 1. [타임라인] 최근 6개월 '매월 1일' 생성
-                SELECT '{this_month_str}' AS month_start
-                UNION ALL
-                SELECT month_start - INTERVAL 1 MONTH
-                FROM Past6Months
-                WHERE month_start > '{this_month_str}' - INTERVAL 5 MONTH
-            ),
-            AllNPTICodes AS (
-                -- 2. [코드 목록] 모든 NPTI 코드 가져오기 (16개 유형)
-                SELECT npti_code FROM npti_code
-            ),
-            MonthCodeGrid AS (
-                -- 3. [그리드 생성] (6개월) x (모든 NPTI 코드) 조합
-                -- 데이터가 없어도 무조건 존재해야 하는 뼈대
-                SELECT m.month_start, c.npti_code
-                FROM Past6Months m
-                CROSS JOIN AllNPTICodes c
-            ),
-            MonthlySnapshot AS (
-                -- 4. [실제 데이터] 월별 유저의 최종 상태 스냅샷
-                SELECT 
-                    m.month_start,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY m.month_start, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past6Months m
-                LEFT JOIN user_npti u
-                    -- 해당 월의 말일(다음달 1일 0시 전)까지의 누적 기록
-                    ON u.updated_at < m.month_start + INTERVAL 1 MONTH
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                -- 날짜를 'YYYY-MM' 형태로 변환
-                DATE_FORMAT(G.month_start, '%Y-%m') AS date_period,
-
-                G.npti_code, 
-
-                -- 5. 그리드(G)에 데이터(S)를 매핑하여 카운트 (없으면 0)
-                COUNT(CASE WHEN S.rn = 1 THEN 1 END) as user_count
-            FROM MonthCodeGrid G
-            LEFT JOIN MonthlySnapshot S
-              ON G.month_start = S.month_start 
-              AND G.npti_code = S.npti_code
-            GROUP BY G.month_start, G.npti_code
-            ORDER BY G.month_start ASC, G.npti_code ASC;
-        """)
-
-        result2_3 = rows_to_dict(db.execute(sql2_3).fetchall())
-        print('result2_3 (최근 6개월 누적 - 0포함) 완료')
-
-        # =========================================================
-        # 3. NPTI 8개 속성별 분포 (Bar Chart용) ---------------------------------- 쿼리 검증 완료
-        # =========================================================
-        sql3 = text("""
-            WITH LatestUserSnapshot AS (
-                SELECT 
-                    u.user_id,
-                    u.npti_code,
-                    -- 유저별 가장 최신 기록 순위 매기기
-                    ROW_NUMBER() OVER (PARTITION BY u.user_id ORDER BY u.updated_at DESC) as rn
-                FROM user_npti u
-            )
-            SELECT 
-                COUNT(CASE WHEN C.length_type = 'L' THEN 1 END) AS L_count,
-                COUNT(CASE WHEN C.length_type = 'S' THEN 1 END) AS S_count,
-
-                COUNT(CASE WHEN C.article_type = 'C' THEN 1 END) AS C_count,
-                COUNT(CASE WHEN C.article_type = 'T' THEN 1 END) AS T_count,
-
-                COUNT(CASE WHEN C.info_type = 'I' THEN 1 END) AS I_count,
-                COUNT(CASE WHEN C.info_type = 'F' THEN 1 END) AS F_count,
-
-                COUNT(CASE WHEN C.view_type = 'P' THEN 1 END) AS P_count,
-                COUNT(CASE WHEN C.view_type = 'N' THEN 1 END) AS N_count
-            FROM LatestUserSnapshot S
-            -- [핵심 수정] user_info 테이블과 조인하여 회원 상태 확인
-            JOIN user_info UI ON S.user_id = UI.user_id
-            -- NPTI 속성(L/S, C/T...) 정보를 가져오기 위해 조인
-            JOIN npti_code C ON S.npti_code = C.npti_code
-            WHERE S.rn = 1                 -- 최신 기록만
-              AND UI.activation = 1        -- 활성화된 회원만
-              AND UI.admin = 1;            -- 일반 회원만
-        """)
-        result3 = row_to_dict(db.execute(sql3).fetchone())
-        print('result3 완료')
-
-        # =========================================================
-        # 4. NPTI 8개 속성별 변화 추이 (Line Graph용)
-        # =========================================================
-
-        # 4-1) 일별 (누적 기준)
-        sql4_1 = text(f"""
-            WITH RECURSIVE Past7Days AS (
-                -- 1. [타임라인] 최근 7일 날짜 생성
-                SELECT '{today_str}' - INTERVAL 6 DAY AS date_period
-                UNION ALL
-                SELECT date_period + INTERVAL 1 DAY
-                FROM Past7Days
-                WHERE date_period < '{today_str}'
-            ),
-            DailySnapshot AS (
-                -- 2. [스냅샷] 날짜별 유저들의 최종 상태
-                SELECT 
-                    d.date_period,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY d.date_period, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past7Days d
-                LEFT JOIN user_npti u
-                    ON u.updated_at < d.date_period + INTERVAL 1 DAY
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                P.date_period,
-
-                -- 4. 유효한 데이터(rn=1)가 있을 때만 카운트, 없으면 0
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'L' THEN 1 END) AS L_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'S' THEN 1 END) AS S_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'C' THEN 1 END) AS C_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'T' THEN 1 END) AS T_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'I' THEN 1 END) AS I_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'F' THEN 1 END) AS F_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'P' THEN 1 END) AS P_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'N' THEN 1 END) AS N_count
-
-            FROM Past7Days P  -- [핵심] 기준이 되는 타임라인을 먼저 둡니다.
-            LEFT JOIN DailySnapshot S
-                ON P.date_period = S.date_period 
-            LEFT JOIN npti_code C 
-                ON S.npti_code = C.npti_code
-            GROUP BY P.date_period
-            ORDER BY P.date_period ASC;
-        """)
-
-        result4_1 = rows_to_dict(db.execute(sql4_1).fetchall())
-        print('result4_1 (최근 7일 상세 분포 - 0포함) 완료')
-
-        # 4-2) 주별 (누적 기준)
-        sql4_2 = text(f"""
-            WITH RECURSIVE Past4Weeks AS (
-                -- 1. [타임라인] 최근 4주 월요일 날짜 생성
-                SELECT '{this_monday_str}' AS week_start
-                UNION ALL
-                SELECT week_start - INTERVAL 1 WEEK
-                FROM Past4Weeks
-                WHERE week_start > '{this_monday_str}' - INTERVAL 3 WEEK
-            ),
-            WeeklySnapshot AS (
-                -- 2. [스냅샷] 주차별 유저들의 최종 상태
-                SELECT 
-                    w.week_start,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY w.week_start, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past4Weeks w
-                LEFT JOIN user_npti u
-                    ON u.updated_at < w.week_start + INTERVAL 1 WEEK
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                -- 날짜를 'YYYY-MM-DD ~ YYYY-MM-DD' 형태로 변환
-                CONCAT(P.week_start, '\n~ ', DATE_ADD(P.week_start, INTERVAL 6 DAY)) AS date_period,
-
-                -- 4. 유효한 데이터(rn=1)가 있을 때만 카운트, 없으면 0
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'L' THEN 1 END) AS L_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'S' THEN 1 END) AS S_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'C' THEN 1 END) AS C_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'T' THEN 1 END) AS T_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'I' THEN 1 END) AS I_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'F' THEN 1 END) AS F_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'P' THEN 1 END) AS P_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'N' THEN 1 END) AS N_count
-
-            FROM Past4Weeks P -- [핵심] 기준이 되는 타임라인을 먼저 둡니다.
-            LEFT JOIN WeeklySnapshot S
-                ON P.week_start = S.week_start
-            LEFT JOIN npti_code C 
-                ON S.npti_code = C.npti_code
-            GROUP BY P.week_start
-            ORDER BY P.week_start ASC;
-        """)
-
-        result4_2 = rows_to_dict(db.execute(sql4_2).fetchall())
-        print('result4_2 (최근 4주 성향 상세 - 0포함) 완료')
-
-        # 4-3) 월별 (누적 기준)
-        sql4_3 = text(f"""
-            WITH RECURSIVE Past6Months AS (
-                -- 1. [타임라인] 최근 6개월 '매월 1일' 생성
-                SELECT '{this_month_str}' AS month_start
-                UNION ALL
-                SELECT month_start - INTERVAL 1 MONTH
-                FROM Past6Months
-                WHERE month_start > '{this_month_str}' - INTERVAL 5 MONTH
-            ),
-            MonthlySnapshot AS (
-                -- 2. [스냅샷] 월별 유저들의 최종 상태
-                SELECT 
-                    m.month_start,
-                    u.npti_code,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY m.month_start, u.user_id 
-                        ORDER BY u.updated_at DESC
-                    ) as rn
-                FROM Past6Months m
-                LEFT JOIN user_npti u
-                    ON u.updated_at < m.month_start + INTERVAL 1 MONTH
-                JOIN user_info ui
-                    ON u.user_id = ui.user_id
-                WHERE ui.activation = 1 AND ui.admin = 1
-            )
-            SELECT 
-                -- 날짜를 'YYYY-MM' 형태로 변환
-                DATE_FORMAT(P.month_start, '%Y-%m') AS date_period,
-
-                -- 4. 유효한 데이터(rn=1)가 있을 때만 카운트, 없으면 0
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'L' THEN 1 END) AS L_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.length_type = 'S' THEN 1 END) AS S_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'C' THEN 1 END) AS C_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.article_type = 'T' THEN 1 END) AS T_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'I' THEN 1 END) AS I_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.info_type = 'F' THEN 1 END) AS F_count,
-
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'P' THEN 1 END) AS P_count,
-                COUNT(CASE WHEN S.rn = 1 AND C.view_type = 'N' THEN 1 END) AS N_count
-
-            FROM Past6Months P -- [핵심] 기준이 되는 타임라인을 먼저 둡니다.
-            LEFT JOIN MonthlySnapshot S
-                ON P.month_start = S.month_start
-            LEFT JOIN npti_code C 
-                ON S.npti_code = C.npti_code
-            GROUP BY P.month_start
-            ORDER BY P.month_start ASC;
-        """)
-
-        result4_3 = rows_to_dict(db.execute(sql4_3).fetchall())
-        print('result4_3 (최근 6개월 성향 상세 - 0포함) 완료')
-
-        time_now = datetime.now(timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S')
-
-        # =========================================================
-        # 5. 최종 리턴 (JSON)
-        # =========================================================
-        return {
-            "result1_npti_code": result1_1,
-            "result1_age": result1_2,
-            "result1_gender": result1_3,
-
-            "result2_day": result2_1,
-            "result2_week": result2_2,
-            "result2_month": result2_3,
-
-            "result3_npti_type": result3,
-
-            "result4_day": result4_1,
-            "result4_week": result4_2,
-            "result4_month": result4_3,
-            "time_now": time_now
-        }
-
+        return get_members_statistics(db)
     except Exception as e:
         print(f"Error fetching statistics: {e}")
         return JSONResponse(status_code=500, content={"message": "통계 데이터를 불러오는 중 오류가 발생했습니다."})
@@ -167,65 +167,86 @@ async function getNewsData(category) {
 // 5. UI 컴포넌트 (CSS 복구를 위해 HTML 구조 1번으로 롤백)
 
 /* Ticker : ES 데이터 기반 속보 추출 및 애니메이션 */
-async function initTicker() {
+// 서버가 SSE(/render_breaking/stream)로 속보가 바뀔 때만 push -> 주기적 재요청 없음
+function initTicker() {
     const list = document.getElementById('ticker-list');
-    const tickerSection = document.querySelector('.breaking-news'); // 래퍼 요소
     if (!list) return;
 
-    try {
-        // 1. 서버에서 분석된 속보 데이터 가져오기
-        const response = await fetch('/render_breaking');
-        const result = await response.json();
-        const id_title_list = result.breaking_news || [];
-
-        // 2. 0건일 경우 영역 숨기기
-        if (id_title_list.length === 0) {
-            if (tickerSection) tickerSection.style.display = 'none';
-            return;
-        } else {
-            if (tickerSection) tickerSection.style.display = 'block';
+    if (window.tickerSource) window.tickerSource.close();
+
+    if (!window.EventSource) {
+        // SSE 미지원 브라우저: 1회 조회
+        fetch('/render_breaking')
+            .then(response => response.json())
+            .then(renderTicker)
+            .catch(err => {
+                console.error("속보 로드 중 오류:", err);
+                renderTicker({});
+            });
+        return;
+    }
+
+    // 연결 직후 현재 속보 1회 + 그룹핑 결과가 바뀔 때마다 수신 (끊기면 브라우저가 자동 재연결)
+    window.tickerSource = new EventSource('/render_breaking/stream');
+    window.tickerSource.addEventListener('breaking', (event) => {
+        try {
+            renderTicker(JSON.parse(event.data));
+        } catch (err) {
+            console.error("속보 로드 중 오류:", err);
         }
+    });
+}
 
-        // 3. UI 렌더링
-        list.innerHTML = '';
-        id_title_list.forEach(item => {
-            const li = document.createElement('li');
-            li.className = 'ticker-item';
-            // ES 데이터 필드명에 맞춰 수정 (title, _id 등)
-            li.innerHTML = `<a href="/article?news_id=${item.id}" class="ticker-link">${item.title}</a>`;
-            list.appendChild(li);
-        });
+function renderTicker(result) {
+    const list = document.getElementById('ticker-list');
+    const tickerSection = document.querySelector('.breaking-news'); // 래퍼 요소
+    if (!list) return;
 
-        if (window.tickerInterval) clearInterval(window.tickerInterval);
+    const id_title_list = (result && result.breaking_news) || [];
 
-        // 4. 무한 루프를 위한 첫 번째 요소 복제
-        if (id_title_list.length > 1) {
-            list.appendChild(list.firstElementChild.cloneNode(true));
+    if (window.tickerInterval) clearInterval(window.tickerInterval);
 
-            // 5. 애니메이션 로직
-            let currentIndex = 0;
-            const itemHeight = 24;
+    // 1. 0건일 경우 영역 숨기기
+    if (id_title_list.length === 0) {
+        if (tickerSection) tickerSection.style.display = 'none';
+        return;
+    } else {
+        if (tickerSection) tickerSection.style.display = 'block';
+    }
 
-            window.tickerInterval = setInterval(() => {
-                currentIndex++;
-                list.style.transition = 'transform 1s ease';
-                list.style.transform = `translateY(-${currentIndex * itemHeight}px)`;
+    // 2. UI 렌더링
+    list.innerHTML = '';
+    list.style.transition = 'none';
+    list.style.transform = `translateY(0px)`;
+    id_title_list.forEach(item => {
+        const li = document.createElement('li');
+        li.className = 'ticker-item';
+        // ES 데이터 필드명에 맞춰 수정 (title, _id 등)
+        li.innerHTML = `<a href="/article?news_id=${item.id}" class="ticker-link">${item.title}</a>`;
+        list.appendChild(li);
+    });
 
-                if (currentIndex === id_title_list.length) {
-                    setTimeout(() => {
-                        list.style.transition = 'none';
-                        currentIndex = 0;
-                        list.style.transform = `translateY(0px)`;
-                    }, 1000);
-                }
-            }, 3000);
-        } else {
-            list.style.transform = `translateY(0px)`;
-            list.style.transition = 'none';
-        }
-    } catch (err) {
-        console.error("속보 로드 중 오류:", err);
-        if (tickerSection) tickerSection.style.display = 'none';
+    // 3. 무한 루프를 위한 첫 번째 요소 복제
+    if (id_title_list.length > 1) {
+        list.appendChild(list.firstElementChild.cloneNode(true));
+
+        // 4. 애니메이션 로직
+        let currentIndex = 0;
+        const itemHeight = 24;
+
+        window.tickerInterval = setInterval(() => {
+            currentIndex++;
+            list.style.transition = 'transform 1s ease';
+            list.style.transform = `translateY(-${currentIndex * itemHeight}px)`;
+
+            if (currentIndex === id_title_list.length) {
+                setTimeout(() => {
+                    list.style.transition = 'none';
+                    currentIndex = 0;
+                    list.style.transform = `translateY(0px)`;
+                }, 1000);
+            }
+        }, 3000);
     }
 }
 